@@ -0,0 +1,163 @@
+"""
+Drive many Pixela accounts from one process
+
+An AccountPool holds one PixelaClient per account, each with its own
+credentials, keep-alive session, retry budget and graph cache, so a
+job can run for every account at the same time without the accounts
+trampling each other. Pixels are kept in one shared cache, which is
+keyed by username.
+
+    with AccountPool(load_accounts("accounts.json")) as pool:
+        results = pool.run(lambda client: client.post_pixel("water", "20240101", "3"))
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, TypeVar
+
+import pixela_api_handler as pixela
+from instrumentation import Instrumentation
+from pixel_cache import PixelCache
+from rate_limiter import RateLimiter
+
+ACCOUNT_POOL_SIZE = 2  # keep-alive connections per account, there may be dozens of accounts
+DEFAULT_WORKERS = 8  # accounts served at the same time by run()
+
+T = TypeVar("T")
+
+
+def load_accounts(path: str) -> list[tuple[str, str]]:
+    """
+    Read accounts from a file
+
+    :param path: .csv file with username and token columns, or .json file holding
+                 a list of {"username", "token"} objects or a {username: token} object
+    :return: (username, token) pairs
+    """
+
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            return [(row["username"].strip(), row["token"].strip()) for row in csv.DictReader(file)]
+        data = json.load(file)
+
+    if isinstance(data, dict):
+        return [(str(username), str(token)) for username, token in data.items()]
+    return [(str(account["username"]), str(account["token"])) for account in data]
+
+
+class AccountPool:
+    """
+    One PixelaClient per account, and a way to run a job for all of them concurrently
+    """
+
+    def __init__(self, accounts: Iterable[tuple[str, str]] = (), api_prefix: str = "",
+                 pool_size: int = ACCOUNT_POOL_SIZE, rate: float = 0.0,
+                 pixel_cache: PixelCache | None = None,
+                 instrumentation: Instrumentation | None = None) -> None:
+        """
+        :param accounts: (username, token) pairs added right away
+        :param api_prefix: server URL of every client, API_PREFIX by default
+        :param pool_size: keep-alive connections of each client
+        :param rate: requests per second allowed to each account, no limit if 0
+        :param pixel_cache: pixel store shared by the clients, the default cache file if None
+        :param instrumentation: receiver of the RequestEvents of every client, a new one if None
+        """
+
+        self.api_prefix = api_prefix
+        self.pool_size = pool_size
+        self.rate = rate
+        self.pixel_cache = pixel_cache if pixel_cache is not None else PixelCache()
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self._clients: dict[str, pixela.PixelaClient] = {}
+        self._lock = threading.Lock()
+
+        for username, token in accounts:
+            self.add(username, token)
+
+    def __enter__(self) -> AccountPool:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __iter__(self) -> Iterator[pixela.PixelaClient]:
+        with self._lock:
+            return iter(list(self._clients.values()))
+
+    def __getitem__(self, username: str) -> pixela.PixelaClient:
+        return self._clients[username]
+
+    @property
+    def usernames(self) -> list[str]:
+        with self._lock:
+            return list(self._clients)
+
+    def add(self, username: str, token: str) -> pixela.PixelaClient:
+        """
+        Add an account, replacing the client of an account already added
+
+        :return: client of the account
+        """
+
+        client = pixela.PixelaClient(username, token, pool_size=self.pool_size, verbose=False,
+                                     pixel_cache=self.pixel_cache, api_prefix=self.api_prefix,
+                                     rate_limiter=RateLimiter(self.rate) if self.rate > 0 else None,
+                                     instrumentation=self.instrumentation)
+        with self._lock:
+            previous = self._clients.get(username)
+            self._clients[username] = client
+        if previous is not None:
+            previous.close()
+        return client
+
+    def remove(self, username: str) -> None:
+        with self._lock:
+            client = self._clients.pop(username, None)
+        if client is not None:
+            client.close()
+
+    def close(self) -> None:
+        """
+        Close the connections of every client
+        """
+
+        with self._lock:
+            clients = list(self._clients.values())
+        for client in clients:
+            client.close()
+
+    def run(self, job: Callable[[pixela.PixelaClient], T], workers: int = DEFAULT_WORKERS,
+            usernames: Iterable[str] | None = None) -> dict[str, tuple[T | None, Exception | None]]:
+        """
+        Run a job once per account, for several accounts at the same time
+
+        While the job runs, the module-level functions of pixela_api_handler
+        (and modules built on them, like bulk_import) act as its account.
+
+        :param job: function receiving the client of an account
+        :param workers: accounts served at the same time
+        :param usernames: accounts to run the job for, every account by default
+        :return: (result, None) or (None, exception raised) by username
+        """
+
+        with self._lock:
+            clients = [self._clients[username] for username in (usernames or self._clients)]
+
+        def run_one(client: pixela.PixelaClient) -> tuple[T | None, Exception | None]:
+            with pixela.use_client(client):
+                try:
+                    return job(client), None
+                except Exception as error:
+                    return None, error
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(clients))),
+                                thread_name_prefix="account") as executor:
+            outcomes = executor.map(run_one, clients)
+            return {client.username: outcome for client, outcome in zip(clients, outcomes)}
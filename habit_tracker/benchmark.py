@@ -0,0 +1,281 @@
+"""
+Benchmark the Pixela client against the local stand-in server
+
+Every endpoint of PixelaClient and a few representative workflows
+are run at several concurrency levels. Throughput and p50/p95/p99
+latencies are printed and written to a JSON file, so that runs
+can be compared over time. Cases sending many pixels per call are
+also reported per pixel, to be compared with post_pixel.
+
+    python benchmark.py --requests 200 --concurrency 1 4 16 --output bench.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as Date, timedelta
+from typing import Callable
+
+import bulk_import
+import pixela_api_handler as pixela
+from fake_pixela_server import FakePixelaServer
+
+USERNAME = "bench"
+TOKEN = "bench-token"
+GRAPH_ID = "bench"
+HISTORY_DAYS = 3650  # pixels of the graph used by the read workflows
+STATS_GRAPHS = 50  # graphs read by the stats workflow
+BULK_PIXELS = 100  # pixels sent by each call of the bulk and batch workflows
+BULK_WORKERS = 4  # rows posted at the same time by the bulk workflow
+
+
+class Case:
+    """
+    One benchmarked operation
+
+    prepare(client, i) runs untimed and returns the arguments
+    of call(client, *args), which is the timed part. succeeded(result)
+    tells whether what call returned is a success, a 200 response by
+    default, and pixels is the number of pixels a call sends.
+    """
+
+    def __init__(self, name: str, call: Callable, prepare: Callable | None = None,
+                 succeeded: Callable | None = None, pixels: int = 1) -> None:
+        self.name = name
+        self.call = call
+        self.prepare = prepare or (lambda client, i: ())
+        self.succeeded = succeeded or (lambda response: response.status_code == 200)
+        self.pixels = pixels
+
+
+def day(i: int) -> str:
+    return (Date(2000, 1, 1) + timedelta(days=i)).strftime("%Y%m%d")
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """
+    Nearest-rank percentile of already sorted values
+    """
+
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(percent / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def build_cases(server: FakePixelaServer, run_id: str, directory: str) -> list[Case]:
+    """
+    :param run_id: prefix keeping the names created by each run unique
+    :param directory: where the import files of the bulk workflow are written
+    """
+
+    def as_user(username: str) -> Callable:
+        def prepare(client: pixela.PixelaClient, i: int) -> tuple:
+            server.add_user(username.format(i=i), TOKEN)
+            client.set_username(username.format(i=i))
+            client.set_token(TOKEN)
+            return ()
+        return prepare
+
+    def as_bench(make_args: Callable[[int], tuple] = lambda i: ()) -> Callable:
+        def prepare(client: pixela.PixelaClient, i: int) -> tuple:
+            client.set_username(USERNAME)
+            client.set_token(TOKEN)
+            return make_args(i)
+        return prepare
+
+    def new_graph(i: int) -> tuple:
+        server.add_graph(USERNAME, f"{run_id}d{i}")
+        return f"{run_id}d{i}",
+
+    def new_pixel(i: int) -> tuple:
+        server.add_pixels(USERNAME, "scratch", {day(i): "1"})
+        return "scratch", day(i)
+
+    def new_user(client: pixela.PixelaClient, i: int) -> tuple:
+        client.set_username(f"{run_id}n{i}")
+        client.set_token(TOKEN)
+        return ()
+
+    def bulk_pixels(i: int) -> list[dict]:
+        return [{"date": day(i * BULK_PIXELS + k), "quantity": "1"} for k in range(BULK_PIXELS)]
+
+    def import_file(i: int) -> tuple:
+        path = os.path.join(directory, f"{run_id}-{i}.csv")
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, ["graph_id", "date", "quantity"])
+            writer.writeheader()
+            writer.writerows({"graph_id": "bulk", **pixel} for pixel in bulk_pixels(i))
+        return path,
+
+    def bulk_client(client: pixela.PixelaClient, i: int) -> tuple:
+        client.grow_pool(BULK_WORKERS)  # the import's workers share the client of the thread
+        return as_bench(import_file)(client, i)
+
+    return [
+        # __________USER__________
+        Case("create_user", lambda client: client.create_user(), new_user),
+        Case("update_token", lambda client: client.update_token(TOKEN), as_user(f"{run_id}t{{i}}")),
+        Case("delete_user", lambda client: client.delete_user(), as_user(f"{run_id}x{{i}}")),
+
+        # __________USER PROFILE__________
+        Case("view_user_profile", lambda client: client.view_user_profile(USERNAME), as_bench()),
+        Case("update_user_profile", lambda client: client.update_user_profile("displayName", "Bench"),
+             as_bench()),
+
+        # __________GRAPH__________
+        Case("create_graph", lambda client, graph_id: client.create_graph(graph_id, "b", "km", "int", "sora"),
+             as_bench(lambda i: (f"{run_id}c{i}",))),
+        Case("get_all_graph", lambda client: client.get_all_graph(), as_bench()),
+        Case("get_graph_def", lambda client: client.get_graph_def(GRAPH_ID), as_bench()),
+        Case("delete_graph", lambda client, graph_id: client.delete_graph(graph_id), as_bench(new_graph)),
+        Case("display_graph", lambda client: client.display_graph(GRAPH_ID), as_bench()),
+        Case("get_graph_pixels", lambda client: client.get_graph_pixels(GRAPH_ID), as_bench()),
+        Case("get_graph_stats", lambda client: client.get_graph_stats(GRAPH_ID), as_bench()),
+
+        # __________PIXEL__________
+        Case("post_pixel", lambda client, date: client.post_pixel("scratch", date, "3"),
+             as_bench(lambda i: (day(i),))),
+        Case("get_pixel", lambda client, date: client.get_pixel(GRAPH_ID, date),
+             as_bench(lambda i: (day(i % HISTORY_DAYS),))),
+        Case("update_pixel", lambda client, graph_id, date: client.update_pixel(graph_id, date, "4"),
+             as_bench(new_pixel)),
+        Case("delete_pixel", lambda client, graph_id, date: client.delete_pixel(graph_id, date),
+             as_bench(new_pixel)),
+
+        # __________WORKFLOWS__________
+        Case("workflow_bulk_post",
+             lambda client, path: bulk_import.import_pixels(path, workers=BULK_WORKERS, show_progress=False,
+                                                            client=client),
+             bulk_client, lambda summary: summary["failed"] == 0, pixels=BULK_PIXELS),
+        Case("workflow_batch_post", lambda client, pixels: client.post_pixels_batch("batch", pixels),
+             as_bench(lambda i: (bulk_pixels(i),)),
+             lambda outcomes: all(outcome["status"] == 200 for outcome in outcomes), pixels=BULK_PIXELS),
+        Case("workflow_full_pixel_fetch", lambda client: client.get_graph_pixels(GRAPH_ID, with_body=True),
+             as_bench()),
+        Case("workflow_stats_many_graphs", lambda client, graph_id: client.get_graph_stats(graph_id),
+             as_bench(lambda i: (f"stats{i % STATS_GRAPHS}",))),
+    ]
+
+
+def run_case(case: Case, requests: int, concurrency: int, api_prefix: str) -> dict:
+    """
+    Run a case `requests` times with `concurrency` worker threads,
+    each with its own keep-alive client
+
+    :return: throughput and latency figures of the run
+    """
+
+    local = threading.local()
+
+    def client() -> pixela.PixelaClient:
+        if not hasattr(local, "client"):
+            # No graph cache, so that every call of a case is a request
+            local.client = pixela.PixelaClient(pool_size=1, verbose=False, api_prefix=api_prefix,
+                                               graph_cache_ttl=0)
+        return local.client
+
+    def one(i: int) -> tuple[float, bool]:
+        args = case.prepare(client(), i)
+        start = time.perf_counter()
+        try:
+            ok = case.succeeded(case.call(client(), *args))
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(requests)))
+    seconds = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    pixels = requests * case.pixels
+    return {
+        "case": case.name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": sum(1 for _, ok in results if not ok),
+        "seconds": round(seconds, 4),
+        "throughput": round(requests / seconds, 2) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "pixels": pixels,
+        "pixel_throughput": round(pixels / seconds, 2) if seconds else 0.0,
+        "p50_ms_per_pixel": round(percentile(latencies, 50) * 1000 / case.pixels, 3),
+    }
+
+
+def seed(server: FakePixelaServer) -> None:
+    server.add_user(USERNAME, TOKEN)
+    for graph_id in (GRAPH_ID, "scratch", "bulk", "batch"):
+        server.add_graph(USERNAME, graph_id)
+    server.add_pixels(USERNAME, GRAPH_ID, {day(i): str(i % 10) for i in range(HISTORY_DAYS)})
+    for number in range(STATS_GRAPHS):
+        server.add_graph(USERNAME, f"stats{number}")
+        server.add_pixels(USERNAME, f"stats{number}", {day(i): str(i % 7) for i in range(365)})
+
+
+def run(requests: int, concurrency_levels: list[int], latency: float, rejection_rate: float,
+        only: list[str]) -> dict:
+    """
+    Start a stand-in server and run every selected case at every concurrency level
+
+    :return: machine-readable report of the run
+    """
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "server_latency": latency,
+        "rejection_rate": rejection_rate,
+        "results": [],
+    }
+
+    with FakePixelaServer(latency=latency, rejection_rate=rejection_rate, seed=0) as server, \
+            tempfile.TemporaryDirectory() as directory:
+        seed(server)
+        for run_number, concurrency in enumerate(concurrency_levels):
+            for case in build_cases(server, f"r{run_number}", directory):
+                if only and case.name not in only:
+                    continue
+                result = run_case(case, requests, concurrency, server.url)
+                report["results"].append(result)
+                print_result(result)
+    return report
+
+
+def print_result(result: dict) -> None:
+    print(f"{result['case']:<28} c={result['concurrency']:<3} {result['throughput']:>9.1f} req/s  "
+          f"p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  "
+          f"p99 {result['p99_ms']:>8.2f} ms  {result['pixel_throughput']:>9.1f} pixels/s  "
+          f"errors {result['errors']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the Pixela client against a local stand-in server")
+    parser.add_argument("--requests", type=int, default=200, help="requests per case and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of simulated server latency")
+    parser.add_argument("--rejection-rate", type=float, default=0.0, help="share of requests rejected with 503")
+    parser.add_argument("--case", action="append", default=[], help="only run this case, can be repeated")
+    parser.add_argument("--output", default="", help="JSON file receiving the results")
+    args = parser.parse_args()
+
+    report = run(args.requests, args.concurrency, args.latency, args.rejection_rate, args.case)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Import many pixels at once from a CSV or JSONL file
+
+CSV files need a header with the columns graph_id, date and quantity.
+JSONL files hold one object with the same keys per line.
+Rows are streamed from the file and posted through
+pixela_api_handler.post_pixel by a pool of worker threads.
+"""
+
+import csv
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Iterator
+
+import pixela_api_handler as pixela
+
+DEFAULT_WORKERS = pixela.DEFAULT_POOL_SIZE
+PROGRESS_EVERY = 50  # rows between two progress lines
+RESULT_FIELDS = ["line", "graph_id", "date", "quantity", "status", "message", "retries"]
+
+
+def read_rows(path: str) -> Iterator[tuple[int, dict]]:
+    """
+    Stream the rows of an import file
+
+    :param path: path of a .csv or .jsonl file
+    :return: generator of (line number, row) pairs
+    """
+
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    row = {}
+                yield line_number, row
+        else:
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, row
+
+
+def post_row(row: dict, client: pixela.PixelaClient | None = None) -> tuple[str, str, int]:
+    """
+    Post a single row as a pixel
+
+    :param client: client posting the pixel, pixela_api_handler's current client by default
+    :return: (status, message, number of retries) of the request
+    """
+
+    try:
+        graph_id = str(row["graph_id"]).strip()
+        date = str(row["date"]).strip().replace("-", "")
+        quantity = str(row["quantity"]).strip()
+    except (KeyError, TypeError):
+        return "INVALID", "row needs graph_id, date and quantity", 0
+
+    try:
+        response = (client or pixela.get_client()).post_pixel(graph_id, date, quantity)
+    except OSError as error:
+        return "ERROR", str(error), 0
+
+    return str(response.status_code), pixela.response_message(response), getattr(response, "retry_count", 0)
+
+
+def import_pixels(path: str, result_path: str = "", workers: int = DEFAULT_WORKERS,
+                  show_progress: bool = True, client: pixela.PixelaClient | None = None) -> dict:
+    """
+    Post every row of an import file concurrently
+
+    Only a bounded number of rows is read ahead of the workers,
+    so memory use does not grow with the size of the file.
+
+    :param path: path of a .csv or .jsonl file
+    :param result_path: CSV file receiving one result line per row,
+                        <path>.result.csv by default
+    :param workers: number of rows posted at the same time
+    :param show_progress: print progress while importing
+    :param client: client of the account receiving the pixels,
+                   pixela_api_handler's current client by default
+    :return: summary with the number of posted, failed rows and the elapsed time
+    """
+
+    if not result_path:
+        result_path = path + ".result.csv"
+
+    summary = {"total": 0, "succeeded": 0, "failed": 0, "seconds": 0.0, "result_file": result_path}
+    start = time.perf_counter()
+
+    client = client or pixela.get_client()
+
+    def record(future: Future, line_number: int, row: dict) -> None:
+        status, message, retries = future.result()
+        summary["total"] += 1
+        if status == "200":
+            summary["succeeded"] += 1
+        else:
+            summary["failed"] += 1
+        writer.writerow({
+            "line": line_number,
+            "graph_id": row.get("graph_id", ""),
+            "date": row.get("date", ""),
+            "quantity": row.get("quantity", ""),
+            "status": status,
+            "message": message,
+            "retries": retries,
+        })
+        if show_progress and summary["total"] % PROGRESS_EVERY == 0:
+            print_progress(summary, time.perf_counter() - start)
+
+    with open(result_path, "w", newline="", encoding="utf-8") as result_file, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import") as executor:
+        writer = csv.DictWriter(result_file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+
+        pending: dict[Future, tuple[int, dict]] = {}
+        for line_number, row in read_rows(path):
+            if not isinstance(row, dict):
+                row = {}
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(future, *pending.pop(future))
+            # Quietly: one print per row would drown the progress
+            pending[executor.submit(pixela.run_quietly, post_row, row, client)] = (line_number, row)
+
+        for future in list(pending):
+            future.result()
+            record(future, *pending.pop(future))
+
+    summary["seconds"] = time.perf_counter() - start
+    if show_progress:
+        print_progress(summary, summary["seconds"])
+    return summary
+
+
+def print_progress(summary: dict, elapsed: float) -> None:
+    rate = summary["total"] / elapsed if elapsed > 0 else 0.0
+    print(f"{summary['total']} rows imported, {summary['failed']} failed ({rate:.1f} rows/s)")
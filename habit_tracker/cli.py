@@ -0,0 +1,334 @@
+"""
+Non-interactive command line interface, for cron jobs and shell pipelines
+
+Every subcommand sends what it needs to Pixela and prints the
+result as one line of compact JSON, without prompts or screens.
+
+    python cli.py post my-graph 5
+    python cli.py pixels my-graph --from 20240101 --to 20240131
+    python cli.py sync my-graph
+    python cli.py stats my-graph --local
+    python cli.py import pixels.csv
+
+Credentials are read from the --username/--token options, then
+the PIXELA_USERNAME/PIXELA_TOKEN environment variables, then the
+"username"/"token" keys of the config file (default_config_path()).
+
+Exit codes: 0 success, 1 Pixela answered with an error,
+2 invalid arguments, 3 missing credentials, 4 network error.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from datetime import date as Date
+from itertools import chain
+from typing import TYPE_CHECKING
+
+import pixela_api_handler as pixela
+
+if TYPE_CHECKING:
+    from requests import Response
+
+EXIT_OK = 0
+EXIT_API_ERROR = 1
+EXIT_USAGE = 2  # also used by argparse
+EXIT_NO_CREDENTIALS = 3
+EXIT_NETWORK_ERROR = 4
+
+CONFIG_FILE_NAME = "config.json"
+
+
+def default_config_path() -> str:
+    """
+    :return: $XDG_CONFIG_HOME/pixela_habit_tracker/config.json, ~/.config/... by default
+    """
+
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "pixela_habit_tracker", CONFIG_FILE_NAME)
+
+
+def load_config(path: str) -> dict:
+    """
+    :return: content of the JSON config file, empty if it does not exist
+    :raises ValueError: if the file is not a JSON object
+    """
+
+    try:
+        with open(path, encoding="utf-8") as file:
+            config = json.load(file)
+    except FileNotFoundError:
+        return {}
+    except ValueError as error:  # json.JSONDecodeError or UnicodeDecodeError
+        raise ValueError(f"Invalid config file {path}: {error}") from error
+    if not isinstance(config, dict):
+        raise ValueError(f"Invalid config file {path}: expected a JSON object")
+    return config
+
+
+def print_json(data) -> None:
+    print(json.dumps(data, separators=(",", ":"), default=str))
+
+
+def print_response(response: Response) -> int:
+    """
+    Print the body of a response as compact JSON
+
+    :return: exit code matching the status of the response
+    """
+
+    try:
+        print_json(response.json())
+    except ValueError:
+        print(response.text)
+    return EXIT_OK if response.status_code == 200 else EXIT_API_ERROR
+
+
+# __________COMMANDS__________
+
+def command_post(args: argparse.Namespace) -> int:
+    return print_response(pixela.post_pixel(args.graph_id, args.date, args.quantity))
+
+
+def command_get(args: argparse.Namespace) -> int:
+    return print_response(pixela.get_pixel(args.graph_id, args.date))
+
+
+def command_update(args: argparse.Namespace) -> int:
+    return print_response(pixela.update_pixel(args.graph_id, args.date, args.quantity))
+
+
+def command_increment(args: argparse.Namespace) -> int:
+    return print_response(pixela.increment_pixel(args.graph_id))
+
+
+def command_decrement(args: argparse.Namespace) -> int:
+    return print_response(pixela.decrement_pixel(args.graph_id))
+
+
+def command_delete(args: argparse.Namespace) -> int:
+    return print_response(pixela.delete_pixel(args.graph_id, args.date))
+
+
+def command_pixels(args: argparse.Namespace) -> int:
+    """
+    Stream the pixels into one compact JSON line as they are decoded
+    """
+
+    if args.date_from:
+        pixels = pixela.iter_pixel_windows(args.graph_id, args.date_from, args.date_to,
+                                           with_body=not args.dates_only)
+    else:
+        pixels = pixela.iter_graph_pixels(args.graph_id, date_to=args.date_to, with_body=not args.dates_only)
+
+    # The request is sent on the first pixel, before anything is written
+    first = next(pixels, None)
+
+    out = sys.stdout
+    out.write('{"pixels":[')
+    for index, pixel in enumerate(chain([first], pixels) if first is not None else ()):
+        if index:
+            out.write(",")
+        out.write(json.dumps(pixel["date"] if args.dates_only else pixel, separators=(",", ":")))
+    out.write("]}\n")
+    return EXIT_OK
+
+
+def command_sync(args: argparse.Namespace) -> int:
+    """
+    Fetch the new pixels of a graph into the local pixel cache
+    """
+
+    pixels, response = pixela.sync_graph_pixels(args.graph_id, full=args.full)
+    if response is not None and response.status_code != 200:
+        return print_response(response)
+    print_json({"graph_id": args.graph_id, "pixels": len(pixels)})
+    return EXIT_OK
+
+
+def command_stats(args: argparse.Namespace) -> int:
+    import graph_stats
+
+    if args.local:
+        if pixela.get_client().pixel_cache.get_sync_state(pixela.get_username(), args.graph_id) is None:
+            # Only the pixels posted from this machine are cached, the statistics would miss the others
+            print_json({"message": f"Graph {args.graph_id} was never synced, "
+                                   f"run \"cli.py sync {args.graph_id}\" first.", "isSuccess": False})
+            return EXIT_USAGE
+        print_json(graph_stats.graph_stats(pixela.get_client().pixel_cache, pixela.get_username(), args.graph_id))
+        return EXIT_OK
+    if args.stream:
+        print_json(graph_stats.stream_graph_stats(pixela.iter_graph_pixels(args.graph_id)))
+        return EXIT_OK
+    return print_response(pixela.get_graph_stats(args.graph_id))
+
+
+def command_heatmap(args: argparse.Namespace) -> int:
+    """
+    Draw a graph from the local pixel cache, without any request
+    """
+
+    import heatmap
+
+    pixels = pixela.get_client().pixel_cache.get_pixels(pixela.get_username(), args.graph_id)
+    pixels = [(pixel["date"], pixel["quantity"]) for pixel in pixels]
+    if args.svg:
+        heatmap.write_svg(args.svg, pixels, args.color, title=args.graph_id)
+        print_json({"file": args.svg, "pixels": len(pixels)})
+    else:
+        print(heatmap.render_ansi(pixels, args.color))
+    return EXIT_OK
+
+
+def command_graphs(args: argparse.Namespace) -> int:
+    return print_response(pixela.get_all_graph())
+
+
+def command_graph(args: argparse.Namespace) -> int:
+    return print_response(pixela.get_graph_def(args.graph_id))
+
+
+def command_dashboard(args: argparse.Namespace) -> int:
+    import dashboard
+
+    rows = dashboard.fetch_dashboard(workers=args.workers)
+    if args.table:
+        print(dashboard.render_dashboard(rows))
+    else:
+        print_json({"graphs": rows})
+    return EXIT_API_ERROR if any(row["error"] for row in rows) else EXIT_OK
+
+
+def command_import(args: argparse.Namespace) -> int:
+    import bulk_import
+
+    summary = bulk_import.import_pixels(args.path, args.result, args.workers, show_progress=False)
+    print_json(summary)
+    return EXIT_OK if summary["failed"] == 0 else EXIT_API_ERROR
+
+
+def build_parser() -> argparse.ArgumentParser:
+    today = Date.today().strftime("%Y%m%d")
+
+    parser = argparse.ArgumentParser(prog="pixela", description="Pixela habit tracker without prompts")
+    parser.add_argument("--username", default="", help="Pixela username, PIXELA_USERNAME by default")
+    parser.add_argument("--token", default="", help="Pixela API token, PIXELA_TOKEN by default")
+    parser.add_argument("--config", default="", help=f"JSON config file, {default_config_path()} by default")
+    parser.add_argument("--api-prefix", default="", help="server URL, PIXELA_API_PREFIX or https://pixe.la")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    post = commands.add_parser("post", help="post a pixel")
+    post.add_argument("graph_id")
+    post.add_argument("quantity")
+    post.add_argument("--date", default=today, help="yyyyMMdd, today by default")
+    post.set_defaults(handler=command_post)
+
+    get = commands.add_parser("get", help="get a pixel")
+    get.add_argument("graph_id")
+    get.add_argument("--date", default=today, help="yyyyMMdd, today by default")
+    get.set_defaults(handler=command_get)
+
+    update = commands.add_parser("update", help="update a pixel")
+    update.add_argument("graph_id")
+    update.add_argument("quantity")
+    update.add_argument("--date", default=today, help="yyyyMMdd, today by default")
+    update.set_defaults(handler=command_update)
+
+    increment = commands.add_parser("increment", help="add 1 (0.01 for a float graph) to today's pixel")
+    increment.add_argument("graph_id")
+    increment.set_defaults(handler=command_increment)
+
+    decrement = commands.add_parser("decrement", help="subtract 1 (0.01 for a float graph) from today's pixel")
+    decrement.add_argument("graph_id")
+    decrement.set_defaults(handler=command_decrement)
+
+    delete = commands.add_parser("delete", help="delete a pixel")
+    delete.add_argument("graph_id")
+    delete.add_argument("--date", default=today, help="yyyyMMdd, today by default")
+    delete.set_defaults(handler=command_delete)
+
+    pixels = commands.add_parser("pixels", help="list the pixels of a graph")
+    pixels.add_argument("graph_id")
+    pixels.add_argument("--from", dest="date_from", default="", help="first date yyyyMMdd")
+    pixels.add_argument("--to", dest="date_to", default="", help="last date yyyyMMdd")
+    pixels.add_argument("--dates-only", action="store_true", help="list dates without quantities")
+    pixels.set_defaults(handler=command_pixels)
+
+    sync = commands.add_parser("sync", help="fetch the new pixels of a graph into the local pixel cache")
+    sync.add_argument("graph_id")
+    sync.add_argument("--full", action="store_true", help="download the whole pixel list again")
+    sync.set_defaults(handler=command_sync)
+
+    stats = commands.add_parser("stats", help="statistics of a graph")
+    stats.add_argument("graph_id")
+    source = stats.add_mutually_exclusive_group()
+    source.add_argument("--local", action="store_true", help="compute from the local pixel cache, no request")
+    source.add_argument("--stream", action="store_true", help="compute while streaming the pixels")
+    stats.set_defaults(handler=command_stats)
+
+    heatmap = commands.add_parser("heatmap", help="draw a graph from the local pixel cache")
+    heatmap.add_argument("graph_id")
+    heatmap.add_argument("--svg", default="", help="write an SVG file instead of drawing in the terminal")
+    heatmap.add_argument("--color", default="shibafu", help="shibafu, momiji, sora, ichou, ajisai or kuro")
+    heatmap.set_defaults(handler=command_heatmap)
+
+    graphs = commands.add_parser("graphs", help="list every graph")
+    graphs.set_defaults(handler=command_graphs)
+
+    graph = commands.add_parser("graph", help="definition of a graph")
+    graph.add_argument("graph_id")
+    graph.set_defaults(handler=command_graph)
+
+    dashboard = commands.add_parser("dashboard", help="today's pixel and statistics of every graph")
+    dashboard.add_argument("--workers", type=int, default=pixela.DEFAULT_POOL_SIZE, help="requests in flight")
+    dashboard.add_argument("--table", action="store_true", help="print a text table instead of JSON")
+    dashboard.set_defaults(handler=command_dashboard)
+
+    import_ = commands.add_parser("import", help="post every pixel of a CSV/JSONL file")
+    import_.add_argument("path")
+    import_.add_argument("--result", default="", help="CSV file of per-row results, <path>.result.csv by default")
+    import_.add_argument("--workers", type=int, default=pixela.DEFAULT_POOL_SIZE)
+    import_.set_defaults(handler=command_import)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    try:
+        config = load_config(args.config or default_config_path())
+    except ValueError as error:
+        print_json({"message": str(error), "isSuccess": False})
+        return EXIT_USAGE
+    username = args.username or os.environ.get("PIXELA_USERNAME") or config.get("username", "")
+    token = args.token or os.environ.get("PIXELA_TOKEN") or config.get("token", "")
+    if not username or not token:
+        print_json({"message": "Set PIXELA_USERNAME and PIXELA_TOKEN, or pass --username and --token",
+                    "isSuccess": False})
+        return EXIT_NO_CREDENTIALS
+
+    api_prefix = args.api_prefix or config.get("api_prefix", "")
+    if api_prefix:
+        pixela.set_api_prefix(api_prefix)
+    pixela.set_username(username)
+    pixela.set_token(token)
+    pixela.get_client().verbose = False  # stdout carries the JSON result only
+
+    try:
+        return args.handler(args)
+    except (OSError, ValueError) as error:
+        import requests
+
+        if isinstance(error, requests.HTTPError):
+            print_response(error.response)
+            return EXIT_API_ERROR
+        print_json({"message": str(error), "isSuccess": False})
+        return EXIT_NETWORK_ERROR if isinstance(error, requests.RequestException) else EXIT_USAGE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+Coalesce bursts of increments of a pixel into one request
+
+Habit counters bump the same pixel many times a day. A CounterBuffer
+only adds each bump to a net count per graph and day in memory, and a
+background thread sends every count once per flush interval: a single
+increment or decrement when the count is 1 or -1, a single add or
+subtract of the whole count otherwise. Counts of a day that ended
+before they were sent are applied to that day's pixel with a read
+and an update, since the increment endpoints only change today's pixel.
+A count is never sent twice: when the outcome of its request is
+unknown, it is listed in unconfirmed for a manual check.
+
+    with CounterBuffer(client) as counters:
+        counters.increment("water")
+        counters.increment("water")  # sent with the first one as one add of 2
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import date as Date
+from decimal import Decimal
+from functools import partial
+from typing import TYPE_CHECKING, Callable
+
+import pixela_api_handler as pixela
+from retry import RetryPolicy
+from write_queue import FLUSH_INTERVAL
+
+if TYPE_CHECKING:
+    from requests import Response
+
+# Quantity of one increment, by graph type
+STEPS = {"int": Decimal(1), "float": Decimal("0.01")}
+
+
+class CounterBuffer:
+    """
+    Net increments of today's pixels, sent in the background
+    """
+
+    def __init__(self, client: pixela.PixelaClient | None = None, interval: float = FLUSH_INTERVAL) -> None:
+        """
+        :param client: client sending the requests, pixela_api_handler's current client by default
+        :param interval: seconds between two flushes
+        """
+
+        self.client = client or pixela.get_client()
+        self.interval = interval
+        self.failed: list[dict] = []  # counts the server refused for good, with its message
+        # Counts whose request may or may not have been applied (lost connection, 5xx),
+        # to be checked by hand rather than sent twice
+        self.unconfirmed: list[dict] = []
+        self._counts: dict[tuple[str, str], int] = {}  # (graph_id, date) -> net increments
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> CounterBuffer:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def increment(self, graph_id: str, steps: int = 1) -> None:
+        """
+        :param steps: increments of 1 (int graph) or 0.01 (float graph)
+        """
+
+        self._add(graph_id, steps)
+
+    def decrement(self, graph_id: str, steps: int = 1) -> None:
+        """
+        :param steps: decrements of 1 (int graph) or 0.01 (float graph)
+        """
+
+        self._add(graph_id, -steps)
+
+    def _add(self, graph_id: str, steps: int) -> None:
+        key = (graph_id, Date.today().strftime("%Y%m%d"))
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + steps
+
+    def pending(self) -> dict[tuple[str, str], int]:
+        """
+        :return: net increments not sent yet, by (graph_id, date)
+        """
+
+        with self._lock:
+            return {key: steps for key, steps in self._counts.items() if steps}
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="pixela-counters", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Stop the thread, then send what is left
+        """
+
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self) -> dict:
+        """
+        Send the net increments of every pixel once
+
+        :return: number of pixels sent, failed for good, left for a later flush
+                 and unconfirmed (see unconfirmed)
+        """
+
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> dict:
+        summary = {"sent": 0, "failed": 0, "retry_later": 0, "unconfirmed": 0}
+        with self._lock:
+            counts, self._counts = self._counts, {}
+        for (graph_id, date), steps in counts.items():
+            if steps:
+                outcome = self._send(graph_id, date, steps)
+                summary[outcome] += 1
+        return summary
+
+    def set_credentials(self, username: str, token: str) -> dict:
+        """
+        Send the increments buffered for the current account, then switch
+        to another one; a flush never runs while the credentials change
+
+        :return: summary of the last flush with the previous credentials, see flush
+        """
+
+        with self._flush_lock:
+            summary = self._flush()
+            self.client.set_username(username)
+            self.client.set_token(token)
+        return summary
+
+    def _send(self, graph_id: str, date: str, steps: int) -> str:
+        """
+        Send the net increments of a pixel
+
+        Increments are not idempotent: once the request changing the pixel
+        was sent, the count is only buffered again if Pixela rejected it.
+        After a lost connection or a 5xx the change may have been applied,
+        so the count goes to unconfirmed instead of being sent twice.
+
+        :return: key of the flush summary the count falls into
+        """
+
+        try:
+            change, failure = self.prepare_change(graph_id, date, steps)
+        except (OSError, ValueError):
+            # Nothing was changed yet
+            self._put_back(graph_id, date, steps)
+            return "retry_later"
+        if failure is not None:
+            if RetryPolicy.is_retryable(failure):
+                self._put_back(graph_id, date, steps)
+                return "retry_later"
+            self._record(self.failed, graph_id, date, steps, failure.status_code, pixela.response_message(failure))
+            return "failed"
+
+        try:
+            response = change()
+        except OSError as error:
+            self._record(self.unconfirmed, graph_id, date, steps, 0, str(error))
+            return "unconfirmed"
+
+        if response.status_code == 200:
+            return "sent"
+        if RetryPolicy.is_rejected(response):
+            self._put_back(graph_id, date, steps)
+            return "retry_later"
+        if response.status_code >= 500:
+            self._record(self.unconfirmed, graph_id, date, steps, response.status_code,
+                         pixela.response_message(response))
+            return "unconfirmed"
+        self._record(self.failed, graph_id, date, steps, response.status_code, pixela.response_message(response))
+        return "failed"
+
+    def _put_back(self, graph_id: str, date: str, steps: int) -> None:
+        with self._lock:
+            self._counts[(graph_id, date)] = self._counts.get((graph_id, date), 0) + steps
+
+    def _record(self, entries: list[dict], graph_id: str, date: str, steps: int, status: int, message: str) -> None:
+        with self._lock:
+            entries.append({"graph_id": graph_id, "date": date, "steps": steps, "status": status, "message": message})
+
+    def prepare_change(self, graph_id: str, date: str, steps: int
+                       ) -> tuple[Callable[[], Response] | None, Response | None]:
+        """
+        Read what is needed to apply net increments to a pixel, without changing it
+
+        :return: (function sending the request that changes the pixel, None),
+                 or (None, response of the read that failed)
+        """
+
+        today = Date.today().strftime("%Y%m%d")
+        if date == today:
+            if steps == 1:
+                return partial(self.client.increment_pixel, graph_id), None
+            if steps == -1:
+                return partial(self.client.decrement_pixel, graph_id), None
+
+        definition = self.client.get_graph_def(graph_id)  # served from the graph cache most of the time
+        if definition.status_code != 200:
+            return None, definition
+        step = STEPS.get(definition.json().get("type"), STEPS["int"])
+
+        if date != today:
+            # The increment endpoints only change today's pixel
+            response = self.client.get_pixel(graph_id, date)
+            if response.status_code not in (200, 404):
+                return None, response
+            current = Decimal(response.json()["quantity"]) if response.status_code == 200 else Decimal(0)
+            return partial(self.client.update_pixel, graph_id, date, str(current + steps * step)), None
+        if steps > 0:
+            return partial(self.client.add_pixel, graph_id, str(steps * step)), None
+        return partial(self.client.subtract_pixel, graph_id, str(-steps * step)), None
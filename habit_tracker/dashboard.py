@@ -0,0 +1,138 @@
+"""
+Summary of every graph of an account in one table
+
+The graph list is fetched once, then the definition, the statistics
+and today's pixel of every graph are fetched concurrently by a bounded
+pool of workers sharing the client's keep-alive connections, so the
+dashboard takes about as long as the slowest request rather than the
+sum of all of them.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date as Date
+from typing import TYPE_CHECKING
+
+import pixela_api_handler as pixela
+
+if TYPE_CHECKING:
+    from requests import Response
+
+DEFAULT_WORKERS = pixela.DEFAULT_POOL_SIZE
+COLUMNS = [  # (key, title, width)
+    ("id", "graph", 16),
+    ("name", "name", 20),
+    ("unit", "unit", 10),
+    ("today", "today", 9),
+    ("count", "pixels", 8),
+    ("total", "total", 11),
+    ("avg", "avg", 9),
+    ("max", "max", 9),
+    ("error", "error", 0),
+]
+
+
+def response_json(response: Response) -> dict:
+    """
+    :return: body of a successful response, {} otherwise
+    """
+
+    if response.status_code != 200:
+        return {}
+    try:
+        body = response.json()
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+def fetch_dashboard(client: pixela.PixelaClient | None = None, workers: int = DEFAULT_WORKERS,
+                    today: str = "") -> list[dict]:
+    """
+    Fetch the definition, statistics and today's pixel of every graph concurrently
+
+    :param client: client of the account, pixela_api_handler's current client by default
+    :param workers: requests in flight at the same time
+    :param today: date (yyyyMMdd) of the pixel shown, today by default
+    :return: one row per graph, in the order of the graph list
+    :raises requests.HTTPError: if the graph list cannot be fetched
+    """
+
+    client = client or pixela.get_client()
+    today = today or Date.today().strftime("%Y%m%d")
+
+    response = client.get_all_graph()
+    response.raise_for_status()
+    graphs = response_json(response).get("graphs") or []
+    if not graphs:
+        return []
+
+    # Quietly: three prints per graph from several threads would be unreadable
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dashboard") as executor:
+        futures = [(graph,
+                    executor.submit(pixela.run_quietly, client.get_graph_def, graph["id"]),
+                    executor.submit(pixela.run_quietly, client.get_graph_stats, graph["id"]),
+                    executor.submit(pixela.run_quietly, client.get_pixel, graph["id"], today))
+                   for graph in graphs]
+        return [dashboard_row(*entry) for entry in futures]
+
+
+def dashboard_row(graph: dict, definition: Future, stats: Future, pixel: Future) -> dict:
+    """
+    :param graph: entry of the graph list
+    :param definition: future of the get_graph_def response
+    :param stats: future of the get_graph_stats response
+    :param pixel: future of the get_pixel response of today
+    :return: row of the dashboard, its "error" lists what could not be fetched
+    """
+
+    errors = []
+    bodies = {}
+    for name, future in (("definition", definition), ("stats", stats), ("pixel", pixel)):
+        try:
+            response = future.result()
+        except OSError as error:
+            errors.append(f"{name}: {error}")
+            bodies[name] = {}
+            continue
+        # No pixel yet today is not an error
+        if response.status_code != 200 and not (name == "pixel" and response.status_code == 404):
+            errors.append(f"{name}: {response.status_code}")
+        bodies[name] = response_json(response)
+
+    definition_body = {**graph, **bodies["definition"]}
+    stats_body = bodies["stats"]
+    return {
+        "id": graph["id"],
+        "name": definition_body.get("name", ""),
+        "unit": definition_body.get("unit", ""),
+        "type": definition_body.get("type", ""),
+        "today": bodies["pixel"].get("quantity", ""),
+        "count": stats_body.get("totalPixelsCount", ""),
+        "total": stats_body.get("totalQuantity", ""),
+        "avg": stats_body.get("avgQuantity", ""),
+        "max": stats_body.get("maxQuantity", ""),
+        "error": ", ".join(errors),
+    }
+
+
+def render_dashboard(rows: list[dict]) -> str:
+    """
+    :return: rows as a text table, one line per graph
+    """
+
+    if not rows:
+        return "No graph yet."
+
+    def cell(value, width: int) -> str:
+        text = str(value)
+        if width and len(text) > width - 1:
+            text = text[:width - 2] + "…"
+        return f"{text:<{width}}" if width else text
+
+    lines = ["".join(cell(title, width) for _, title, width in COLUMNS).rstrip()]
+    lines.append("-" * len(lines[0]))
+    for row in rows:
+        lines.append("".join(cell(row[key], width) for key, _, width in COLUMNS).rstrip())
+    return "\n".join(lines)
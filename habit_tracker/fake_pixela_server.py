@@ -0,0 +1,555 @@
+"""
+Local stand-in for the Pixela API, for offline testing and benchmarking
+
+Implements the endpoints used by pixela_api_handler.py in memory,
+with configurable latency, random rejections (like the ones Pixela
+sends to non-supporter accounts) and injected server errors.
+
+Run it in-process:
+
+    with FakePixelaServer(rejection_rate=0.25) as server:
+        pixela.set_api_prefix(server.url)
+        ...
+
+or standalone:
+
+    python fake_pixela_server.py --port 8000 --latency 0.05
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import date as Date
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+REJECTED_MESSAGE = ("Please retry this request. Your request for some APIs will be rejected "
+                    "25% of the time because you are not a Pixela supporter.")
+
+USER_PATH = re.compile(r"^/v1/users/(?P<username>[^/]+)$")
+PROFILE_PATH = re.compile(r"^/@(?P<username>[^/]+)$")
+GRAPHS_PATH = re.compile(r"^/v1/users/(?P<username>[^/]+)/graphs$")
+GRAPH_PATH = re.compile(r"^/v1/users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/.]+)$")
+GRAPH_HTML_PATH = re.compile(r"^/v1/users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/.]+)\.html$")
+GRAPH_DEF_PATH = re.compile(r"^/v1/users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/.]+)/graph-def$")
+PIXELS_PATH = re.compile(r"^/v1/users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/.]+)/pixels$")
+STATS_PATH = re.compile(r"^/v1/users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/.]+)/stats$")
+TODAY_PIXEL_PATH = re.compile(r"^/v1/users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/.]+)/"
+                              r"(?P<action>increment|decrement|add|subtract)$")
+BATCH_LIMIT = 1000  # pixels accepted by one request of the batch pixels endpoint
+PIXEL_PATH = re.compile(r"^/v1/users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/.]+)/(?P<date>\d{8})$")
+
+
+class PixelaState:
+    """
+    In-memory users, graphs and pixels of the stand-in server
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.users: dict[str, dict] = {}  # username -> {"token", "profile", "graphs", "supporter"}
+
+    def user(self, username: str, token: str | None) -> dict | None:
+        """
+        :return: the user if the token is theirs
+        """
+
+        user = self.users.get(username)
+        if user is None or user["token"] != token:
+            return None
+        return user
+
+
+def new_graph_definition(body: dict) -> dict:
+    """
+    :param body: body of a create graph request
+    :return: graph definition as returned by graph-def
+    """
+
+    return {
+        "id": body["id"],
+        "name": body.get("name", ""),
+        "unit": body.get("unit", ""),
+        "type": body["type"],
+        "color": body.get("color", "shibafu"),
+        "timezone": body.get("timezone", "UTC"),
+        "purgeCacheURLs": [],
+        "selfSufficient": "none",
+        "isSecret": False,
+        "publishOptionalData": False,
+    }
+
+
+class FakePixelaServer:
+    """
+    Threaded HTTP server answering like pixe.la
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 rejection_rate: float = 0.0, error_rate: float = 0.0, seed: int | None = None) -> None:
+        """
+        :param host: address to listen on
+        :param port: port to listen on, a free one if 0
+        :param latency: seconds added before every response
+        :param rejection_rate: share of requests rejected with a retryable 503
+        :param error_rate: share of requests failing with a 500
+        :param seed: seed of the random rejections and errors
+        """
+
+        self.latency = latency
+        self.rejection_rate = rejection_rate
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.state = PixelaState()
+        self.request_count = 0
+        self.first_request_at: float | None = None  # unix time, comparable across processes
+
+        handler = type("Handler", (PixelaRequestHandler,), {"server_config": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakePixelaServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-pixela", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # __________SEEDING__________
+    # Fill the server's state directly, without going through HTTP
+
+    def add_user(self, username: str, token: str, supporter: bool = True) -> None:
+        """
+        :param supporter: the user can use the endpoints reserved to Pixela supporters
+        """
+
+        with self.state.lock:
+            self.state.users[username] = {"token": token, "profile": {}, "graphs": {}, "supporter": supporter}
+
+    def add_graph(self, username: str, graph_id: str, data_type: str = "int", name: str = "") -> None:
+        with self.state.lock:
+            self.state.users[username]["graphs"][graph_id] = {
+                "definition": new_graph_definition({"id": graph_id, "name": name or graph_id, "type": data_type}),
+                "pixels": {},
+            }
+
+    def add_pixels(self, username: str, graph_id: str, pixels: dict[str, str]) -> None:
+        """
+        :param pixels: quantities by date (yyyyMMdd)
+        """
+
+        with self.state.lock:
+            self.state.users[username]["graphs"][graph_id]["pixels"].update(pixels)
+
+    def __enter__(self) -> "FakePixelaServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+class PixelaRequestHandler(BaseHTTPRequestHandler):
+    """
+    Route a request to the matching endpoint
+    """
+
+    server_config: FakePixelaServer
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real server
+    # Headers and body go out in separate sends; with Nagle's algorithm the body waits
+    # for the client's delayed ACK, adding ~40 ms to every keep-alive request
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.handle_request("GET")
+
+    def do_POST(self) -> None:
+        self.handle_request("POST")
+
+    def do_PUT(self) -> None:
+        self.handle_request("PUT")
+
+    def do_DELETE(self) -> None:
+        self.handle_request("DELETE")
+
+    # __________RESPONSES__________
+
+    def send_json(self, status: int, body: dict) -> None:
+        self.send_body(status, json.dumps(body).encode(), "application/json")
+
+    def send_body(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_rendering(self, body: bytes, content_type: str) -> None:
+        """
+        Send a graph rendering with an ETag, or an empty 304 if the client already has it
+        """
+
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def success(self) -> None:
+        self.send_json(200, {"message": "Success.", "isSuccess": True})
+
+    def failure(self, status: int, message: str) -> None:
+        self.send_json(status, {"message": message, "isSuccess": False})
+
+    # __________ROUTING__________
+
+    def handle_request(self, method: str) -> None:
+        config = self.server_config
+        split = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(split.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+        except json.decoder.JSONDecodeError:
+            self.failure(400, "Invalid JSON body.")
+            return
+
+        with config.state.lock:
+            config.request_count += 1
+            if config.first_request_at is None:
+                config.first_request_at = time.time()
+        if config.latency:
+            time.sleep(config.latency)
+        if config.rejection_rate and config.random.random() < config.rejection_rate:
+            self.send_json(503, {"message": REJECTED_MESSAGE, "isSuccess": False, "isRejected": True})
+            return
+        if config.error_rate and config.random.random() < config.error_rate:
+            self.failure(500, "Injected server error.")
+            return
+
+        token = self.headers.get("X-USER-TOKEN")
+        path = split.path
+        routes = (
+            ("POST", re.compile(r"^/v1/users$"), self.create_user),
+            ("PUT", USER_PATH, self.update_token),
+            ("DELETE", USER_PATH, self.delete_user),
+            ("GET", PROFILE_PATH, self.view_user_profile),
+            ("PUT", PROFILE_PATH, self.update_user_profile),
+            ("POST", GRAPHS_PATH, self.create_graph),
+            ("GET", GRAPHS_PATH, self.get_all_graph),
+            ("GET", GRAPH_DEF_PATH, self.get_graph_def),
+            ("DELETE", GRAPH_PATH, self.delete_graph),
+            ("GET", GRAPH_HTML_PATH, self.display_graph),
+            ("GET", GRAPH_PATH, self.get_graph_svg),
+            ("GET", PIXELS_PATH, self.get_graph_pixels),
+            ("GET", STATS_PATH, self.get_graph_stats),
+            ("POST", GRAPH_PATH, self.post_pixel),
+            ("POST", PIXELS_PATH, self.post_pixels_batch),
+            ("GET", PIXEL_PATH, self.get_pixel),
+            ("PUT", PIXEL_PATH, self.update_pixel),
+            ("PUT", TODAY_PIXEL_PATH, self.change_today_pixel),
+            ("DELETE", PIXEL_PATH, self.delete_pixel),
+        )
+        for route_method, pattern, endpoint in routes:
+            match = pattern.match(path)
+            if match and route_method == method:
+                with config.state.lock:
+                    endpoint(token=token, body=body, query=query, **match.groupdict())
+                return
+        self.failure(404, "Not found.")
+
+    def authorized_graph(self, username: str, graph_id: str, token: str | None) -> dict | None:
+        """
+        :return: the graph, None after sending an error response
+        """
+
+        user = self.server_config.state.user(username, token)
+        if user is None:
+            self.failure(401, f"User `{username}` does not exist or the token is wrong.")
+            return None
+        graph = user["graphs"].get(graph_id)
+        if graph is None:
+            self.failure(404, f"Specified graphID `{graph_id}` is not exist.")
+            return None
+        return graph
+
+    # __________USER__________
+
+    def create_user(self, token: str | None, body: dict, query: dict) -> None:
+        username = body.get("username", "")
+        new_token = body.get("token", "")
+        if body.get("agreeTermsOfService") != "yes" or body.get("notMinor") != "yes":
+            self.failure(400, "You must agree to the terms of service.")
+        elif not re.fullmatch(r"[a-z][a-z0-9-]{1,32}", username):
+            self.failure(400, "Invalid username.")
+        elif not 8 <= len(new_token) <= 128:
+            self.failure(400, "Invalid token.")
+        elif username in self.server_config.state.users:
+            self.failure(409, "This user already exist.")
+        else:
+            self.server_config.state.users[username] = {"token": new_token, "profile": {}, "graphs": {},
+                                                        "supporter": False}
+            self.success()
+
+    def update_token(self, username: str, token: str | None, body: dict, query: dict) -> None:
+        user = self.server_config.state.user(username, token)
+        if user is None:
+            self.failure(401, f"User `{username}` does not exist or the token is wrong.")
+        elif not 8 <= len(body.get("newToken", "")) <= 128:
+            self.failure(400, "Invalid token.")
+        else:
+            user["token"] = body["newToken"]
+            self.success()
+
+    def delete_user(self, username: str, token: str | None, body: dict, query: dict) -> None:
+        if self.server_config.state.user(username, token) is None:
+            self.failure(401, f"User `{username}` does not exist or the token is wrong.")
+        else:
+            del self.server_config.state.users[username]
+            self.success()
+
+    # __________USER PROFILE__________
+
+    def view_user_profile(self, username: str, token: str | None, body: dict, query: dict) -> None:
+        user = self.server_config.state.users.get(username)
+        if user is None:
+            self.failure(404, f"User `{username}` does not exist.")
+            return
+        name = user["profile"].get("displayName", username)
+        page = f"<html><head><title>{name}</title></head><body><h1>@{username}</h1></body></html>"
+        self.send_body(200, page.encode(), "text/html; charset=utf-8")
+
+    def update_user_profile(self, username: str, token: str | None, body: dict, query: dict) -> None:
+        user = self.server_config.state.user(username, token)
+        if user is None:
+            self.failure(401, f"User `{username}` does not exist or the token is wrong.")
+        else:
+            user["profile"].update(body)
+            self.success()
+
+    # __________GRAPH__________
+
+    def create_graph(self, username: str, token: str | None, body: dict, query: dict) -> None:
+        user = self.server_config.state.user(username, token)
+        if user is None:
+            self.failure(401, f"User `{username}` does not exist or the token is wrong.")
+        elif not re.fullmatch(r"[a-z][a-z0-9-]{1,16}", body.get("id", "")):
+            self.failure(400, "Invalid graphID.")
+        elif body.get("type") not in ("int", "float"):
+            self.failure(400, "Invalid type.")
+        elif body["id"] in user["graphs"]:
+            self.failure(409, "This graphID already exist.")
+        else:
+            user["graphs"][body["id"]] = {"definition": new_graph_definition(body), "pixels": {}}
+            self.success()
+
+    def get_all_graph(self, username: str, token: str | None, body: dict, query: dict) -> None:
+        user = self.server_config.state.user(username, token)
+        if user is None:
+            self.failure(401, f"User `{username}` does not exist or the token is wrong.")
+        else:
+            self.send_json(200, {"graphs": [graph["definition"] for graph in user["graphs"].values()]})
+
+    def get_graph_def(self, username: str, graph_id: str, token: str | None, body: dict, query: dict) -> None:
+        graph = self.authorized_graph(username, graph_id, token)
+        if graph is not None:
+            self.send_json(200, graph["definition"])
+
+    def delete_graph(self, username: str, graph_id: str, token: str | None, body: dict, query: dict) -> None:
+        if self.authorized_graph(username, graph_id, token) is not None:
+            del self.server_config.state.users[username]["graphs"][graph_id]
+            self.success()
+
+    def display_graph(self, username: str, graph_id: str, token: str | None, body: dict, query: dict) -> None:
+        graph = self.authorized_graph(username, graph_id, token)
+        if graph is None:
+            return
+        cells = "".join(f'<rect data-date="{date}" data-count="{quantity}"/>'
+                        for date, quantity in sorted(graph["pixels"].items()))
+        page = (f"<html><head><title>{graph['definition']['name']}</title></head>"
+                f"<body><svg>{cells}</svg></body></html>")
+        self.send_rendering(page.encode(), "text/html; charset=utf-8")
+
+    def get_graph_svg(self, username: str, graph_id: str, token: str | None, body: dict, query: dict) -> None:
+        # Public like on pixe.la: no token needed
+        graph = self.server_config.state.users.get(username, {}).get("graphs", {}).get(graph_id)
+        if graph is None:
+            self.failure(404, f"Specified graphID `{graph_id}` is not exist.")
+            return
+        date_to = query.get("date", "")
+        cells = "".join(f'<rect data-date="{date}" data-count="{quantity}"/>'
+                        for date, quantity in sorted(graph["pixels"].items()) if not date_to or date <= date_to)
+        self.send_rendering(f'<svg xmlns="http://www.w3.org/2000/svg">{cells}</svg>'.encode(), "image/svg+xml")
+
+    def get_graph_pixels(self, username: str, graph_id: str, token: str | None, body: dict, query: dict) -> None:
+        graph = self.authorized_graph(username, graph_id, token)
+        if graph is None:
+            return
+        date_from = query.get("from", "")
+        date_to = query.get("to", "")
+        dates = [date for date in sorted(graph["pixels"])
+                 if (not date_from or date >= date_from) and (not date_to or date <= date_to)]
+        if query.get("withBody") == "true":
+            pixels = [{"date": date, "quantity": graph["pixels"][date]} for date in dates]
+        else:
+            pixels = dates
+        self.send_json(200, {"pixels": pixels})
+
+    def get_graph_stats(self, username: str, graph_id: str, token: str | None, body: dict, query: dict) -> None:
+        graph = self.authorized_graph(username, graph_id, token)
+        if graph is None:
+            return
+        pixels = graph["pixels"]
+        number = float if graph["definition"]["type"] == "float" else int
+        quantities = [number(quantity) for quantity in pixels.values()]
+        today = Date.today().strftime("%Y%m%d")
+        stats = {
+            "totalPixelsCount": len(quantities),
+            "maxQuantity": max(quantities, default=0),
+            "minQuantity": min(quantities, default=0),
+            "totalQuantity": number(math.fsum(quantities)),
+            "avgQuantity": round(math.fsum(quantities) / len(quantities), 2) if quantities else 0,
+            "todaysQuantity": number(pixels.get(today, 0)),
+        }
+        if quantities:
+            stats["maxDate"] = max(sorted(pixels), key=lambda date: number(pixels[date]))
+            stats["minDate"] = min(sorted(pixels), key=lambda date: number(pixels[date]))
+        self.send_json(200, stats)
+
+    # __________PIXEL__________
+
+    def valid_quantity(self, graph: dict, quantity) -> bool:
+        pattern = r"-?\d+" if graph["definition"]["type"] == "int" else r"-?\d+(\.\d+)?"
+        return isinstance(quantity, str) and re.fullmatch(pattern, quantity) is not None
+
+    def post_pixel(self, username: str, graph_id: str, token: str | None, body: dict, query: dict) -> None:
+        graph = self.authorized_graph(username, graph_id, token)
+        if graph is None:
+            return
+        if not re.fullmatch(r"\d{8}", str(body.get("date", ""))):
+            self.failure(400, "Invalid date.")
+        elif not self.valid_quantity(graph, body.get("quantity")):
+            self.failure(400, "Invalid quantity.")
+        else:
+            graph["pixels"][body["date"]] = body["quantity"]
+            self.success()
+
+    def post_pixels_batch(self, username: str, graph_id: str, token: str | None, body: list,
+                          query: dict) -> None:
+        graph = self.authorized_graph(username, graph_id, token)
+        if graph is None:
+            return
+        if not self.server_config.state.users[username].get("supporter"):
+            self.failure(403, "This API is only available to Pixela supporters.")
+        elif not isinstance(body, list) or not 1 <= len(body) <= BATCH_LIMIT:
+            self.failure(400, f"The body must be a list of 1 to {BATCH_LIMIT} pixels.")
+        elif not all(isinstance(pixel, dict) and re.fullmatch(r"\d{8}", str(pixel.get("date", "")))
+                     and self.valid_quantity(graph, pixel.get("quantity")) for pixel in body):
+            self.failure(400, "Invalid date or quantity.")
+        else:
+            # All or nothing, like the single pixel endpoint
+            for pixel in body:
+                graph["pixels"][pixel["date"]] = pixel["quantity"]
+            self.success()
+
+    def get_pixel(self, username: str, graph_id: str, date: str, token: str | None, body: dict,
+                  query: dict) -> None:
+        graph = self.authorized_graph(username, graph_id, token)
+        if graph is None:
+            return
+        if date not in graph["pixels"]:
+            self.failure(404, "Specified pixel not found.")
+        else:
+            self.send_json(200, {"quantity": graph["pixels"][date]})
+
+    def update_pixel(self, username: str, graph_id: str, date: str, token: str | None, body: dict,
+                     query: dict) -> None:
+        graph = self.authorized_graph(username, graph_id, token)
+        if graph is None:
+            return
+        if not self.valid_quantity(graph, body.get("quantity")):
+            self.failure(400, "Invalid quantity.")
+        else:
+            graph["pixels"][date] = body["quantity"]
+            self.success()
+
+    def change_today_pixel(self, username: str, graph_id: str, action: str, token: str | None, body: dict,
+                           query: dict) -> None:
+        graph = self.authorized_graph(username, graph_id, token)
+        if graph is None:
+            return
+        if action in ("add", "subtract"):
+            if not self.valid_quantity(graph, body.get("quantity")):
+                self.failure(400, "Invalid quantity.")
+                return
+            change = Decimal(body["quantity"])
+        else:
+            change = Decimal(1) if graph["definition"]["type"] == "int" else Decimal("0.01")
+        if action in ("decrement", "subtract"):
+            change = -change
+
+        today = Date.today().strftime("%Y%m%d")
+        graph["pixels"][today] = str(Decimal(graph["pixels"].get(today, "0")) + change)
+        self.success()
+
+    def delete_pixel(self, username: str, graph_id: str, date: str, token: str | None, body: dict,
+                     query: dict) -> None:
+        graph = self.authorized_graph(username, graph_id, token)
+        if graph is None:
+            return
+        if date not in graph["pixels"]:
+            self.failure(404, "Specified pixel not found.")
+        else:
+            del graph["pixels"][date]
+            self.success()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the Pixela API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--rejection-rate", type=float, default=0.0, help="share of requests rejected with 503")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 500")
+    args = parser.parse_args()
+
+    server = FakePixelaServer(args.host, args.port, args.latency, args.rejection_rate, args.error_rate)
+    print(f"Fake Pixela server on {server.url}")
+    print(f"Point the client at it with PIXELA_API_PREFIX={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Compute graph statistics locally from cached pixels
+
+Gives the same fields as the /stats endpoint of Pixela, plus
+percentiles, without any request. Pixels are read once into typed
+arrays, so that the aggregates run in C rather than over Python
+objects, and the pixels of every graph of a user are read from
+the cache in a single query.
+"""
+
+import math
+from array import array
+from datetime import date as Date
+from itertools import groupby
+from typing import Iterable
+
+from pixel_cache import PixelCache
+
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_quantities: array, percent: float) -> float:
+    """
+    Percentile with linear interpolation between the closest ranks
+
+    :param sorted_quantities: quantities sorted in ascending order
+    """
+
+    if not sorted_quantities:
+        return 0.0
+    position = (len(sorted_quantities) - 1) * percent / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    fraction = position - lower
+    return sorted_quantities[lower] + (sorted_quantities[upper] - sorted_quantities[lower]) * fraction
+
+
+def compute_stats(dates: array, quantities: array, data_type: str = "int", today: str = "",
+                  percentiles: tuple[float, ...] = DEFAULT_PERCENTILES) -> dict:
+    """
+    Statistics of a graph's pixels, shaped like the /stats response
+
+    :param dates: dates of the pixels as yyyyMMdd integers, ascending
+    :param quantities: quantities of the pixels, in the same order
+    :param data_type: "int" or "float", type of the graph
+    :param today: date (yyyyMMdd) of todaysQuantity, today by default
+    :param percentiles: percentiles added under "percentiles"
+    """
+
+    today = today or Date.today().strftime("%Y%m%d")
+    number = int if data_type == "int" else float
+    count = len(quantities)
+
+    if count == 0:
+        return {
+            "totalPixelsCount": 0,
+            "maxQuantity": number(0),
+            "minQuantity": number(0),
+            "totalQuantity": number(0),
+            "avgQuantity": 0,
+            "todaysQuantity": number(0),
+            "percentiles": {f"p{percent:g}": 0.0 for percent in percentiles},
+        }
+
+    total = math.fsum(quantities)
+    max_quantity = max(quantities)
+    min_quantity = min(quantities)
+    sorted_quantities = array("d", sorted(quantities))
+
+    try:
+        todays_quantity = quantities[dates.index(int(today))]
+    except ValueError:
+        todays_quantity = 0
+
+    # index() returns the first match, i.e. the earliest date on ties, like Pixela
+    return {
+        "totalPixelsCount": count,
+        "maxQuantity": number(max_quantity),
+        "minQuantity": number(min_quantity),
+        "totalQuantity": number(total),
+        "avgQuantity": round(total / count, 2),
+        "todaysQuantity": number(todays_quantity),
+        "maxDate": str(dates[quantities.index(max_quantity)]),
+        "minDate": str(dates[quantities.index(min_quantity)]),
+        "percentiles": {f"p{percent:g}": percentile(sorted_quantities, percent) for percent in percentiles},
+    }
+
+
+def stats_from_pixels(pixels: Iterable[tuple[str, str]], data_type: str = "", today: str = "",
+                      percentiles: tuple[float, ...] = DEFAULT_PERCENTILES) -> dict:
+    """
+    Statistics of a graph's pixels, shaped like the /stats response
+
+    The pixels are consumed in a single pass into two typed arrays,
+    so they can come straight from a streamed response without
+    keeping a Python object per pixel.
+
+    :param pixels: (date yyyyMMdd, quantity as sent to Pixela) pairs, dates ascending
+    :param data_type: "int" or "float", type of the graph, "float" if empty and any quantity has a decimal point
+    :param today: date (yyyyMMdd) of todaysQuantity, today by default
+    :param percentiles: percentiles added under "percentiles"
+    """
+
+    dates = array("l")
+    quantities = array("d")
+    has_decimals = False
+    for date, quantity in pixels:
+        dates.append(int(date))
+        quantities.append(float(quantity))
+        has_decimals = has_decimals or "." in quantity
+
+    data_type = data_type or ("float" if has_decimals else "int")
+    return compute_stats(dates, quantities, data_type, today, percentiles)
+
+
+def graph_stats(cache: PixelCache, username: str, graph_id: str, data_type: str = "",
+                today: str = "") -> dict:
+    """
+    Statistics of one graph from the pixel cache
+
+    :param data_type: "int" or "float", guessed from the quantities if empty
+    """
+
+    pixels = cache.get_pixels(username, graph_id)
+    return stats_from_pixels(((pixel["date"], pixel["quantity"]) for pixel in pixels), data_type, today)
+
+
+def all_graph_stats(cache: PixelCache, username: str, data_types: dict[str, str] | None = None,
+                    today: str = "") -> dict[str, dict]:
+    """
+    Statistics of every cached graph of a user, in one pass over the cache
+
+    :param data_types: "int" or "float" by graph ID, guessed from the quantities when missing
+    :return: statistics by graph ID
+    """
+
+    data_types = data_types or {}
+    today = today or Date.today().strftime("%Y%m%d")
+    stats = {}
+    for graph_id, rows in groupby(cache.get_user_pixels(username), key=lambda row: row[0]):
+        pixels = ((date, quantity) for _, date, quantity in rows)
+        stats[graph_id] = stats_from_pixels(pixels, data_types.get(graph_id, ""), today)
+    return stats
+
+
+def stream_graph_stats(pixels: Iterable[dict], data_type: str = "", today: str = "") -> dict:
+    """
+    Statistics of pixels streamed from Pixela, e.g. by pixela_api_handler.iter_graph_pixels
+
+    :param pixels: {"date", "quantity"} dicts, dates ascending
+    """
+
+    return stats_from_pixels(((pixel["date"], pixel["quantity"]) for pixel in pixels), data_type, today)
+
@@ -0,0 +1,158 @@
+"""
+Render a graph as a contribution heatmap from local pixels
+
+One block of 53 weeks by 7 days is drawn per calendar year, like the
+graphs of pixe.la, either as an SVG image or as colored blocks in the
+terminal. Only the pixel cache is read, so no request is sent; the
+pixels are bucketed by day ordinal in one pass, which keeps a graph
+of several years well under 100 ms.
+"""
+
+import math
+from datetime import date as Date
+from typing import Iterable
+from xml.sax.saxutils import escape
+
+# Colors of the 4 levels of each graph color of Pixela, lightest first
+PALETTES = {
+    "shibafu": ("#9be9a8", "#40c463", "#30a14e", "#216e39"),
+    "momiji": ("#ffc1b3", "#ff8a75", "#e8503a", "#b22a16"),
+    "sora": ("#b3d8ff", "#6cb4ff", "#2f8cf0", "#1a5fb4"),
+    "ichou": ("#fff2a8", "#ffde59", "#f5c400", "#c79a00"),
+    "ajisai": ("#e1c4ff", "#c08cff", "#9b59f0", "#6a2cb8"),
+    "kuro": ("#c8c8c8", "#969696", "#5a5a5a", "#222222"),
+}
+EMPTY_COLOR = "#ebedf0"
+CELL = 11  # size of a day in the SVG, in pixels
+GAP = 2  # space between two days in the SVG, in pixels
+MONTHS = "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split()
+
+
+def parse_date(date: str) -> Date:
+    """
+    :param date: date in the yyyyMMdd format of Pixela
+    """
+
+    return Date(int(date[:4]), int(date[4:6]), int(date[6:8]))
+
+
+def pixel_levels(pixels: Iterable[tuple[str, str]]) -> tuple[dict[int, int], int, int]:
+    """
+    Bucket quantities into the 0-4 color levels of the heatmap
+
+    :param pixels: (date yyyyMMdd, quantity) pairs
+    :return: level by day ordinal, and the first and last years with a pixel
+    """
+
+    quantities = {}
+    for date, quantity in pixels:
+        quantities[parse_date(date).toordinal()] = float(quantity)
+    if not quantities:
+        today = Date.today().year
+        return {}, today, today
+
+    highest = max(quantities.values())
+    levels = {ordinal: (min(4, math.ceil(quantity / highest * 4)) if quantity > 0 and highest > 0 else 0)
+              for ordinal, quantity in quantities.items()}
+    return levels, Date.fromordinal(min(quantities)).year, Date.fromordinal(max(quantities)).year
+
+
+def year_cells(year: int) -> tuple[int, int]:
+    """
+    :return: ordinal of the Sunday starting the first week of the year, and the number of weeks
+    """
+
+    first = Date(year, 1, 1).toordinal()
+    last = Date(year, 12, 31).toordinal()
+    start = first - (Date.fromordinal(first).weekday() + 1) % 7
+    return start, (last - start) // 7 + 1
+
+
+def render_svg(pixels: Iterable[tuple[str, str]], color: str = "shibafu", title: str = "",
+               years: Iterable[int] | None = None) -> str:
+    """
+    :param pixels: (date yyyyMMdd, quantity) pairs
+    :param color: graph color of Pixela, e.g. "shibafu"
+    :param title: text drawn above the first year
+    :param years: years drawn, every year from the first to the last pixel by default
+    :return: SVG document
+    """
+
+    levels, first_year, last_year = pixel_levels(pixels)
+    years = list(years) if years is not None else list(range(last_year, first_year - 1, -1))
+    colors = (EMPTY_COLOR, *PALETTES.get(color, PALETTES["shibafu"]))
+    step = CELL + GAP
+    left = 30
+    block_height = 7 * step + 30
+
+    parts = []
+    top = 24 if title else 0
+    if title:
+        parts.append(f'<text x="0" y="14" font-size="14">{escape(title)}</text>')
+    for index, year in enumerate(years):
+        y0 = top + index * block_height
+        parts.append(f'<text x="0" y="{y0 + 12}" font-size="11">{year}</text>')
+        start, weeks = year_cells(year)
+        first = Date(year, 1, 1).toordinal()
+        last = Date(year, 12, 31).toordinal()
+        for month in range(1, 13):
+            week = (Date(year, month, 1).toordinal() - start) // 7
+            parts.append(f'<text x="{left + week * step}" y="{y0 + 12}" font-size="9">{MONTHS[month - 1]}</text>')
+        for ordinal in range(first, last + 1):
+            offset = ordinal - start
+            parts.append(f'<rect x="{left + offset // 7 * step}" y="{y0 + 16 + offset % 7 * step}" '
+                         f'width="{CELL}" height="{CELL}" rx="2" fill="{colors[levels.get(ordinal, 0)]}"/>')
+
+    width = left + 54 * step
+    height = top + len(years) * block_height
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'font-family="sans-serif">{"".join(parts)}</svg>')
+
+
+def write_svg(path: str, pixels: Iterable[tuple[str, str]], color: str = "shibafu", title: str = "") -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(render_svg(pixels, color, title))
+
+
+def ansi_color(hex_color: str) -> str:
+    red, green, blue = (int(hex_color[i:i + 2], 16) for i in (1, 3, 5))
+    return f"\033[38;2;{red};{green};{blue}m"
+
+
+def render_ansi(pixels: Iterable[tuple[str, str]], color: str = "shibafu",
+                years: Iterable[int] | None = None) -> str:
+    """
+    :param pixels: (date yyyyMMdd, quantity) pairs
+    :param color: graph color of Pixela, e.g. "shibafu"
+    :param years: years drawn, every year from the first to the last pixel by default
+    :return: heatmap as lines of 24-bit colored blocks, one block per day
+    """
+
+    levels, first_year, last_year = pixel_levels(pixels)
+    years = list(years) if years is not None else list(range(last_year, first_year - 1, -1))
+    blocks = [ansi_color(hex_color) + "■" for hex_color in (EMPTY_COLOR, *PALETTES.get(color, PALETTES["shibafu"]))]
+    reset = "\033[0m"
+
+    lines = []
+    for year in years:
+        start, weeks = year_cells(year)
+        first = Date(year, 1, 1).toordinal()
+        last = Date(year, 12, 31).toordinal()
+
+        header = [" "] * weeks
+        for month in range(1, 13):
+            week = (Date(year, month, 1).toordinal() - start) // 7
+            header[week:week + 3] = MONTHS[month - 1]
+        lines.append(f"{year} " + "".join(header[:weeks]).rstrip())
+
+        for weekday, label in enumerate(("    ", "Mon ", "    ", "Wed ", "    ", "Fri ", "    ")):
+            row = []
+            for week in range(weeks):
+                ordinal = start + week * 7 + weekday
+                row.append(blocks[levels.get(ordinal, 0)] if first <= ordinal <= last else " ")
+            lines.append(f"{label} " + "".join(row) + reset)
+        lines.append("")
+
+    legend = " ".join(blocks) + reset
+    lines.append(f"Less {legend} More")
+    return "\n".join(lines)
@@ -0,0 +1,148 @@
+"""
+Per-request timing events and latency histograms
+
+PixelaClient emits a RequestEvent for every call to an endpoint.
+Listeners can subscribe to the events, and an in-memory latency
+histogram is kept per endpoint so it can be dumped at any time.
+"""
+
+import bisect
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+# Upper bounds of the histogram buckets in seconds, the last bucket is unbounded
+BUCKET_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Time spent opening connections by the current thread, reset before every call
+_connect_timer = threading.local()
+
+
+@dataclass
+class RequestEvent:
+    """
+    Timings and outcome of one endpoint call, retries included
+    """
+
+    endpoint: str
+    method: str
+    graph_id: str = ""
+    status: int | None = None  # None when no response was received
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    connect: float = 0.0  # seconds opening connections (DNS, TCP and TLS), 0 on a reused connection
+    ttfb: float = 0.0  # seconds from sending the last attempt to its response headers
+    total: float = 0.0  # seconds of the whole call
+    retries: int = 0
+    error: str = ""
+    timestamp: float = field(default_factory=time.time)
+
+
+class LatencyHistogram:
+    """
+    Counts of latencies in fixed buckets
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent: float) -> float:
+        """
+        :return: upper bound of the bucket holding the percentile,
+                 capped at the largest latency seen, in seconds
+        """
+
+        if self.count == 0:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(BUCKET_BOUNDS[index], self.max) if index < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+
+class Instrumentation:
+    """
+    Dispatches request events to listeners and keeps a histogram per endpoint
+    """
+
+    def __init__(self) -> None:
+        self._listeners: list[Callable[[RequestEvent], None]] = []
+        self._lock = threading.Lock()
+        self.histograms: dict[str, LatencyHistogram] = {}
+        self.errors: dict[str, int] = {}
+        self.retries: dict[str, int] = {}
+
+    def subscribe(self, listener: Callable[[RequestEvent], None]) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[RequestEvent], None]) -> None:
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def emit(self, event: RequestEvent) -> None:
+        with self._lock:
+            histogram = self.histograms.setdefault(event.endpoint, LatencyHistogram())
+            histogram.add(event.total)
+            if event.status not in (200, 304):  # 304: a cached rendering is still valid
+                self.errors[event.endpoint] = self.errors.get(event.endpoint, 0) + 1
+            self.retries[event.endpoint] = self.retries.get(event.endpoint, 0) + event.retries
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(event)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.errors.clear()
+            self.retries.clear()
+
+    def dump(self) -> str:
+        """
+        :return: table of calls, errors, retries and latencies per endpoint
+        """
+
+        lines = [f"{'endpoint':<22}{'calls':>7}{'errors':>8}{'retries':>9}"
+                 f"{'avg ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        with self._lock:
+            for endpoint, histogram in sorted(self.histograms.items()):
+                lines.append(
+                    f"{endpoint:<22}{histogram.count:>7}{self.errors.get(endpoint, 0):>8}"
+                    f"{self.retries.get(endpoint, 0):>9}"
+                    f"{histogram.total / histogram.count * 1000:>10.1f}"
+                    f"{histogram.percentile(50) * 1000:>10.1f}"
+                    f"{histogram.percentile(95) * 1000:>10.1f}"
+                    f"{histogram.percentile(99) * 1000:>10.1f}"
+                    f"{histogram.max * 1000:>10.1f}")
+        if len(lines) == 1:
+            lines.append("No request sent yet.")
+        return "\n".join(lines)
+
+
+# __________CONNECTION TIMING__________
+
+def start_connect_timer() -> None:
+    _connect_timer.seconds = 0.0
+
+
+def connect_time() -> float:
+    return getattr(_connect_timer, "seconds", 0.0)
+
+
+def add_connect_time(seconds: float) -> None:
+    _connect_timer.seconds = connect_time() + seconds
@@ -1,14 +1,19 @@
+import sys
 import menu
+import pixela_api_handler as pixela
 
 def main():
     """
     Main function
+
+    Run with --stats to print the latency of every endpoint used on exit
     """
 
     menu.log_in()
+    menu.run()
 
-    while True:
-        menu.draw_main_menu()
+    if "--stats" in sys.argv[1:]:
+        print(pixela.get_client().instrumentation.dump())
 
 
 if __name__ == "__main__":
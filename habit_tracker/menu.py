@@ -1,25 +1,70 @@
 """
 Define menu and functionality of the program
+
+Menus form a state machine: every screen is an entry of the
+SCREENS table, and run() loops over them iteratively, so
+navigating back and forth never grows the call stack.
+
+Modules only needed by some actions (requests, json, bulk_import,
+graph_stats, pixel_stream) are imported by those actions, so the
+first screen shows up without waiting for them.
 """
 
+from __future__ import annotations
+
+import counter_buffer
 import pixela_api_handler as pixela
-import json
+import write_queue
 from os import system
-from requests import Response
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from requests import Response
+
+# Queue of pixel changes and its background sender, set up by run()
+pixel_queue: write_queue.WriteQueue | None = None
+flusher: write_queue.WriteQueueFlusher | None = None
+# Increments of today's pixels, sent in the background with a client of their own
+counters: counter_buffer.CounterBuffer | None = None
 
 
 # __________Utility functions__________
 
+def print_json(data) -> None:
+    import json
+
+    print(json.dumps(data, indent=2, default=str))
+
+
 def print_response(response: Response) -> None:
     """
     Print response in pretty JSON format
     """
 
     try:
-        print(json.dumps(response.json(), indent=2, default=str))
-    except json.decoder.JSONDecodeError:
+        print_json(response.json())
+    except ValueError:  # body is not JSON
         print(response.text)
 
+    retry_count = getattr(response, "retry_count", 0)
+    if retry_count:
+        print(f"(retried {retry_count} times)")
+
+
+def print_result(response: Response) -> None:
+    """
+    Print whether the request succeeded and its response,
+    then wait for the user
+    """
+
+    if response.status_code == 200:
+        print("\nSUCCESS")
+    else:
+        print("\nFAILED")
+
+    print_response(response)
+    input("\nPress Enter to continue…")
+
 
 def draw_header() -> None:
     clear_screen()
@@ -41,224 +86,22 @@ def clear_screen() -> None:
     system("clear")
 
 
-# __________Draw menu functions__________
-
-def draw_main_menu() -> None:
-    """
-    Draw the main menu
+def input_choice(count: int) -> int:
     """
+    Ask for a choice until a valid one is given
 
-    draw_header()
-    menu_text = f"""
-MAIN MENU
-What do you want to do?
-
-1. Go to USER menu
-2. Go to USER PROFILE menu
-3. Go to GRAPH menu
-4. Go to PIXEL menu
-5. Log in another account
-6. Exit
-
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-6): ")
-        if user_input in ("1", "2", "3", "4", "5", "6"):
-            break
-        else:
-            print("Invalid choice, choose again.")
-
-    choice = int(user_input)
-    match choice:
-        case 1:
-            draw_user_menu()
-        case 2:
-            draw_userprofile_menu()
-        case 3:
-            draw_graph_menu()
-        case 4:
-            draw_pixel_menu()
-        case 5:
-            log_in()
-        case 6:
-            clear_screen()
-            quit()
-
-
-def draw_user_menu() -> None:
-    """
-    Draw the USER menu
+    :param count: number of choices
+    :return: choice between 1 and count
     """
 
-    draw_header()
-    menu_text = f"""
-USER menu
-What do you want to do?
-
-1. Create an account
-2. Update API token
-3. Delete your account
-4. Go back
-5. Exit
-
-"""
-    print(menu_text)
+    choices = [str(number) for number in range(1, count + 1)]
     while True:
-        user_input = input("Your choice (1-5): ")
-        if user_input in ("1", "2", "3", "4", "5"):
-            break
+        user_input = input(f"Your choice (1-{count}): ")
+        if user_input in choices:
+            return int(user_input)
         else:
             print("Invalid choice, choose again.")
 
-    choice = int(user_input)
-    match choice:
-        case 1:
-            create_account()
-        case 2:
-            update_api_token()
-        case 3:
-            delete_account()
-        case 4:
-            draw_main_menu()
-        case 5:
-            clear_screen()
-            quit()
-
-
-def draw_userprofile_menu() -> None:
-    """
-    Draw the USER PROFILE menu
-    """
-
-    draw_header()
-    menu_text = f"""
-USER PROFILE menu
-What do you want to do?
-
-1. View a user profile
-2. Update your profile
-3. Go back
-4. Exit
-
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-4): ")
-        if user_input in ("1", "2", "3", "4"):
-            break
-        else:
-            print("Invalid choice, choose again.")
-
-    choice = int(user_input)
-    # TODO: implement USER PROFILE menu choices
-    match choice:
-        case 1:
-            view_user_profile()
-        case 2:
-            update_user_profile()
-        case 3:
-            draw_main_menu()
-        case 4:
-            clear_screen()
-            quit()
-
-
-def draw_graph_menu() -> None:
-    """
-    Draw the GRAPH menu
-    """
-
-    draw_header()
-    menu_text = f"""
-GRAPH menu
-What do you want to do?
-
-1. Create a graph
-2. List all of your graphs
-3. Get your graph information
-4. Delete a graph
-5. Get a graph HTML
-6. Show all pixel of a graph
-7. Show a graph statistics
-8. Go back
-9. Exit
-
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-5): ")
-        if user_input in ("1", "2", "3", "4", "5", "6", "7", "8", "9"):
-            break
-        else:
-            print("Invalid choice, choose again.")
-
-    choice = int(user_input)
-    # TODO: implement GRAPH menu choices
-    match choice:
-        case 1:
-            create_graph()
-        case 2:
-            get_all_graph()
-        case 3:
-            get_graph_def()
-        case 4:
-            delete_graph()
-        case 5:
-            display_graph()
-        case 6:
-            get_graph_pixels()
-        case 7:
-            get_graph_stats()
-        case 8:
-            draw_main_menu()
-        case 9:
-            clear_screen()
-            quit()
-
-
-def draw_pixel_menu() -> None:
-    """
-    Draw the PIXEL menu
-    """
-
-    draw_header()
-    menu_text = f"""
-PIXEL menu
-What do you want to do?
-
-1. Post a pixel
-2. Get a pixel statistics
-3. Update a pixel statistics
-4. Delete a pixel
-5. Go back
-6. Exit
-
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-6): ")
-        if user_input in ("1", "2", "3", "4", "5", "6"):
-            break
-        else:
-            print("Invalid choice, choose again.")
-
-    choice = int(user_input)
-    match choice:
-        case 1:
-            post_pixel()
-        case 2:
-            get_pixel()
-        case 3:
-            update_pixel()
-        case 4:
-            delete_pixel()
-        case 5:
-            draw_main_menu()
-        case 6:
-            clear_screen()
-            quit()
-
 
 # __________Functionality__________
 
@@ -289,6 +132,11 @@ that is between 8 and 128 characters in length.)\n""")
             print("Token has invalid length!")
     pixela.set_token(token)
 
+    if counters is not None:
+        counters.set_credentials(username, token)  # the buffered increments belong to the previous user
+    if flusher is not None:
+        flusher.set_credentials(username, token)
+
 
 def create_account() -> None:
     """
@@ -296,45 +144,9 @@ def create_account() -> None:
     to create an account
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
-
-1. Create an account with current username
-2. Log in for another username and API token
-3. Go back
-4. Exit
-
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-4): ")
-        if user_input in ("1", "2", "3", "4"):
-            break
-        else:
-            print("Invalid choice, choose again.")
-
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            response = pixela.create_user()
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
-
-            print_response(response)
-            input("\nPress Enter to continue…")
-            create_account()
-        case 2:
-            log_in()
-            create_account()
-        case 3:
-            draw_user_menu()
-        case 4:
-            clear_screen()
-            quit()
+    clear_screen()
+    response = pixela.create_user()
+    print_result(response)
 
 
 def update_api_token() -> None:
@@ -343,47 +155,21 @@ def update_api_token() -> None:
     to update api token
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
-
-1. Update API token of current username
-2. Log in for another username and API token
-3. Go back
-4. Exit
-
-    """
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-4): ")
-        if user_input in ("1", "2", "3", "4"):
-            break
-        else:
-            print("Invalid choice, choose again.")
-
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            new_token = input("\nInput your new token: ")
-            response = pixela.update_token(new_token)
-            if response.status_code == 200:
-                print("\nSUCCESS")
-                pixela.set_token(new_token)
-            else:
-                print("\nFAILED")
-
-            print_response(response)
-            input("\nPress Enter to continue…")
-            update_api_token()
-        case 2:
-            log_in()
-            create_account()
-        case 3:
-            draw_user_menu()
-        case 4:
-            clear_screen()
-            quit()
+    clear_screen()
+    new_token = input("\nInput your new token: ")
+    # Send what is buffered while the current token is still valid
+    if counters is not None:
+        counters.flush()
+    if flusher is not None:
+        flusher.flush(force=True)
+    response = pixela.update_token(new_token)
+    if response.status_code == 200:
+        pixela.set_token(new_token)
+        if counters is not None:
+            counters.set_credentials(pixela.get_username(), new_token)
+        if flusher is not None:
+            flusher.set_credentials(pixela.get_username(), new_token)
+    print_result(response)
 
 
 def delete_account() -> None:
@@ -392,41 +178,9 @@ def delete_account() -> None:
     to delete this user account
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
-
-1. Delete current account
-2. Go back
-3. Exit
-
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
-
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            response = pixela.delete_user()
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
-
-            print_response(response)
-            input("\nPress Enter to continue…")
-            delete_account()
-        case 2:
-            draw_user_menu()
-        case 3:
-            clear_screen()
-            quit()
+    clear_screen()
+    response = pixela.delete_user()
+    print_result(response)
 
 
 def view_user_profile() -> None:
@@ -435,42 +189,10 @@ def view_user_profile() -> None:
     to get view a user profile
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
-
-1. View a user profile (get link)
-2. Go back
-3. Exit
-
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
-
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            user_profile = input("Input name of the user profile: ")
-            response = pixela.view_user_profile(user_profile)
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
-
-            print_response(response)
-            input("\nPress Enter to continue…")
-            view_user_profile()
-        case 2:
-            draw_userprofile_menu()
-        case 3:
-            clear_screen()
-            quit()
+    clear_screen()
+    user_profile = input("Input name of the user profile: ")
+    response = pixela.view_user_profile(user_profile)
+    print_result(response)
 
 
 def update_user_profile() -> None:
@@ -479,16 +201,6 @@ def update_user_profile() -> None:
     to update user profile
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
-
-1. Update your profile
-2. Go back
-3. Exit
-
-"""
-
     choose_mode_text = f"""
 What do you want to update?
 
@@ -501,57 +213,14 @@ What do you want to update?
 
 """
 
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
-
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            print(choose_mode_text)
-            while True:
-                user_choice = input("Your choice (1-6): ")
-                if user_choice in ("1", "2", "3", "4", "5", "6"):
-                    break
-                else:
-                    print("Invalid choice, choose again.")
-
-            mode_num = int(user_choice)
-            mode = ""
-            match mode_num:
-                case 1:
-                    mode = "displayName"
-                case 2:
-                    mode = "gravatarIconEmail"
-                case 3:
-                    mode = "title"
-                case 4:
-                    mode = "timezone"
-                case 5:
-                    mode = "aboutURL"
-                case 6:
-                    mode = "pinnedGraphID"
-
-            new_value = input("Input new value: ")
-            response = pixela.update_user_profile(mode, new_value)
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
+    clear_screen()
+    print(choose_mode_text)
+    modes = ("displayName", "gravatarIconEmail", "title", "timezone", "aboutURL", "pinnedGraphID")
+    mode = modes[input_choice(len(modes)) - 1]
 
-            print_response(response)
-            input("\nPress Enter to continue…")
-            update_user_profile()
-        case 2:
-            draw_userprofile_menu()
-        case 3:
-            clear_screen()
-            quit()
+    new_value = input("Input new value: ")
+    response = pixela.update_user_profile(mode, new_value)
+    print_result(response)
 
 
 def create_graph() -> None:
@@ -560,48 +229,16 @@ def create_graph() -> None:
     to create a graph
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
-
-1. Create a graph
-2. Go back
-3. Exit
-
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
-
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            graph_id = input("Input your graph ID: ")
-            graph_name = input("Input your graph name: ")
-            graph_unit = input("Input your graph unit (hour, km,...): ")
-            graph_type = input("Choose your graph data type (input \"int\" or \"float\"): ")
-            graph_color = input(
-                "Choose your graph color (input shibafu (green), momiji (red),\nsora (blue), ichou (yellow), "
-                "ajisai (purple) or kuro (black)): ")
-            response = pixela.create_graph(graph_id, graph_name, graph_unit, graph_type, graph_color)
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
-
-            print_response(response)
-            input("\nPress Enter to continue…")
-            create_graph()
-        case 2:
-            draw_graph_menu()
-        case 3:
-            clear_screen()
-            quit()
+    clear_screen()
+    graph_id = input("Input your graph ID: ")
+    graph_name = input("Input your graph name: ")
+    graph_unit = input("Input your graph unit (hour, km,...): ")
+    graph_type = input("Choose your graph data type (input \"int\" or \"float\"): ")
+    graph_color = input(
+        "Choose your graph color (input shibafu (green), momiji (red),\nsora (blue), ichou (yellow), "
+        "ajisai (purple) or kuro (black)): ")
+    response = pixela.create_graph(graph_id, graph_name, graph_unit, graph_type, graph_color)
+    print_result(response)
 
 
 def get_all_graph() -> None:
@@ -610,41 +247,29 @@ def get_all_graph() -> None:
     to get all user's graphs' definition
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
+    clear_screen()
+    response = pixela.get_all_graph()
+    print_result(response)
 
-1. List all of your graphs
-2. Go back
-3. Exit
 
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
+def show_dashboard() -> None:
+    """
+    Call function in dashboard.py
+    to show today's pixel and the statistics of every graph
+    """
 
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            response = pixela.get_all_graph()
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
+    import dashboard
 
-            print_response(response)
-            input("\nPress Enter to continue…")
-            get_all_graph()
-        case 2:
-            draw_graph_menu()
-        case 3:
-            clear_screen()
-            quit()
+    clear_screen()
+    print("Loading every graph…")
+    try:
+        rows = dashboard.fetch_dashboard()
+    except OSError as error:
+        print(f"\nFAILED\n{error}")
+    else:
+        print()
+        print(dashboard.render_dashboard(rows))
+    input("\nPress Enter to continue…")
 
 
 def get_graph_def() -> None:
@@ -653,174 +278,156 @@ def get_graph_def() -> None:
     to get a specific graph's definition
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
-
-1. Get your graph information
-2. Go back
-3. Exit
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    response = pixela.get_graph_def(graph_id)
+    print_result(response)
 
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
 
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            graph_id = input("Input your graph id: ")
-            response = pixela.get_graph_def(graph_id)
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
+def delete_graph() -> None:
+    """
+    Call function in pixela_api_handler.py
+    to delete a graph
+    """
 
-            print_response(response)
-            input("\nPress Enter to continue…")
-            get_graph_def()
-        case 2:
-            draw_graph_menu()
-        case 3:
-            clear_screen()
-            quit()
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    response = pixela.delete_graph(graph_id)
+    print_result(response)
 
 
-def delete_graph() -> None:
+def display_graph() -> None:
     """
     Call function in pixela_api_handler.py
-    to delete a graph
+    to get a graph's HTML
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    response = pixela.display_graph(graph_id)
+    print_result(response)
 
-1. Delete graph
-2. Go back
-3. Exit
 
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
+def local_pixels(graph_id: str) -> list[tuple[str, str]]:
+    """
+    :return: (date, quantity) of the pixels of a graph in the local cache
+    """
 
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            graph_id = input("Input your graph id: ")
-            response = pixela.delete_graph(graph_id)
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
+    pixels = pixela.get_client().pixel_cache.get_pixels(pixela.get_username(), graph_id)
+    if not pixels:
+        print("\nNo pixel of this graph is cached yet, "
+              "fetch them first with \"Show all pixel of a graph\".")
+    return [(pixel["date"], pixel["quantity"]) for pixel in pixels]
 
-            print_response(response)
-            input("\nPress Enter to continue…")
-            delete_graph()
-        case 2:
-            draw_graph_menu()
-        case 3:
-            clear_screen()
-            quit()
 
+def show_heatmap() -> None:
+    """
+    Call function in heatmap.py
+    to draw a graph in the terminal from the locally cached pixels
+    """
 
-def display_graph() -> None:
+    import heatmap
+
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    pixels = local_pixels(graph_id)
+    if pixels:
+        print()
+        print(heatmap.render_ansi(pixels))
+    input("\nPress Enter to continue…")
+
+
+def save_heatmap() -> None:
+    """
+    Call function in heatmap.py
+    to save a graph as an SVG file from the locally cached pixels
+    """
+
+    import heatmap
+
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    path = input("Input the file path (.svg): ")
+    pixels = local_pixels(graph_id)
+    if pixels:
+        try:
+            heatmap.write_svg(path, pixels, title=graph_id)
+        except OSError as error:
+            print(f"\nFAILED\n{error}")
+        else:
+            print(f"\nSUCCESS\nSaved to {path}")
+    input("\nPress Enter to continue…")
+
+
+def get_graph_pixels(full: bool = False) -> None:
     """
     Call function in pixela_api_handler.py
-    to get a graph's HTML
+    to get all of a graph's pixels
+
+    :param full: download the whole pixel list again instead of syncing new days
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
+    import pixel_stream
 
-1. Get a graph HTML
-2. Go back
-3. Exit
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    pixels, response = pixela.sync_graph_pixels(graph_id, full=full)
+    if response is None or response.status_code == 200:
+        print("\nSUCCESS")
+        pixel_stream.print_pixels(pixels)
+    else:
+        print("\nFAILED")
+        print_response(response)
 
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
+    input("\nPress Enter to continue…")
 
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            graph_id = input("Input your graph id: ")
-            response = pixela.display_graph(graph_id)
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
 
-            print_response(response)
-            input("\nPress Enter to continue…")
-            display_graph()
-        case 2:
-            draw_graph_menu()
-        case 3:
-            clear_screen()
-            quit()
+def download_graph_pixels() -> None:
+    get_graph_pixels(full=True)
 
 
-def get_graph_pixels() -> None:
+def get_graph_pixels_in_range() -> None:
     """
     Call function in pixela_api_handler.py
-    to get all of a graph's pixels
+    to get a graph's pixels between two dates,
+    one window of days per request
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
+    import pixel_stream
 
-1. Get all of your graph's pixels
-2. Go back
-3. Exit
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    date_from = input("Input the first date (follow the format yyyyMMdd): ")
+    date_to = input("Input the last date (follow the format yyyyMMdd, empty for today): ")
+    with_body = input("Include quantities? (y/n): ").strip().lower() != "n"
+    try:
+        pixels = pixela.iter_pixel_windows(graph_id, date_from, date_to, with_body=with_body)
+        print()
+        pixel_stream.print_pixels(pixels)
+    except (OSError, ValueError) as error:
+        print(f"\nFAILED\n{error}")
+    input("\nPress Enter to continue…")
 
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
 
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            graph_id = input("Input your graph id: ")
-            response = pixela.get_graph_pixels(graph_id)
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
+def export_graph_pixels() -> None:
+    """
+    Call function in pixela_api_handler.py
+    to stream all of a graph's pixels into a CSV/JSONL file
+    """
 
-            print_response(response)
-            input("\nPress Enter to continue…")
-            get_graph_pixels()
-        case 2:
-            draw_graph_menu()
-        case 3:
-            clear_screen()
-            quit()
+    import pixel_stream
+
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    path = input("Input the file path (.csv or .jsonl): ")
+    try:
+        count = pixel_stream.export_pixels(pixela.iter_graph_pixels(graph_id), path, graph_id)
+    except (OSError, ValueError) as error:
+        print(f"\nFAILED\n{error}")
+    else:
+        print("\nSUCCESS")
+        print(f"Wrote {count} pixels to {path}")
+    input("\nPress Enter to continue…")
 
 
 def get_graph_stats() -> None:
@@ -829,88 +436,69 @@ def get_graph_stats() -> None:
     to get a graph's statistics
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    response = pixela.get_graph_stats(graph_id)
+    print_result(response)
 
-1. Get your graph's statistics
-2. Go back
-3. Exit
 
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
+def get_local_graph_stats() -> None:
+    """
+    Call function in graph_stats.py
+    to compute a graph's statistics from the locally cached pixels
+    """
 
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            graph_id = input("Input your graph id: ")
-            response = pixela.get_graph_stats(graph_id)
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
+    import graph_stats
 
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    if pixela.get_client().pixel_cache.get_sync_state(pixela.get_username(), graph_id) is None:
+        # Only the pixels posted from here are cached, the statistics would miss the others
+        print("\nThis graph was never synced, fetching its pixels first…")
+        _, response = pixela.sync_graph_pixels(graph_id)
+        if response is not None and response.status_code != 200:
+            print("\nFAILED")
             print_response(response)
             input("\nPress Enter to continue…")
-            get_graph_stats()
-        case 2:
-            draw_graph_menu()
-        case 3:
-            clear_screen()
-            quit()
+            return
 
+    stats = graph_stats.graph_stats(pixela.get_client().pixel_cache, pixela.get_username(), graph_id)
+    print("\nComputed from the pixels cached by \"Show all pixel of a graph\"")
+    print_json(stats)
+    input("\nPress Enter to continue…")
 
-def post_pixel() -> None:
+
+def get_streamed_graph_stats() -> None:
     """
-    Call function in pixela_api_handler.py
-    to post a pixel to a graph
+    Call function in graph_stats.py
+    to compute a graph's statistics while its pixels are streamed from Pixela
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
+    import graph_stats
 
-1. Post a pixel to a graph
-2. Go back
-3. Exit
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    try:
+        stats = graph_stats.stream_graph_stats(pixela.iter_graph_pixels(graph_id))
+    except (OSError, ValueError) as error:
+        print(f"\nFAILED\n{error}")
+    else:
+        print("\nSUCCESS")
+        print_json(stats)
+    input("\nPress Enter to continue…")
 
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
 
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            graph_id = input("Input your graph id: ")
-            date = input("Input date (follow the format yyyyMMdd): ")
-            quantity = input("Input the quantity: ")
-            response = pixela.post_pixel(graph_id, date, quantity)
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
+def post_pixel() -> None:
+    """
+    Call function in pixela_api_handler.py
+    to post a pixel to a graph
+    """
 
-            print_response(response)
-            input("\nPress Enter to continue…")
-            post_pixel()
-        case 2:
-            draw_pixel_menu()
-        case 3:
-            clear_screen()
-            quit()
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    date = input("Input date (follow the format yyyyMMdd): ")
+    quantity = input("Input the quantity: ")
+    queue_pixel_change(graph_id, "post", date, quantity)
 
 
 def get_pixel() -> None:
@@ -919,170 +507,358 @@ def get_pixel() -> None:
     to get a pixel info of a graph
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    date = input("Input date (follow the format yyyyMMdd): ")
+    response = pixela.get_pixel(graph_id, date)
+    print_result(response)
 
-1. Get a pixel information
-2. Go back
-3. Exit
 
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
-
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            graph_id = input("Input your graph id: ")
-            date = input("Input date (follow the format yyyyMMdd): ")
-            response = pixela.get_pixel(graph_id, date)
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
+def update_pixel() -> None:
+    """
+    Call function in pixela_api_handler.py
+    to update a pixel's quantity
+    """
 
-            print_response(response)
-            input("\nPress Enter to continue…")
-            get_pixel()
-        case 2:
-            draw_pixel_menu()
-        case 3:
-            clear_screen()
-            quit()
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    date = input("Input date (follow the format yyyyMMdd): ")
+    quantity = input("Input the new quantity: ")
+    queue_pixel_change(graph_id, "update", date, quantity)
 
 
-def update_pixel() -> None:
+def delete_pixel() -> None:
     """
     Call function in pixela_api_handler.py
-    to update a pixel's quantity
+    to delete a pixel
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    date = input("Input date (follow the format yyyyMMdd): ")
+    queue_pixel_change(graph_id, "delete", date)
 
-1. Update a pixel's quantity
-2. Go back
-3. Exit
 
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
+def increment_pixel() -> None:
+    """
+    Call function in counter_buffer.py
+    to add 1 to today's pixel of a graph
+    """
 
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            graph_id = input("Input your graph id: ")
-            date = input("Input date (follow the format yyyyMMdd): ")
-            quantity = input("Input the new quantity: ")
-            response = pixela.update_pixel(graph_id, date, quantity)
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    counters.increment(graph_id)
+    print_counter(graph_id)
 
-            print_response(response)
-            input("\nPress Enter to continue…")
-            update_pixel()
-        case 2:
-            draw_pixel_menu()
-        case 3:
-            clear_screen()
-            quit()
 
+def decrement_pixel() -> None:
+    """
+    Call function in counter_buffer.py
+    to subtract 1 from today's pixel of a graph
+    """
 
-def delete_pixel() -> None:
+    clear_screen()
+    graph_id = input("Input your graph id: ")
+    counters.decrement(graph_id)
+    print_counter(graph_id)
+
+
+def print_counter(graph_id: str) -> None:
+    steps = sum(steps for (pending_graph, _), steps in counters.pending().items() if pending_graph == graph_id)
+    print("\nQUEUED")
+    print(f"Net change of today's pixel not sent yet: {steps:+d} "
+          f"(sent within {counters.interval:g} seconds).")
+    input("\nPress Enter to continue…")
+
+
+def show_request_stats() -> None:
     """
-    Call function in pixela_api_handler.py
-    to delete a pixel
+    Print calls, errors, retries and latencies of every endpoint used so far
     """
 
-    draw_header()
-    menu_text = f"""
-What do you want to do?
+    clear_screen()
+    client = pixela.get_client()
+    print(client.instrumentation.dump())
+    stats = client.graph_cache.stats()
+    print(f"\nGraph cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+    if client.render_cache is not None:
+        stats = client.render_cache.stats()
+        print(f"Graph HTML cache: {stats['hits']} hits, {stats['revalidated']} revalidated, "
+              f"{stats['misses']} misses")
+    input("\nPress Enter to continue…")
 
-1. Delete a pixel
-2. Go back
-3. Exit
 
-"""
-    print(menu_text)
-    while True:
-        user_input = input("Your choice (1-3): ")
-        if user_input in ("1", "2", "3"):
-            break
-        else:
-            print("Invalid choice, choose again.")
+def queue_pixel_change(graph_id: str, operation: str, date: str, quantity: str = "") -> None:
+    """
+    Record a pixel change in the write queue,
+    it is sent in the background by the flusher
+    """
 
-    choice = int(user_input)
-    match choice:
-        case 1:
-            clear_screen()
-            graph_id = input("Input your graph id: ")
-            date = input("Input date (follow the format yyyyMMdd): ")
-            response = pixela.delete_pixel(graph_id, date)
-            if response.status_code == 200:
-                print("\nSUCCESS")
-            else:
-                print("\nFAILED")
+    pixel_queue.enqueue(pixela.get_username(), graph_id, operation, date, quantity)
+    print("\nQUEUED")
+    print("The change is saved and will be sent in the background.")
+    input("\nPress Enter to continue…")
 
-            print_response(response)
-            input("\nPress Enter to continue…")
-            delete_pixel()
-        case 2:
-            draw_pixel_menu()
-        case 3:
-            clear_screen()
-            quit()
+
+def show_queued_changes() -> None:
+    """
+    List the pixel changes not yet accepted by the server
+    """
+
+    clear_screen()
+    entries = pixel_queue.entries(pixela.get_username())
+    if entries:
+        print_json(entries)
+    else:
+        print("Every pixel change has been sent.")
+    if counters is not None and (counters.failed or counters.unconfirmed):
+        print("\nIncrements refused by the server:")
+        print_json(counters.failed)
+        print("\nIncrements that may or may not have been applied, check these pixels:")
+        print_json(counters.unconfirmed)
+    input("\nPress Enter to continue…")
 
 
-def not_available_feature(menu: str) -> None:
+def import_pixels() -> None:
     """
-    Call this function for unfinished features
+    Call function in bulk_import.py
+    to post every pixel of a CSV/JSONL file
     """
 
-    draw_header()
-    menu_text = f"""
-Sorry, this feature is currently not available
+    import bulk_import
 
-1. Go back
-2. Exit
+    clear_screen()
+    path = input("Input the file path (.csv with graph_id,date,quantity columns or .jsonl): ")
+    try:
+        summary = bulk_import.import_pixels(path)
+    except OSError as error:
+        print(f"\nFAILED\n{error}")
+    else:
+        if summary["failed"] == 0:
+            print("\nSUCCESS")
+        else:
+            print("\nFAILED")
+        print(f"Posted {summary['succeeded']} of {summary['total']} pixels "
+              f"in {summary['seconds']:.1f}s")
+        print(f"Results of every row: {summary['result_file']}")
+    input("\nPress Enter to continue…")
+
+
+# __________Menu state machine__________
+
+EXIT = None
+
+# Screen name -> (title, options). An option leads to another screen
+# when its target is a screen name, or runs its target and shows
+# the same screen again when it is a function.
+Target = str | Callable[[], None] | None
+SCREENS: dict[str, tuple[str, list[tuple[str, Target]]]] = {
+    "MAIN": ("MAIN MENU", [
+        ("Go to USER menu", "USER"),
+        ("Go to USER PROFILE menu", "USER PROFILE"),
+        ("Go to GRAPH menu", "GRAPH"),
+        ("Go to PIXEL menu", "PIXEL"),
+        ("Log in another account", log_in),
+        ("Show request statistics", show_request_stats),
+        ("Exit", EXIT),
+    ]),
+    "USER": ("USER menu", [
+        ("Create an account", "CREATE ACCOUNT"),
+        ("Update API token", "UPDATE API TOKEN"),
+        ("Delete your account", "DELETE ACCOUNT"),
+        ("Go back", "MAIN"),
+        ("Exit", EXIT),
+    ]),
+    "USER PROFILE": ("USER PROFILE menu", [
+        ("View a user profile", "VIEW USER PROFILE"),
+        ("Update your profile", "UPDATE USER PROFILE"),
+        ("Go back", "MAIN"),
+        ("Exit", EXIT),
+    ]),
+    "GRAPH": ("GRAPH menu", [
+        ("Create a graph", "CREATE GRAPH"),
+        ("List all of your graphs", "GET ALL GRAPH"),
+        ("Get your graph information", "GET GRAPH DEF"),
+        ("Delete a graph", "DELETE GRAPH"),
+        ("Get a graph HTML", "DISPLAY GRAPH"),
+        ("Show all pixel of a graph", "GET GRAPH PIXELS"),
+        ("Show a graph statistics", "GET GRAPH STATS"),
+        ("Go back", "MAIN"),
+        ("Exit", EXIT),
+    ]),
+    "PIXEL": ("PIXEL menu", [
+        ("Post a pixel", "POST PIXEL"),
+        ("Get a pixel statistics", "GET PIXEL"),
+        ("Update a pixel statistics", "UPDATE PIXEL"),
+        ("Delete a pixel", "DELETE PIXEL"),
+        ("Import pixels from a CSV/JSONL file", "IMPORT PIXELS"),
+        ("Show queued pixel changes", show_queued_changes),
+        ("Go back", "MAIN"),
+        ("Exit", EXIT),
+    ]),
+
+    # __________USER screens__________
+    "CREATE ACCOUNT": ("", [
+        ("Create an account with current username", create_account),
+        ("Log in for another username and API token", log_in),
+        ("Go back", "USER"),
+        ("Exit", EXIT),
+    ]),
+    "UPDATE API TOKEN": ("", [
+        ("Update API token of current username", update_api_token),
+        ("Log in for another username and API token", log_in),
+        ("Go back", "USER"),
+        ("Exit", EXIT),
+    ]),
+    "DELETE ACCOUNT": ("", [
+        ("Delete current account", delete_account),
+        ("Go back", "USER"),
+        ("Exit", EXIT),
+    ]),
+
+    # __________USER PROFILE screens__________
+    "VIEW USER PROFILE": ("", [
+        ("View a user profile (get link)", view_user_profile),
+        ("Go back", "USER PROFILE"),
+        ("Exit", EXIT),
+    ]),
+    "UPDATE USER PROFILE": ("", [
+        ("Update your profile", update_user_profile),
+        ("Go back", "USER PROFILE"),
+        ("Exit", EXIT),
+    ]),
+
+    # __________GRAPH screens__________
+    "CREATE GRAPH": ("", [
+        ("Create a graph", create_graph),
+        ("Go back", "GRAPH"),
+        ("Exit", EXIT),
+    ]),
+    "GET ALL GRAPH": ("", [
+        ("List all of your graphs", get_all_graph),
+        ("Show a dashboard of all of your graphs", show_dashboard),
+        ("Go back", "GRAPH"),
+        ("Exit", EXIT),
+    ]),
+    "GET GRAPH DEF": ("", [
+        ("Get your graph information", get_graph_def),
+        ("Go back", "GRAPH"),
+        ("Exit", EXIT),
+    ]),
+    "DELETE GRAPH": ("", [
+        ("Delete graph", delete_graph),
+        ("Go back", "GRAPH"),
+        ("Exit", EXIT),
+    ]),
+    "DISPLAY GRAPH": ("", [
+        ("Get a graph HTML", display_graph),
+        ("Draw a graph in the terminal from local pixels", show_heatmap),
+        ("Save a graph as an SVG file from local pixels", save_heatmap),
+        ("Go back", "GRAPH"),
+        ("Exit", EXIT),
+    ]),
+    "GET GRAPH PIXELS": ("", [
+        ("Get all of your graph's pixels", get_graph_pixels),
+        ("Download all of your graph's pixels again", download_graph_pixels),
+        ("Get your graph's pixels in a date range", get_graph_pixels_in_range),
+        ("Export all of your graph's pixels to a CSV/JSONL file", export_graph_pixels),
+        ("Go back", "GRAPH"),
+        ("Exit", EXIT),
+    ]),
+    "GET GRAPH STATS": ("", [
+        ("Get your graph's statistics", get_graph_stats),
+        ("Compute your graph's statistics from local pixels", get_local_graph_stats),
+        ("Compute your graph's statistics from streamed pixels", get_streamed_graph_stats),
+        ("Go back", "GRAPH"),
+        ("Exit", EXIT),
+    ]),
+
+    # __________PIXEL screens__________
+    "POST PIXEL": ("", [
+        ("Post a pixel to a graph", post_pixel),
+        ("Go back", "PIXEL"),
+        ("Exit", EXIT),
+    ]),
+    "GET PIXEL": ("", [
+        ("Get a pixel information", get_pixel),
+        ("Go back", "PIXEL"),
+        ("Exit", EXIT),
+    ]),
+    "UPDATE PIXEL": ("", [
+        ("Update a pixel's quantity", update_pixel),
+        ("Increment today's pixel", increment_pixel),
+        ("Decrement today's pixel", decrement_pixel),
+        ("Go back", "PIXEL"),
+        ("Exit", EXIT),
+    ]),
+    "DELETE PIXEL": ("", [
+        ("Delete a pixel", delete_pixel),
+        ("Go back", "PIXEL"),
+        ("Exit", EXIT),
+    ]),
+    "IMPORT PIXELS": ("", [
+        ("Import pixels from a file", import_pixels),
+        ("Go back", "PIXEL"),
+        ("Exit", EXIT),
+    ]),
+}
+
+
+def draw_screen(screen: str) -> str | None:
+    """
+    Draw a screen and handle the user's choice
+
+    :param screen: name of the screen in SCREENS
+    :return: name of the next screen, None to exit
+    """
+
+    title, options = SCREENS[screen]
 
-"""
+    draw_header()
+    menu_text = "\n"
+    if title:
+        menu_text += f"{title}\n"
+    menu_text += "What do you want to do?\n\n"
+    for number, (label, _) in enumerate(options, start=1):
+        menu_text += f"{number}. {label}\n"
     print(menu_text)
-    while True:
-        user_input = input("Your choice (1-2): ")
-        if user_input in ("1", "2"):
-            break
-        else:
-            print("Invalid choice, choose again.")
 
-    choice = int(user_input)
-    match choice:
-        case 1:
-            if menu == "USER":
-                draw_user_menu()
-            elif menu == "USER PROFILE":
-                draw_userprofile_menu()
-            elif menu == "GRAPH":
-                draw_graph_menu()
-            elif menu == "PIXEL":
-                draw_pixel_menu()
-            else:
-                draw_main_menu()
-        case 2:
-            clear_screen()
-            quit()
+    _, target = options[input_choice(len(options)) - 1]
+    if callable(target):
+        target()
+        return screen
+    return target
+
+
+def background_client() -> pixela.PixelaClient:
+    """
+    :return: silent client of the logged-in user, sharing the caches of the menu's client
+    """
+
+    return pixela.PixelaClient(pixela.get_username(), pixela.get_token(), verbose=False,
+                               pixel_cache=pixela.get_client().pixel_cache,
+                               render_cache=pixela.get_client().render_cache,
+                               instrumentation=pixela.get_client().instrumentation)
+
+
+def run(screen: str = "MAIN") -> None:
+    """
+    Show screens one after another until the user exits
+    """
+
+    global pixel_queue, flusher, counters
+    pixel_queue = write_queue.WriteQueue()
+    # One client each, so switching the credentials of one never affects a request of the other
+    flusher = write_queue.WriteQueueFlusher(pixel_queue, background_client())
+    flusher.start()
+    counters = counter_buffer.CounterBuffer(background_client())
+    counters.start()
+
+    try:
+        while screen is not EXIT:
+            screen = draw_screen(screen)
+    finally:
+        clear_screen()
+        print("Sending queued pixel changes…")
+        flusher.stop()
+        counters.stop()
@@ -0,0 +1,213 @@
+"""
+Persistent local copy of graph pixels
+
+Pixels are mirrored in a SQLite database in the user's cache
+directory, keyed by username and graph ID, so repeated reads
+of a graph's pixels do not need to refetch the whole list.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_FILE_NAME = "pixels.sqlite3"
+
+
+def default_cache_dir() -> str:
+    """
+    :return: $XDG_CACHE_HOME/pixela_habit_tracker, ~/.cache/pixela_habit_tracker by default
+    """
+
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pixela_habit_tracker")
+
+
+class PixelCache:
+    """
+    SQLite store of pixels and of how far each graph has been synced
+    """
+
+    def __init__(self, path: str = "") -> None:
+        """
+        :param path: database file, <cache dir>/pixels.sqlite3 by default
+        """
+
+        self.path = path or os.path.join(default_cache_dir(), CACHE_FILE_NAME)
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use so importing the handler never touches the disk
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS pixels (
+                    username TEXT NOT NULL,
+                    graph_id TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    quantity TEXT NOT NULL,
+                    PRIMARY KEY (username, graph_id, date)
+                );
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    username TEXT NOT NULL,
+                    graph_id TEXT NOT NULL,
+                    synced_through TEXT NOT NULL,
+                    synced_at REAL NOT NULL,
+                    PRIMARY KEY (username, graph_id)
+                );
+            """)
+            self._connection = connection
+        return self._connection
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    # __________PIXELS__________
+
+    def get_pixels(self, username: str, graph_id: str, date_from: str = "", date_to: str = "") -> list[dict]:
+        """
+        :param date_from: first date (yyyyMMdd) included, no lower bound by default
+        :param date_to: last date (yyyyMMdd) included, no upper bound by default
+        :return: pixels of the graph ordered by date, as {"date", "quantity"} dicts
+        """
+
+        query = "SELECT date, quantity FROM pixels WHERE username = ? AND graph_id = ?"
+        args = [username, graph_id]
+        if date_from:
+            query += " AND date >= ?"
+            args.append(date_from)
+        if date_to:
+            query += " AND date <= ?"
+            args.append(date_to)
+        query += " ORDER BY date"
+
+        with self._lock:
+            rows = self._connect().execute(query, args).fetchall()
+        return [{"date": date, "quantity": quantity} for date, quantity in rows]
+
+    def get_user_pixels(self, username: str) -> list[tuple[str, str, str]]:
+        """
+        :return: every cached pixel of a user as (graph_id, date, quantity), ordered by graph and date
+        """
+
+        with self._lock:
+            return self._connect().execute(
+                "SELECT graph_id, date, quantity FROM pixels WHERE username = ? ORDER BY graph_id, date",
+                (username,)).fetchall()
+
+    def upsert_pixels(self, username: str, graph_id: str, pixels: list[dict]) -> None:
+        """
+        Insert or overwrite pixels given as {"date", "quantity"} dicts
+        """
+
+        rows = [(username, graph_id, pixel["date"], str(pixel["quantity"])) for pixel in pixels]
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO pixels (username, graph_id, date, quantity) VALUES (?, ?, ?, ?)",
+                    rows)
+
+    def upsert_pixel(self, username: str, graph_id: str, date: str, quantity: str) -> None:
+        self.upsert_pixels(username, graph_id, [{"date": date, "quantity": quantity}])
+
+    def delete_pixel(self, username: str, graph_id: str, date: str) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "DELETE FROM pixels WHERE username = ? AND graph_id = ? AND date = ?",
+                    (username, graph_id, date))
+
+    def delete_graph(self, username: str, graph_id: str) -> None:
+        """
+        Forget every pixel and the sync state of a graph
+        """
+
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM pixels WHERE username = ? AND graph_id = ?",
+                                   (username, graph_id))
+                connection.execute("DELETE FROM sync_state WHERE username = ? AND graph_id = ?",
+                                   (username, graph_id))
+
+    def replace_pixels(self, username: str, graph_id: str, pixels: list[dict], synced_through: str) -> None:
+        """
+        Replace every cached pixel of a graph after a full download
+        """
+
+        rows = [(username, graph_id, pixel["date"], str(pixel["quantity"])) for pixel in pixels]
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM pixels WHERE username = ? AND graph_id = ?",
+                                   (username, graph_id))
+                connection.executemany(
+                    "INSERT INTO pixels (username, graph_id, date, quantity) VALUES (?, ?, ?, ?)",
+                    rows)
+                self._set_synced(connection, username, graph_id, synced_through)
+
+    def replace_range(self, username: str, graph_id: str, date_from: str, date_to: str, pixels: list[dict],
+                      synced_through: str) -> None:
+        """
+        Replace the cached pixels of a graph between two dates, included,
+        after downloading that range, so a pixel deleted on the server is dropped
+        """
+
+        rows = [(username, graph_id, pixel["date"], str(pixel["quantity"])) for pixel in pixels]
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "DELETE FROM pixels WHERE username = ? AND graph_id = ? AND date BETWEEN ? AND ?",
+                    (username, graph_id, date_from, date_to))
+                connection.executemany(
+                    "INSERT OR REPLACE INTO pixels (username, graph_id, date, quantity) VALUES (?, ?, ?, ?)",
+                    rows)
+                self._set_synced(connection, username, graph_id, synced_through)
+
+    # __________SYNC STATE__________
+
+    def get_sync_state(self, username: str, graph_id: str) -> tuple[str, float] | None:
+        """
+        :return: (last synced date yyyyMMdd, unix time of the sync), None if never synced
+        """
+
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT synced_through, synced_at FROM sync_state WHERE username = ? AND graph_id = ?",
+                (username, graph_id)).fetchone()
+        return row
+
+    def expire_sync(self, username: str, graph_id: str) -> None:
+        """
+        Make the next sync of a graph ask the server again, from its last synced date
+        """
+
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("UPDATE sync_state SET synced_at = 0 WHERE username = ? AND graph_id = ?",
+                                   (username, graph_id))
+
+    def set_synced(self, username: str, graph_id: str, synced_through: str) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                self._set_synced(connection, username, graph_id, synced_through)
+
+    @staticmethod
+    def _set_synced(connection: sqlite3.Connection, username: str, graph_id: str, synced_through: str) -> None:
+        connection.execute(
+            "INSERT OR REPLACE INTO sync_state (username, graph_id, synced_through, synced_at) VALUES (?, ?, ?, ?)",
+            (username, graph_id, synced_through, time.time()))
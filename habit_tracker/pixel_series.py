@@ -0,0 +1,257 @@
+"""
+Compact in-memory pixels of a graph
+
+The {"date", "quantity"} dicts returned by get_graph_pixels cost
+hundreds of bytes per pixel. A PixelSeries keeps the quantities of a
+graph in a typed array indexed by the number of days since an epoch,
+with a bitmap telling which days have a pixel, so a pixel costs 8
+bytes and 1 bit, a date lookup is an index, and a date range is a
+slice of the array.
+
+    series = PixelSeries.from_pixels(pixela.get_client().pixel_cache.get_pixels(username, "water"))
+    series.get("20240101")
+    list(series.items("20240101", "20240131"))
+"""
+
+from __future__ import annotations
+
+from array import array
+from datetime import date as Date
+from typing import Iterable, Iterator
+
+
+def date_ordinal(date: str) -> int:
+    """
+    :param date: date in the yyyyMMdd format of Pixela
+    :return: proleptic Gregorian ordinal of the date
+    """
+
+    return Date(int(date[:4]), int(date[4:6]), int(date[6:8])).toordinal()
+
+
+def ordinal_date(ordinal: int) -> str:
+    """
+    :return: date of an ordinal in the yyyyMMdd format of Pixela
+    """
+
+    date = Date.fromordinal(ordinal)
+    return f"{date.year:04d}{date.month:02d}{date.day:02d}"  # several times faster than strftime
+
+
+def format_quantity(value: float, typecode: str = "d") -> str:
+    """
+    :param typecode: typecode of the array the value was read from; a single precision
+                     value is cut to the 7 digits it holds, 0.1 would be 0.10000000149011612
+    :return: quantity as Pixela writes it, without a decimal part for whole numbers
+    """
+
+    if value.is_integer():
+        return str(int(value))
+    return "%.7g" % value if typecode == "f" else repr(value)
+
+
+class PixelSeries:
+    """
+    Quantities of one graph by day, in an array('d') with a presence bitmap
+    """
+
+    def __init__(self, epoch: str = "", typecode: str = "d") -> None:
+        """
+        :param epoch: date (yyyyMMdd) of the first slot, the first date set by default;
+                      setting an earlier date moves it
+        :param typecode: array typecode of the quantities, "f" halves the memory of
+                         graphs whose quantities fit in single precision
+        """
+
+        self.epoch = date_ordinal(epoch) if epoch else None
+        self._values = array(typecode)
+        self._present = bytearray()  # bit i tells whether day epoch + i has a pixel
+        self._count = 0
+
+    @classmethod
+    def from_pixels(cls, pixels: Iterable[dict], typecode: str = "d") -> PixelSeries:
+        """
+        :param pixels: {"date", "quantity"} dicts, e.g. from PixelCache.get_pixels
+        """
+
+        ordinals = array("l")
+        quantities = array("d")
+        for pixel in pixels:
+            ordinals.append(date_ordinal(pixel["date"]))
+            quantities.append(float(pixel["quantity"]))
+
+        series = cls(typecode=typecode)
+        if ordinals:
+            first = min(ordinals)
+            series.epoch = first
+            series._grow(max(ordinals) - first + 1)
+            for ordinal, quantity in zip(ordinals, quantities):
+                series._set(ordinal - first, quantity)
+        return series
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, date: str) -> bool:
+        return self._offset(date) is not None
+
+    def __getitem__(self, date: str) -> float:
+        offset = self._offset(date)
+        if offset is None:
+            raise KeyError(date)
+        return self._values[offset]
+
+    def __iter__(self) -> Iterator[str]:
+        return (date for date, _ in self.items())
+
+    @property
+    def nbytes(self) -> int:
+        """
+        :return: memory used by the quantities and the bitmap
+        """
+
+        return self._values.itemsize * len(self._values) + len(self._present)
+
+    @property
+    def first_date(self) -> str:
+        """
+        :return: date of the first slot (not necessarily a pixel), "" if empty
+        """
+
+        return ordinal_date(self.epoch) if self.epoch is not None else ""
+
+    def _offset(self, date: str) -> int | None:
+        """
+        :return: index of a date's pixel, None if the date has no pixel
+        """
+
+        if self.epoch is None:
+            return None
+        offset = date_ordinal(date) - self.epoch
+        if 0 <= offset < len(self._values) and self._present[offset >> 3] & (1 << (offset & 7)):
+            return offset
+        return None
+
+    def _grow(self, size: int) -> None:
+        """
+        Extend the array and the bitmap with empty days up to size slots
+        """
+
+        missing = size - len(self._values)
+        if missing > 0:
+            self._values.frombytes(bytes(self._values.itemsize * missing))
+            self._present.extend(bytes((size + 7) // 8 - len(self._present)))
+
+    def _set(self, offset: int, quantity: float) -> None:
+        mask = 1 << (offset & 7)
+        if not self._present[offset >> 3] & mask:
+            self._present[offset >> 3] |= mask
+            self._count += 1
+        self._values[offset] = quantity
+
+    def get(self, date: str, default: float | None = None) -> float | None:
+        """
+        :return: quantity of a date, default if the date has no pixel
+        """
+
+        offset = self._offset(date)
+        return self._values[offset] if offset is not None else default
+
+    def set(self, date: str, quantity: float | str) -> None:
+        """
+        Insert or overwrite the pixel of a date
+        """
+
+        ordinal = date_ordinal(date)
+        if self.epoch is None:
+            self.epoch = ordinal
+        elif ordinal < self.epoch:
+            self._move_epoch(ordinal)
+        offset = ordinal - self.epoch
+        self._grow(offset + 1)
+        self._set(offset, float(quantity))
+
+    def _move_epoch(self, ordinal: int) -> None:
+        """
+        Move the epoch back to an earlier day, shifting every pixel
+        """
+
+        shift = self.epoch - ordinal
+        pixels = [(offset + shift, self._values[offset]) for offset in self._offsets(0, len(self._values))]
+        values = array(self._values.typecode)
+        values.frombytes(bytes(values.itemsize * shift))
+        values.extend(self._values)
+        self._values = values
+        self._present = bytearray((len(values) + 7) // 8)
+        self._count = 0
+        self.epoch = ordinal
+        for offset, quantity in pixels:
+            self._set(offset, quantity)
+
+    def delete(self, date: str) -> bool:
+        """
+        :return: True if the date had a pixel
+        """
+
+        offset = self._offset(date)
+        if offset is None:
+            return False
+        self._present[offset >> 3] &= ~(1 << (offset & 7)) & 0xFF
+        self._values[offset] = 0.0
+        self._count -= 1
+        return True
+
+    def _bounds(self, date_from: str, date_to: str) -> tuple[int, int]:
+        """
+        :return: [start, stop) offsets of a date range, clipped to the array
+        """
+
+        if self.epoch is None:
+            return 0, 0
+        start = date_ordinal(date_from) - self.epoch if date_from else 0
+        stop = date_ordinal(date_to) - self.epoch + 1 if date_to else len(self._values)
+        return max(0, start), max(0, min(stop, len(self._values)))
+
+    def _offsets(self, start: int, stop: int) -> Iterator[int]:
+        """
+        :return: offsets with a pixel in [start, stop), skipping empty bytes of the bitmap
+        """
+
+        present = self._present
+        offset = start
+        while offset < stop:
+            if offset & 7 == 0 and not present[offset >> 3]:
+                offset += 8
+                continue
+            if present[offset >> 3] & (1 << (offset & 7)):
+                yield offset
+            offset += 1
+
+    def items(self, date_from: str = "", date_to: str = "") -> Iterator[tuple[str, float]]:
+        """
+        :param date_from: first date (yyyyMMdd) of the range, the first pixel by default
+        :param date_to: last date (yyyyMMdd) of the range, included, the last pixel by default
+        :return: generator of (date, quantity) of the pixels in the range, oldest first
+        """
+
+        start, stop = self._bounds(date_from, date_to)
+        for offset in self._offsets(start, stop):
+            yield ordinal_date(self.epoch + offset), self._values[offset]
+
+    def values(self, date_from: str = "", date_to: str = "") -> array:
+        """
+        :return: quantities of every day of the range, 0 for the days without a pixel,
+                 as a copy sliced from the array
+        """
+
+        start, stop = self._bounds(date_from, date_to)
+        return self._values[start:stop]
+
+    def to_pixels(self, date_from: str = "", date_to: str = "") -> list[dict]:
+        """
+        :return: pixels of the range as the {"date", "quantity"} dicts of the pixel cache
+        """
+
+        typecode = self._values.typecode
+        return [{"date": date, "quantity": format_quantity(quantity, typecode)}
+                for date, quantity in self.items(date_from, date_to)]
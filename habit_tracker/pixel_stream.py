@@ -0,0 +1,136 @@
+"""
+Stream pixels out of large responses with bounded memory
+
+get_graph_pixels responses of graphs with years of data are
+decoded one pixel at a time as the body arrives, instead of
+parsing the whole body into a list first. The pixels can then
+be printed or exported lazily.
+"""
+
+import codecs
+import csv
+import json
+from typing import IO, Iterable, Iterator
+
+WHITESPACE_AND_COMMAS = " \t\r\n,"
+COMPACT_AFTER = 65536  # characters consumed before the buffer is trimmed
+
+
+def iter_json_array(chunks: Iterable[bytes], key: str) -> Iterator:
+    """
+    Yield the elements of the array under a top-level key of a JSON object,
+    decoding each one as soon as it is complete
+
+    Only the element being decoded is held in memory, not the whole body.
+
+    :param chunks: body of the response, e.g. response.iter_content()
+    :param key: key of the array in the top-level object
+    :return: generator of the decoded elements
+    """
+
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = ""
+
+    def read() -> bool:
+        nonlocal buffer
+        chunk = next(chunks, None)
+        if chunk is None:
+            buffer += text.decode(b"", final=True)
+            return False
+        buffer += text.decode(chunk)
+        return True
+
+    # Find the opening bracket of the array
+    marker = f'"{key}"'
+    while True:
+        start = buffer.find(marker)
+        if start != -1:
+            bracket = buffer.find("[", start + len(marker))
+            if bracket != -1:
+                buffer = buffer[bracket + 1:]
+                break
+        if not read():
+            return
+
+    position = 0
+    while True:
+        while position < len(buffer) and buffer[position] in WHITESPACE_AND_COMMAS:
+            position += 1
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            if position == len(buffer):
+                raise json.decoder.JSONDecodeError("Need more data", buffer, position)
+            element, position = decoder.raw_decode(buffer, position)
+        except json.decoder.JSONDecodeError:
+            buffer = buffer[position:]
+            position = 0
+            if not read():
+                raise
+            continue
+
+        yield element
+
+        if position > COMPACT_AFTER:
+            buffer = buffer[position:]
+            position = 0
+
+
+# __________EXPORT__________
+
+def write_pixels(pixels: Iterable[dict], file: IO[str], graph_id: str, file_format: str = "csv") -> int:
+    """
+    Write pixels one by one as CSV or JSONL rows that bulk_import.py can read back
+
+    :param pixels: {"date", "quantity"} dicts, consumed lazily
+    :param file: text file to write to
+    :param graph_id: graph of the pixels, written in every row
+    :param file_format: "csv" or "jsonl"
+    :return: number of pixels written
+    """
+
+    count = 0
+    if file_format == "jsonl":
+        for pixel in pixels:
+            file.write(json.dumps({"graph_id": graph_id, "date": pixel["date"],
+                                   "quantity": pixel.get("quantity", "")}) + "\n")
+            count += 1
+    else:
+        writer = csv.writer(file)
+        writer.writerow(["graph_id", "date", "quantity"])
+        for pixel in pixels:
+            writer.writerow([graph_id, pixel["date"], pixel.get("quantity", "")])
+            count += 1
+    return count
+
+
+def export_pixels(pixels: Iterable[dict], path: str, graph_id: str) -> int:
+    """
+    Write pixels to a .csv or .jsonl file, chosen by the extension of path
+
+    :return: number of pixels written
+    """
+
+    file_format = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        return write_pixels(pixels, file, graph_id, file_format)
+
+
+def print_pixels(pixels: Iterable[dict]) -> int:
+    """
+    Print pixels as a JSON document, one pixel per line as they come
+
+    :return: number of pixels printed
+    """
+
+    count = 0
+    print('{"pixels": [')
+    for pixel in pixels:
+        if count:
+            print(",")
+        print(f"  {json.dumps(pixel, default=str)}", end="")
+        count += 1
+    print("\n]}")
+    return count
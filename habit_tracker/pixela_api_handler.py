@@ -3,464 +3,1278 @@ Define handler functions to communicate with Pixela
 API how to use document: https://docs.pixe.la/
 """
 
-import requests
-import json
-from requests import Response
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date as Date, datetime, timedelta
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, TypeVar
+from instrumentation import Instrumentation, RequestEvent, connect_time, start_connect_timer
+from pixel_cache import PixelCache
+from rate_limiter import FileRateLimiter, RateLimiter
+from render_cache import RenderCache
+from retry import RetryPolicy
+from ttl_cache import TTLCache
+
+if TYPE_CHECKING:
+    import requests
+    from requests import Response
+
+API_PREFIX = os.environ.get("PIXELA_API_PREFIX", "https://pixe.la")  # point at a stand-in server if set
+DEFAULT_POOL_SIZE = 10  # keep-alive connections kept open to pixe.la
+SYNC_INTERVAL = 300  # seconds during which synced pixels are served without any request
+GRAPH_CACHE_TTL = 600  # seconds graph listings and definitions are served from memory
+STREAM_CHUNK_SIZE = 65536  # bytes read at a time from streamed responses
+PIXEL_WINDOW_DAYS = 90  # days of pixels requested at a time when walking long histories
+PIXEL_BATCH_SIZE = 500  # pixels sent per request of post_pixels_batch
+BATCH_UNAVAILABLE_STATUSES = (403, 405)  # answers of the batch endpoint to accounts that cannot use it
+
+T = TypeVar("T")
+
+# Set by quiet() for the current thread or task only, unlike PixelaClient.verbose
+_quiet: ContextVar[bool] = ContextVar("quiet", default=False)
+
+
+class PixelaClient:
+    """
+    Pixela API client
 
-API_PREFIX = "https://pixe.la"
-pixela_token = ""  # set by user, at least 8 characters
-pixela_username = ""
+    Owns a pooled, keep-alive requests.Session so consecutive
+    calls reuse the same TCP+TLS connections instead of opening
+    a new one per request. The X-USER-TOKEN header is built once
+    and stored in the session's default headers.
 
+    The session, and requests with it, is only created by the
+    first request, so importing this module stays fast.
+    """
 
-def set_token(token: str) -> None:
-    global pixela_token
-    pixela_token = token
+    def __init__(self, username: str = "", token: str = "",
+                 pool_size: int = DEFAULT_POOL_SIZE, verbose: bool = True,
+                 pixel_cache: PixelCache | None = None, retry_policy: RetryPolicy | None = None,
+                 rate_limiter: RateLimiter | None = None, api_prefix: str = "",
+                 instrumentation: Instrumentation | None = None,
+                 graph_cache_ttl: float = GRAPH_CACHE_TTL, render_cache: RenderCache | None = None) -> None:
+        """
+        :param username: Pixela username
+        :param token: Pixela API token
+        :param pool_size: number of connections kept alive in the pool
+        :param verbose: print the request method and body before each call
+        :param pixel_cache: local pixel store kept up to date by the pixel endpoints
+        :param retry_policy: retries of rejected requests, a default RetryPolicy if None
+        :param rate_limiter: limiter every request and retry waits on, no limit if None
+        :param api_prefix: server URL, API_PREFIX by default
+        :param instrumentation: receiver of a RequestEvent per call, a new one if None
+        :param graph_cache_ttl: seconds get_all_graph and get_graph_def responses are reused
+        :param render_cache: on-disk store of graph renderings, revalidated before reuse
+        """
+
+        self.username = username
+        self.token = ""
+        self.verbose = verbose
+        self.api_prefix = api_prefix or API_PREFIX
+        self.pixel_cache = pixel_cache
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        # Invalidated by create_graph and delete_graph of this client
+        self.graph_cache = TTLCache(graph_cache_ttl)
+        # Renderings of a graph are dropped when this client changes one of its pixels
+        self.render_cache = render_cache
+        # Whether the account can use the batch pixels endpoint, None until post_pixels_batch tries it
+        self.batch_supported: bool | None = None
+
+        self.pool_size = pool_size
+        self._session: requests.Session | None = None
+        self._session_lock = threading.Lock()
+
+        self.set_token(token)
+
+    def __enter__(self) -> "PixelaClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+
+                    session = requests.Session()
+                    self._mount_pool(session)
+                    session.headers.update({"Connection": "keep-alive", "X-USER-TOKEN": self.token})
+                    self._session = session
+        return self._session
+
+    def _mount_pool(self, session: requests.Session) -> None:
+        from timed_adapter import TimedHTTPAdapter
+
+        adapter = TimedHTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+    def grow_pool(self, pool_size: int) -> None:
+        """
+        Keep at least pool_size connections alive, for callers sending that many
+        requests at once: the pool does not block, a connection opened beyond
+        its size is closed after a single request
+
+        :param pool_size: connections to keep, nothing changes if the pool is already as large
+        """
+
+        with self._session_lock:
+            if pool_size <= self.pool_size:
+                return
+            self.pool_size = pool_size
+            if self._session is not None:
+                # Requests in flight finish on the previous adapter, whose connections are then dropped
+                self._mount_pool(self._session)
+
+    def close(self) -> None:
+        """
+        Close every pooled connection
+        """
+
+        if self._session is not None:
+            self._session.close()
+
+    def set_token(self, token: str) -> None:
+        self.token = token
+        if self._session is not None:
+            self._session.headers["X-USER-TOKEN"] = token
+
+    def set_username(self, username: str) -> None:
+        self.username = username
+
+    @property
+    def prints(self) -> bool:
+        """
+        :return: True if this call should print, i.e. the client is verbose
+                 and the current thread or task is not in quiet()
+        """
+
+        return self.verbose and not _quiet.get()
+
+    def _request(self, endpoint: str, method: str, path: str, graph_id: str = "", auth: bool = True,
+                 params: dict | None = None, query: dict | None = None, stream: bool = False,
+                 headers: dict | None = None, idempotent: bool = True) -> Response:
+        """
+        Send a request through the pooled session,
+        retrying it as long as the retry policy allows,
+        and emit a RequestEvent with its timings
+
+        :param endpoint: name of the endpoint, reported in the event
+        :param method: HTTP method
+        :param path: endpoint path appended to the API prefix
+        :param graph_id: graph the request is about, reported in the event
+        :param auth: send the X-USER-TOKEN header
+        :param params: JSON body of the request
+        :param query: query string parameters
+        :param stream: leave the body unread, to be consumed with response.iter_content()
+        :param headers: headers added to the session's default ones
+        :param idempotent: sending the request twice is harmless; if False it is only
+                           retried when Pixela rejected it, not after a 5xx or a lost connection
+        :return: response of the request, its retry_count attribute
+                 holds the number of retries
+        :raises OSError: if no response came back, as requests.RequestException
+                         derives from it; callers catch OSError without importing requests
+        """
+
+        if self.prints:
+            print(f"{method}...")
+            if params is not None:
+                import json
+                print(json.dumps(params, indent=2, default=str))
+
+        headers = dict(headers or {})
+        if not auth:
+            # A None value removes the session's default header for this request
+            headers["X-USER-TOKEN"] = None
+
+        url = self.api_prefix + path
+
+        def send() -> Response:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            return self.session.request(method, url, json=params, headers=headers or None, params=query, stream=stream)
+
+        event = RequestEvent(endpoint=endpoint, method=method, graph_id=graph_id)
+        start_connect_timer()
+        start = time.perf_counter()
+        try:
+            response = self.retry_policy.call(send, log=print if self.prints else None, rejected_only=not idempotent)
+        except Exception as error:
+            event.error = str(error)
+            raise
+        else:
+            event.status = response.status_code
+            event.bytes_sent = len(response.request.body or b"")
+            if stream:
+                event.bytes_received = int(response.headers.get("Content-Length") or 0)
+            else:
+                event.bytes_received = len(response.content)
+            event.ttfb = response.elapsed.total_seconds()
+            event.retries = response.retry_count
+        finally:
+            event.total = time.perf_counter() - start
+            event.connect = connect_time()
+            self.instrumentation.emit(event)
+
+        return response
+
+    def _cached_get(self, key: tuple, endpoint: str, path: str, graph_id: str = "") -> Response:
+        """
+        GET request whose successful response is kept in the graph cache
+
+        :param key: cache key of the response
+        :return: cached or new response
+        """
+
+        response = self.graph_cache.get(key)
+        if response is not None:
+            if self.prints:
+                print("GET... (cached)")
+            return response
+
+        response = self._request(endpoint, "GET", path, graph_id)
+        if response.status_code == 200:
+            self.graph_cache.set(key, response)
+        return response
+
+    def _cached_render(self, endpoint: str, kind: str, path: str, graph_id: str, options: dict,
+                       auth: bool = True) -> Response:
+        """
+        GET request of a graph rendering kept in the render cache,
+        revalidated with If-None-Match/If-Modified-Since when the server sent validators
+
+        :param kind: rendering endpoint, part of the cache key
+        :param options: query parameters of the rendering, part of the cache key
+        :return: response from the server, or built from the cache with a from_cache attribute
+        """
+
+        if self.render_cache is None:
+            return self._request(endpoint, "GET", path, graph_id, auth=auth, query=options)
+
+        cached = self.render_cache.get(self.username, graph_id, kind, options)
+        if cached is not None and self.render_cache.is_fresh(cached[1]):
+            self.render_cache.record("hits")
+            if self.prints:
+                print("GET... (cached)")
+            return cached_response(*cached)
+
+        headers = self.render_cache.conditional_headers(cached[1]) if cached is not None else None
+        response = self._request(endpoint, "GET", path, graph_id, auth=auth, query=options, headers=headers)
+
+        if response.status_code == 304 and cached is not None:
+            self.render_cache.touch(self.username, graph_id, kind, options, cached[1])
+            self.render_cache.record("revalidated")
+            return cached_response(*cached)
+
+        self.render_cache.record("misses")
+        if response.status_code == 200:
+            self.render_cache.store(self.username, graph_id, kind, options, response.content, response.headers)
+        return response
+
+    def _invalidate_renders(self, graph_id: str) -> None:
+        if self.render_cache is not None:
+            self.render_cache.invalidate_graph(self.username, graph_id)
+
+    # __________USER__________
+
+    def create_user(self) -> Response:
+        """
+        This function call the API endpoint
+        to create a new user
+
+        Request type:   POST
+        End point:      /v1/users
+
+        :return: status code of the request
+        """
+
+        params = {
+            "token": self.token,
+            "username": self.username,
+            "agreeTermsOfService": "yes",
+            "notMinor": "yes"
+        }
+
+        return self._request("create_user", "POST", "/v1/users", auth=False, params=params)
+
+    def update_token(self, new_token: str) -> Response:
+        """
+        This function call the API endpoint
+        to update username
+
+        Request type:   PUT
+        End point:      /v1/users/<username>
 
+        :return: status code of the request
+        """
 
-def set_username(username: str) -> None:
-    global pixela_username
-    pixela_username = username
+        params = {
+            "newToken": new_token,
+        }
 
+        return self._request("update_token", "PUT", f"/v1/users/{self.username}", params=params)
 
-def get_token() -> str:
-    global pixela_token
-    return pixela_token
+    def delete_user(self) -> Response:
+        """
+        This function call the API endpoint
+        to delete a new user
 
+        Request type:   DELETE
+        End point:      /v1/users/<username>
 
-def get_username() -> str:
-    global pixela_username
-    return pixela_username
+        :return: status code of the request
+        """
 
+        response = self._request("delete_user", "DELETE", f"/v1/users/{self.username}")
 
-# __________USER__________
+        if response.status_code == 200:
+            self.graph_cache.clear()
 
-def create_user() -> Response:
-    """
-    This function call the API endpoint
-    to create a new user
+        return response
 
-    Request type:   POST
-    End point:      /v1/users
+    # __________USER PROFILE__________
 
-    :return: status code of the request
-    """
+    def view_user_profile(self, username: str) -> Response:
+        """
+        This function call the API endpoint
+        to view a user profile
 
-    api_endpoint = API_PREFIX + "/v1/users"
+        Request type:   GET
+        End point:      /@<username>
 
-    params = {
-        "token": pixela_token,
-        "username": pixela_username,
-        "agreeTermsOfService": "yes",
-        "notMinor": "yes"
-    }
+        :return: status code of the request
+        """
 
-    print("POST...")
-    print(json.dumps(params, indent=2, default=str))
+        return self._request("view_user_profile", "GET", f"/@{username}", auth=False)
 
-    response = requests.post(url=api_endpoint, json=params)
+    def update_user_profile(self, mode: str, new_value: str) -> Response:
+        """
+        This function call the API endpoint
+        to update a user profile
 
-    return response
+        Request type:   PUT
+        End point:      /@<username>
 
+        :return: status code of the request
+        """
 
-def update_token(new_token: str) -> Response:
-    """
-    This function call the API endpoint
-    to update username
+        params: dict = {}
 
-    Request type:   PUT
-    End point:      /v1/users/<username>
+        match mode:
+            case "displayName":
+                params = {"displayName": new_value}
+            case "gravatarIconEmail":
+                params = {"gravatarIconEmail": new_value}
+            case "title":
+                params = {"title": new_value}
+            case "timezone":
+                params = {"timezone": new_value}
+            case "aboutURL":
+                params = {"aboutURL": new_value}
+            case "pinnedGraphID":
+                params = {"pinnedGraphID": new_value}
 
-    :return: status code of the request
-    """
+        return self._request("update_user_profile", "PUT", f"/@{self.username}", params=params)
 
-    api_endpoint = API_PREFIX + f"/v1/users/{pixela_username}"
+    # __________GRAPH__________
 
-    params = {
-        "newToken": new_token,
-    }
+    def create_graph(self, graph_id: str, name: str, unit: str, data_type: str, color: str) -> Response:
+        """
+        This function call the API endpoint
+        to create a graph
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
+        Request type:   POST
+        End point:      /v1/users/<username>/graphs
 
-    print("PUT...")
-    print(json.dumps(params, indent=2, default=str))
+        :return: status code of the request
+        """
 
-    response = requests.put(url=api_endpoint, json=params, headers=headers)
+        params = {
+            "id": graph_id,
+            "name": name,
+            "unit": unit,
+            "type": data_type,
+            "color": color
+        }
 
-    return response
+        response = self._request("create_graph", "POST", f"/v1/users/{self.username}/graphs", params=params)
 
+        if response.status_code == 200:
+            self.graph_cache.invalidate(("graphs", self.username), ("graph-def", self.username, graph_id))
 
-def delete_user() -> Response:
-    """
-    This function call the API endpoint
-    to delete a new user
+        return response
 
-    Request type:   DELETE
-    End point:      /v1/users/<username>
+    def get_all_graph(self) -> Response:
+        """
+        This function call the API endpoint
+        to get all graph definitions (information)
 
-    :return: status code of the request
-    """
+        Request type:   GET
+        End point:      /v1/users/<username>/graphs
 
-    api_endpoint = API_PREFIX + f"/v1/users/{pixela_username}"
+        :return: status code of the request
+        """
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
+        return self._cached_get(("graphs", self.username), "get_all_graph", f"/v1/users/{self.username}/graphs")
 
-    print("DELETE...")
+    def get_graph_def(self, graph_id: str) -> Response:
+        """
+        This function call the API endpoint
+        to get a graph definitions (information)
 
-    response = requests.delete(url=api_endpoint, headers=headers)
+        Request type:   GET
+        End point:      /v1/users/<username>/graphs/<graphID>/graph-def
 
-    return response
+        :return: status code of the request
+        """
 
+        return self._cached_get(("graph-def", self.username, graph_id), "get_graph_def",
+                                f"/v1/users/{self.username}/graphs/{graph_id}/graph-def", graph_id)
 
-# __________USER PROFILE__________
+    def delete_graph(self, graph_id: str) -> Response:
+        """
+        This function call the API endpoint
+        to delete a graph
 
-def view_user_profile(username: str) -> Response:
-    """
-    This function call the API endpoint
-    to view a user profile
+        Request type:   DELETE
+        End point:      /v1/users/<username>/graphs/<graphID>
 
-    Request type:   GET
-    End point:      /@<username>
+        :return: status code of the request
+        """
+
+        response = self._request("delete_graph", "DELETE", f"/v1/users/{self.username}/graphs/{graph_id}",
+                                 graph_id)
+
+        if response.status_code == 200:
+            self.graph_cache.invalidate(("graphs", self.username), ("graph-def", self.username, graph_id))
+            if self.pixel_cache is not None:
+                self.pixel_cache.delete_graph(self.username, graph_id)
+            self._invalidate_renders(graph_id)
+
+        return response
+
+    def display_graph(self, graph_id: str, mode: str = "") -> Response:
+        """
+        This function call the API endpoint
+        to display a graph in html format
+
+        Request type:   GET
+        End point:      /v1/users/<username>/graphs/<graphID>.html
+
+        :param mode: "simple", "simple-short", "badge" or "line", the full page if empty
+        :return: status code of the request
+        """
+
+        return self._cached_render("display_graph", "html", f"/v1/users/{self.username}/graphs/{graph_id}.html",
+                                   graph_id, render_options(mode=mode))
+
+    def get_graph_svg(self, graph_id: str, date: str = "", mode: str = "", appearance: str = "") -> Response:
+        """
+        This function call the API endpoint
+        to get a graph as an SVG image
+
+        Request type:   GET
+        End point:      /v1/users/<username>/graphs/<graphID>
+
+        :param date: last date (yyyyMMdd) shown, today if empty
+        :param mode: "short", "badge" or "line", the full graph if empty
+        :param appearance: "dark" for the dark theme
+        :return: status code of the request
+        """
+
+        return self._cached_render("get_graph_svg", "svg", f"/v1/users/{self.username}/graphs/{graph_id}",
+                                   graph_id, render_options(date=date, mode=mode, appearance=appearance),
+                                   auth=False)
+
+    def get_graph_pixels(self, graph_id: str, date_from: str = "", date_to: str = "",
+                         with_body: bool = False) -> Response:
+        """
+        This function call the API endpoint
+        to get graph's pixels list
+
+        Request type:   GET
+        End point:      /v1/users/<username>/graphs/<graphID>/pixels
+
+        :param date_from: first date (yyyyMMdd) of the range, server default if empty
+        :param date_to: last date (yyyyMMdd) of the range, server default if empty
+        :param with_body: list pixels as {"date", "quantity"} objects instead of dates only
+        :return: status code of the request
+        """
+
+        return self._request("get_graph_pixels", "GET", f"/v1/users/{self.username}/graphs/{graph_id}/pixels",
+                             graph_id, query=pixels_query(date_from, date_to, with_body))
+
+    def iter_graph_pixels(self, graph_id: str, date_from: str = "", date_to: str = "",
+                          with_body: bool = True) -> Iterator[dict]:
+        """
+        Stream a graph's pixels list, decoding one pixel at a time
+        while the response body is read, with bounded memory
+
+        Request type:   GET
+        End point:      /v1/users/<username>/graphs/<graphID>/pixels
+
+        :param date_from: first date (yyyyMMdd) of the range, server default if empty
+        :param date_to: last date (yyyyMMdd) of the range, server default if empty
+        :param with_body: include quantities, otherwise pixels only have a date
+        :return: generator of {"date", "quantity"} dicts
+        :raises requests.HTTPError: if the server answers with an error
+        """
+
+        response = self._request("get_graph_pixels", "GET", f"/v1/users/{self.username}/graphs/{graph_id}/pixels",
+                                 graph_id, query=pixels_query(date_from, date_to, with_body), stream=True)
+        from pixel_stream import iter_json_array
+
+        with response:
+            response.raise_for_status()
+            for pixel in iter_json_array(response.iter_content(chunk_size=STREAM_CHUNK_SIZE), "pixels"):
+                yield pixel if isinstance(pixel, dict) else {"date": pixel}
+
+    def iter_pixel_windows(self, graph_id: str, date_from: str, date_to: str = "",
+                           window_days: int = PIXEL_WINDOW_DAYS, with_body: bool = True) -> Iterator[dict]:
+        """
+        Walk a long pixel history one fixed-size date window at a time,
+        sending one pixels list request per window, oldest first
+
+        :param date_from: first date (yyyyMMdd) of the history
+        :param date_to: last date (yyyyMMdd) of the history, today by default
+        :param window_days: days covered by each request
+        :param with_body: include quantities, otherwise pixels only have a date
+        :return: generator of {"date", "quantity"} dicts, in date order
+        :raises requests.HTTPError: if the server answers with an error
+        """
+
+        for window_from, window_to in date_windows(date_from, date_to, window_days):
+            yield from self.iter_graph_pixels(graph_id, window_from, window_to, with_body)
+
+    def sync_graph_pixels(self, graph_id: str, full: bool = False,
+                          max_age: float = SYNC_INTERVAL) -> tuple[list[dict], Response | None]:
+        """
+        Get a graph's pixels from the local cache,
+        fetching from the server only the days since the last sync
+
+        :param graph_id: graph to read
+        :param full: download the whole pixel list again
+        :param max_age: seconds since the last sync during which no request is sent
+        :return: cached pixels as {"date", "quantity"} dicts, and the response
+                 of the sync request (None when served without one)
+        """
+
+        if self.pixel_cache is None:
+            self.pixel_cache = PixelCache()
+
+        today = Date.today().strftime("%Y%m%d")
+        state = None if full else self.pixel_cache.get_sync_state(self.username, graph_id)
+
+        if state is not None and time.time() - state[1] < max_age:
+            return self.pixel_cache.get_pixels(self.username, graph_id), None
+
+        if state is None:
+            response = self.get_graph_pixels(graph_id, with_body=True)
+        else:
+            # Start one day early so a pixel of the last synced day changed since is picked up
+            date_from = (datetime.strptime(state[0], "%Y%m%d") - timedelta(days=1)).strftime("%Y%m%d")
+            response = self.get_graph_pixels(graph_id, date_from=date_from, date_to=today, with_body=True)
+
+        if response.status_code == 200:
+            pixels = response.json().get("pixels") or []
+            if state is None:
+                self.pixel_cache.replace_pixels(self.username, graph_id, pixels, today)
+            else:
+                # The response is the whole window: a cached pixel missing from it was deleted on the server
+                self.pixel_cache.replace_range(self.username, graph_id, date_from, today, pixels, today)
+
+        return self.pixel_cache.get_pixels(self.username, graph_id), response
+
+    def get_graph_stats(self, graph_id: str) -> Response:
+        """
+        This function call the API endpoint
+        to get graph's statistics
+
+        Request type:   GET
+        End point:      /v1/users/<username>/graphs/<graphID>/stats
+
+        :return: status code of the request
+        """
+
+        return self._request("get_graph_stats", "GET", f"/v1/users/{self.username}/graphs/{graph_id}/stats",
+                             graph_id)
+
+    # __________PIXEL__________
+
+    def post_pixel(self, graph_id: str, date: str, quantity: str) -> Response:
+        """
+        This function call the API endpoint
+        to post a pixel to a graph
+
+        Request type:   POST
+        End point:      /v1/users/<username>/graphs/<graphID>
+
+        :return: status code of the request
+        """
+
+        params = {
+            "date": date,
+            "quantity": quantity
+        }
+
+        response = self._request("post_pixel", "POST", f"/v1/users/{self.username}/graphs/{graph_id}",
+                                 graph_id, params=params)
+
+        if response.status_code == 200:
+            if self.pixel_cache is not None:
+                self.pixel_cache.upsert_pixel(self.username, graph_id, date, quantity)
+            self._invalidate_renders(graph_id)
+
+        return response
+
+    def post_pixels_batch(self, graph_id: str, pixels: Iterable[dict], chunk_size: int = PIXEL_BATCH_SIZE,
+                          workers: int = DEFAULT_POOL_SIZE) -> list[dict]:
+        """
+        This function call the API endpoint
+        to post many pixels to a graph at once
+
+        Request type:   POST
+        End point:      /v1/users/<username>/graphs/<graphID>/pixels
+
+        The pixels are split into chunks of chunk_size, sent concurrently.
+        If the account cannot use the batch endpoint (it is for Pixela
+        supporters), every pixel is posted with post_pixel instead,
+        concurrently too. The first chunk is sent alone until the client
+        knows which of the two applies, so an account without the batch
+        endpoint costs a single rejected request.
+
+        :param pixels: {"date", "quantity"} dicts, with an optional "optionalData"
+        :param chunk_size: pixels per batch request
+        :param workers: requests in flight at the same time
+        :return: one outcome per chunk, in order: chunk index, count, first and last date,
+                 batch (sent in one request), status, message, and failed pixels
+                 as {"date", "status", "message"} dicts
+        """
+
+        from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        outcomes: dict[int, dict] = {}
+        # Chunks wait on their single posts, which therefore get their own workers.
+        # Workers run quietly: a print per request of hundreds of pixels would be unreadable
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as chunk_executor, \
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-single") as single_executor:
+            pending: dict[Future, int] = {}
+            for index, chunk in enumerate(pixel_chunks(pixels, chunk_size)):
+                if len(pending) >= workers * 2 or (self.batch_supported is None and pending):
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        outcomes[pending.pop(future)] = future.result()
+                future = chunk_executor.submit(run_quietly, self._post_chunk, graph_id, index, chunk, single_executor)
+                pending[future] = index
+            for future in list(pending):
+                outcomes[pending.pop(future)] = future.result()
+
+        return [outcomes[index] for index in sorted(outcomes)]
+
+    def _post_chunk(self, graph_id: str, index: int, chunk: list[dict], single_executor) -> dict:
+        """
+        Post a chunk of post_pixels_batch with the batch endpoint,
+        or pixel by pixel if the account cannot use it
+
+        :param single_executor: executor running the single posts
+        :return: outcome of the chunk
+        """
+
+        outcome = {"chunk": index, "count": len(chunk), "first_date": chunk[0]["date"],
+                   "last_date": chunk[-1]["date"], "batch": True, "status": 200, "message": "", "failed": []}
+
+        if self.batch_supported is not False:
+            try:
+                response = self._request("post_pixels_batch", "POST",
+                                         f"/v1/users/{self.username}/graphs/{graph_id}/pixels",
+                                         graph_id, params=chunk)
+            except OSError as error:
+                return failed_chunk(outcome, chunk, 0, str(error))
+
+            if response.status_code not in BATCH_UNAVAILABLE_STATUSES:
+                if response.status_code < 500:
+                    # A 5xx tells nothing about the account, the next chunk is still sent alone
+                    self.batch_supported = True
+                if response.status_code != 200:
+                    return failed_chunk(outcome, chunk, response.status_code, response_message(response))
+                if self.pixel_cache is not None:
+                    self.pixel_cache.upsert_pixels(self.username, graph_id, chunk)
+                self._invalidate_renders(graph_id)
+                return outcome
+            self.batch_supported = False
+
+        def post_one(pixel: dict) -> dict | None:
+            try:
+                response = run_quietly(self.post_pixel, graph_id, pixel["date"], pixel["quantity"])
+            except OSError as error:
+                return {"date": pixel["date"], "status": 0, "message": str(error)}
+            if response.status_code != 200:
+                return {"date": pixel["date"], "status": response.status_code, "message": response_message(response)}
+            return None
+
+        outcome["batch"] = False
+        outcome["failed"] = [failure for failure in single_executor.map(post_one, chunk) if failure is not None]
+        if outcome["failed"]:
+            outcome["status"] = outcome["failed"][0]["status"]
+            outcome["message"] = f"{len(outcome['failed'])} of {len(chunk)} pixels failed"
+        return outcome
+
+    def get_pixel(self, graph_id: str, date: str) -> Response:
+        """
+        This function call the API endpoint
+        to get a pixel of a graph
+
+        Request type:   GET
+        End point:      /v1/users/<username>/graphs/<graphID>/<yyyyMMdd>
+
+        :return: status code of the request
+        """
+
+        return self._request("get_pixel", "GET", f"/v1/users/{self.username}/graphs/{graph_id}/{date}",
+                             graph_id)
+
+    def update_pixel(self, graph_id: str, date: str, quantity: str) -> Response:
+        """
+        This function call the API endpoint
+        to update a pixel of a graph
+
+        Request type:   PUT
+        End point:      /v1/users/<username>/graphs/<graphID>/<yyyyMMdd>
+
+        :return: status code of the request
+        """
+
+        params = {
+            "quantity": quantity
+        }
+
+        response = self._request("update_pixel", "PUT", f"/v1/users/{self.username}/graphs/{graph_id}/{date}",
+                                 graph_id, params=params)
+
+        if response.status_code == 200:
+            if self.pixel_cache is not None:
+                self.pixel_cache.upsert_pixel(self.username, graph_id, date, quantity)
+            self._invalidate_renders(graph_id)
+
+        return response
+
+    def increment_pixel(self, graph_id: str) -> Response:
+        """
+        This function call the API endpoint
+        to increment today's pixel of a graph, by 1 (int graph) or 0.01 (float graph)
 
-    :return: status code of the request
-    """
+        Request type:   PUT
+        End point:      /v1/users/<username>/graphs/<graphID>/increment
 
-    api_endpoint = API_PREFIX + f"/@{username}"
+        :return: status code of the request
+        """
 
-    print("GET...")
+        return self._change_today_pixel("increment_pixel", graph_id, "increment")
 
-    response = requests.get(url=api_endpoint)
+    def decrement_pixel(self, graph_id: str) -> Response:
+        """
+        This function call the API endpoint
+        to decrement today's pixel of a graph, by 1 (int graph) or 0.01 (float graph)
 
-    return response
+        Request type:   PUT
+        End point:      /v1/users/<username>/graphs/<graphID>/decrement
 
+        :return: status code of the request
+        """
 
-def update_user_profile(mode: str, new_value: str) -> Response:
+        return self._change_today_pixel("decrement_pixel", graph_id, "decrement")
+
+    def add_pixel(self, graph_id: str, quantity: str) -> Response:
+        """
+        This function call the API endpoint
+        to add a quantity to today's pixel of a graph
+
+        Request type:   PUT
+        End point:      /v1/users/<username>/graphs/<graphID>/add
+
+        :return: status code of the request
+        """
+
+        return self._change_today_pixel("add_pixel", graph_id, "add", {"quantity": quantity})
+
+    def subtract_pixel(self, graph_id: str, quantity: str) -> Response:
+        """
+        This function call the API endpoint
+        to subtract a quantity from today's pixel of a graph
+
+        Request type:   PUT
+        End point:      /v1/users/<username>/graphs/<graphID>/subtract
+
+        :return: status code of the request
+        """
+
+        return self._change_today_pixel("subtract_pixel", graph_id, "subtract", {"quantity": quantity})
+
+    def _change_today_pixel(self, endpoint: str, graph_id: str, action: str, params: dict | None = None) -> Response:
+        """
+        Change today's pixel relatively to its current quantity
+
+        The server does not send the new quantity back, so instead of
+        updating the pixel cache the next sync of the graph is forced.
+        The change is applied again if the request is sent twice, so it
+        is only retried when Pixela rejected it.
+        """
+
+        response = self._request(endpoint, "PUT", f"/v1/users/{self.username}/graphs/{graph_id}/{action}",
+                                 graph_id, params=params, idempotent=False)
+
+        if response.status_code == 200:
+            if self.pixel_cache is not None:
+                self.pixel_cache.expire_sync(self.username, graph_id)
+            self._invalidate_renders(graph_id)
+
+        return response
+
+    def delete_pixel(self, graph_id: str, date: str) -> Response:
+        """
+        This function call the API endpoint
+        to delete a pixel of a graph
+
+        Request type:   DELETE
+        End point:      /v1/users/<username>/graphs/<graphID>/<yyyyMMdd>
+
+        :return: status code of the request
+        """
+
+        response = self._request("delete_pixel", "DELETE", f"/v1/users/{self.username}/graphs/{graph_id}/{date}",
+                                 graph_id)
+
+        if response.status_code == 200:
+            if self.pixel_cache is not None:
+                self.pixel_cache.delete_pixel(self.username, graph_id, date)
+            self._invalidate_renders(graph_id)
+
+        return response
+
+
+def render_options(**options: str) -> dict:
+    """
+    :return: query string of a rendering endpoint, without the empty options
     """
-    This function call the API endpoint
-    to update a user profile
 
-    Request type:   PUT
-    End point:      /@<username>
+    return {name: value for name, value in options.items() if value}
+
 
-    :return: status code of the request
+def cached_response(body: bytes, meta: dict) -> Response:
     """
+    Build a response from a rendering of the render cache
 
-    api_endpoint = API_PREFIX + f"/@{pixela_username}"
+    :param meta: metadata stored with the rendering
+    """
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
+    import requests
+    from requests.utils import get_encoding_from_headers
+
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response._content = body
+    response.headers["Content-Type"] = meta.get("content_type", "")
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.retry_count = 0
+    response.from_cache = True
+    return response
 
-    params: dict = {}
 
-    match mode:
-        case "displayName":
-            params = {"displayName": new_value}
-        case "gravatarIconEmail":
-            params = {"gravatarIconEmail": new_value}
-        case "title":
-            params = {"title": new_value}
-        case "timezone":
-            params = {"timezone": new_value}
-        case "aboutURL":
-            params = {"aboutURL": new_value}
-        case "pinnedGraphID":
-            params = {"pinnedGraphID": new_value}
+def pixels_query(date_from: str, date_to: str, with_body: bool) -> dict:
+    """
+    :return: query string of the pixels list endpoint
+    """
 
-    print("PUT...")
-    print(json.dumps(params, indent=2, default=str))
+    query = {}
+    if date_from:
+        query["from"] = date_from
+    if date_to:
+        query["to"] = date_to
+    if with_body:
+        query["withBody"] = "true"
+    return query
 
-    response = requests.put(url=api_endpoint, headers=headers, json=params)
 
-    return response
+def pixel_chunks(pixels: Iterable[dict], chunk_size: int) -> Iterator[list[dict]]:
+    """
+    Split pixels into bodies of the batch pixels endpoint, without reading ahead
 
+    :param pixels: {"date", "quantity"} dicts, with an optional "optionalData"
+    :return: generator of lists of at most chunk_size pixels
+    """
 
-# __________GRAPH__________
+    chunk = []
+    for pixel in pixels:
+        entry = {"date": str(pixel["date"]), "quantity": str(pixel["quantity"])}
+        if pixel.get("optionalData"):
+            entry["optionalData"] = pixel["optionalData"]
+        chunk.append(entry)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
-def create_graph(graph_id: str, name: str, unit: str, data_type: str, color: str) -> Response:
+
+def failed_chunk(outcome: dict, chunk: list[dict], status: int, message: str) -> dict:
     """
-    This function call the API endpoint
-    to create a graph
+    :return: outcome of a chunk none of whose pixels was posted
+    """
+
+    outcome.update(status=status, message=message,
+                   failed=[{"date": pixel["date"], "status": status, "message": message} for pixel in chunk])
+    return outcome
 
-    Request type:   POST
-    End point:      /v1/users/<username>/graphs
 
-    :return: status code of the request
+def response_message(response: Response) -> str:
+    """
+    :return: message of a Pixela response, its text if it has none
     """
 
-    api_endpoint = API_PREFIX + f"/v1/users/{pixela_username}/graphs"
+    try:
+        return response.json().get("message", "")
+    except (ValueError, AttributeError):
+        return response.text
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
 
-    params = {
-        "id": graph_id,
-        "name": name,
-        "unit": unit,
-        "type": data_type,
-        "color": color
-    }
+def date_windows(date_from: str, date_to: str = "", window_days: int = PIXEL_WINDOW_DAYS) -> Iterator[tuple[str, str]]:
+    """
+    Split a date range into consecutive windows of at most window_days days
 
-    print("POST...")
-    print(json.dumps(params, indent=2, default=str))
+    :param date_from: first date (yyyyMMdd) of the range
+    :param date_to: last date (yyyyMMdd) of the range, today by default
+    :return: generator of (first date, last date) of each window, both included
+    """
 
-    response = requests.post(url=api_endpoint, headers=headers, json=params)
+    if window_days < 1:
+        raise ValueError("window_days must be at least 1")
 
-    return response
+    start = datetime.strptime(date_from, "%Y%m%d").date()
+    end = datetime.strptime(date_to, "%Y%m%d").date() if date_to else Date.today()
+    while start <= end:
+        window_end = min(end, start + timedelta(days=window_days - 1))
+        yield start.strftime("%Y%m%d"), window_end.strftime("%Y%m%d")
+        start = window_end + timedelta(days=1)
 
 
-def get_all_graph() -> Response:
-    """
-    This function call the API endpoint
-    to get all graph definitions (information)
+# Client of the module-level functions below, unless another one is bound with use_client()
+_client = PixelaClient(pixel_cache=PixelCache(), render_cache=RenderCache())
+_current_client: ContextVar[PixelaClient | None] = ContextVar("current_client", default=None)
 
-    Request type:   GET
-    End point:      /v1/users/<username>/graphs
 
-    :return: status code of the request
+def get_client() -> PixelaClient:
     """
+    :return: client bound to the current thread or task by use_client(), the default client otherwise
+    """
+
+    return _current_client.get() or _client
 
-    api_endpoint = API_PREFIX + f"/v1/users/{pixela_username}/graphs"
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
+@contextmanager
+def use_client(client: PixelaClient) -> Iterator[PixelaClient]:
+    """
+    Make the module-level functions act as the account of another client
+    in the current thread or task, e.g. one client per account of an AccountPool
 
-    print("GET...")
+    Other threads keep using their own client, so several accounts
+    can be driven at the same time in one process.
+    """
 
-    response = requests.get(url=api_endpoint, headers=headers)
+    reset_token = _current_client.set(client)
+    try:
+        yield client
+    finally:
+        _current_client.reset(reset_token)
 
-    return response
 
+@contextmanager
+def quiet() -> Iterator[None]:
+    """
+    Silence the prints of verbose clients in the current thread or task
 
-def get_graph_def(graph_id: str) -> Response:
+    Other threads sharing the same clients keep printing; use
+    run_quietly for the functions submitted to worker threads.
     """
-    This function call the API endpoint
-    to get a graph definitions (information)
 
-    Request type:   GET
-    End point:      /v1/users/<username>/graphs/<graphID>/graph-def
+    reset_token = _quiet.set(True)
+    try:
+        yield
+    finally:
+        _quiet.reset(reset_token)
 
-    :return: status code of the request
+
+def run_quietly(func: Callable[..., T], *args) -> T:
+    """
+    Call a function inside quiet(), e.g. as the target of executor.submit
     """
 
-    api_endpoint = API_PREFIX + f"/v1/users/{pixela_username}/graphs/{graph_id}/graph-def"
+    with quiet():
+        return func(*args)
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
 
-    print("GET...")
+def set_token(token: str) -> None:
+    get_client().set_token(token)
 
-    response = requests.get(url=api_endpoint, headers=headers)
 
-    return response
+def set_username(username: str) -> None:
+    get_client().set_username(username)
 
 
-def delete_graph(graph_id: str) -> Response:
+def set_api_prefix(api_prefix: str) -> None:
+    """
+    Send the requests of the module-level functions to another server,
+    e.g. a FakePixelaServer
     """
-    This function call the API endpoint
-    to delete a graph
 
-    Request type:   DELETE
-    End point:      /v1/users/<username>/graphs/<graphID>
+    global API_PREFIX
+    API_PREFIX = api_prefix.rstrip("/")
+    get_client().api_prefix = API_PREFIX
+
+
+def set_rate_limit(rate: float, burst: int = 1, shared_path: str = "") -> None:
+    """
+    Limit the requests of the module-level functions
 
-    :return: status code of the request
+    :param rate: requests per second, 0 removes the limit
+    :param burst: requests allowed at once after an idle period
+    :param shared_path: lock file shared with other processes, this process only if empty
     """
 
-    api_endpoint = API_PREFIX + f"/v1/users/{pixela_username}/graphs/{graph_id}"
+    if rate <= 0:
+        get_client().rate_limiter = None
+    elif shared_path:
+        get_client().rate_limiter = FileRateLimiter(rate, burst, shared_path)
+    else:
+        get_client().rate_limiter = RateLimiter(rate, burst)
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
 
-    print("DELETE...")
+def get_token() -> str:
+    return get_client().token
 
-    response = requests.delete(url=api_endpoint, headers=headers)
 
-    return response
+def get_username() -> str:
+    return get_client().username
 
 
-def display_graph(graph_id: str) -> Response:
+# __________USER__________
+
+def create_user() -> Response:
     """
-    This function call the API endpoint
-    to display a graph in html format
+    Create a new user, see PixelaClient.create_user
+    """
+
+    return get_client().create_user()
 
-    Request type:   GET
-    End point:      /v1/users/<username>/graphs/<graphID>.html
 
-    :return: status code of the request
+def update_token(new_token: str) -> Response:
+    """
+    Update the API token, see PixelaClient.update_token
     """
 
-    api_endpoint = API_PREFIX + f"/v1/users/{pixela_username}/graphs/{graph_id}.html"
+    return get_client().update_token(new_token)
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
 
-    print("GET...")
+def delete_user() -> Response:
+    """
+    Delete the user, see PixelaClient.delete_user
+    """
 
-    response = requests.get(url=api_endpoint, headers=headers)
+    return get_client().delete_user()
 
-    return response
 
+# __________USER PROFILE__________
 
-def get_graph_pixels(graph_id: str) -> Response:
+def view_user_profile(username: str) -> Response:
     """
-    This function call the API endpoint
-    to get graph's pixels list
+    View a user profile, see PixelaClient.view_user_profile
+    """
+
+    return get_client().view_user_profile(username)
 
-    Request type:   GET
-    End point:      /v1/users/<username>/graphs/<graphID>/pixels
 
-    :return: status code of the request
+def update_user_profile(mode: str, new_value: str) -> Response:
+    """
+    Update the user profile, see PixelaClient.update_user_profile
     """
 
-    api_endpoint = API_PREFIX + f"/v1/users/{pixela_username}/graphs/{graph_id}/pixels"
+    return get_client().update_user_profile(mode, new_value)
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
 
-    print("GET...")
+# __________GRAPH__________
 
-    response = requests.get(url=api_endpoint, headers=headers)
+def create_graph(graph_id: str, name: str, unit: str, data_type: str, color: str) -> Response:
+    """
+    Create a graph, see PixelaClient.create_graph
+    """
 
-    return response
+    return get_client().create_graph(graph_id, name, unit, data_type, color)
 
 
-def get_graph_stats(graph_id: str) -> Response:
+def get_all_graph() -> Response:
     """
-    This function call the API endpoint
-    to get graph's statistics
+    Get all graph definitions, see PixelaClient.get_all_graph
+    """
+
+    return get_client().get_all_graph()
 
-    Request type:   GET
-    End point:      /v1/users/<username>/graphs/<graphID>/stats
 
-    :return: status code of the request
+def get_graph_def(graph_id: str) -> Response:
+    """
+    Get a graph definition, see PixelaClient.get_graph_def
     """
 
-    api_endpoint = API_PREFIX + f"/v1/users/{pixela_username}/graphs/{graph_id}/stats"
+    return get_client().get_graph_def(graph_id)
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
 
-    print("GET...")
+def delete_graph(graph_id: str) -> Response:
+    """
+    Delete a graph, see PixelaClient.delete_graph
+    """
 
-    response = requests.get(url=api_endpoint, headers=headers)
+    return get_client().delete_graph(graph_id)
 
-    return response
 
+def display_graph(graph_id: str, mode: str = "") -> Response:
+    """
+    Get a graph in html format, see PixelaClient.display_graph
+    """
+
+    return get_client().display_graph(graph_id, mode)
 
-# __________PIXEL__________
 
-def post_pixel(graph_id: str, date: str, quantity: str) -> Response:
+def get_graph_svg(graph_id: str, date: str = "", mode: str = "", appearance: str = "") -> Response:
     """
-    This function call the API endpoint
-    to post a pixel to a graph
+    Get a graph as an SVG image, see PixelaClient.get_graph_svg
+    """
+
+    return get_client().get_graph_svg(graph_id, date, mode, appearance)
 
-    Request type:   POST
-    End point:      /v1/users/<username>/graphs/<graphID>
 
-    :return: status code of the request
+def get_graph_pixels(graph_id: str, date_from: str = "", date_to: str = "", with_body: bool = False) -> Response:
+    """
+    Get a graph's pixels list, see PixelaClient.get_graph_pixels
     """
 
-    api_endpoint = API_PREFIX + f"/v1/users/{pixela_username}/graphs/{graph_id}"
+    return get_client().get_graph_pixels(graph_id, date_from, date_to, with_body)
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
 
-    params = {
-        "date": date,
-        "quantity": quantity
-    }
+def iter_graph_pixels(graph_id: str, date_from: str = "", date_to: str = "",
+                      with_body: bool = True) -> Iterator[dict]:
+    """
+    Stream a graph's pixels list, see PixelaClient.iter_graph_pixels
+    """
 
-    print("POST...")
-    print(json.dumps(params, indent=2, default=str))
+    return get_client().iter_graph_pixels(graph_id, date_from, date_to, with_body)
 
-    response = requests.post(url=api_endpoint, headers=headers, json=params)
 
-    return response
+def iter_pixel_windows(graph_id: str, date_from: str, date_to: str = "",
+                       window_days: int = PIXEL_WINDOW_DAYS, with_body: bool = True) -> Iterator[dict]:
+    """
+    Walk a long pixel history window by window, see PixelaClient.iter_pixel_windows
+    """
 
+    return get_client().iter_pixel_windows(graph_id, date_from, date_to, window_days, with_body)
 
-def get_pixel(graph_id: str, date: str) -> Response:
+
+def sync_graph_pixels(graph_id: str, full: bool = False) -> tuple[list[dict], Response | None]:
+    """
+    Get a graph's pixels from the local cache, see PixelaClient.sync_graph_pixels
     """
-    This function call the API endpoint
-    to get a pixel of a graph
 
-    Request type:   GET
-    End point:      /v1/users/<username>/graphs/<graphID>/<yyyyMMdd>
+    return get_client().sync_graph_pixels(graph_id, full)
 
-    :return: status code of the request
+
+def get_graph_stats(graph_id: str) -> Response:
+    """
+    Get a graph's statistics, see PixelaClient.get_graph_stats
     """
 
-    api_endpoint = API_PREFIX + f"/v1/users/{pixela_username}/graphs/{graph_id}/{date}"
+    return get_client().get_graph_stats(graph_id)
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
 
-    print("GET...")
+# __________PIXEL__________
 
-    response = requests.get(url=api_endpoint, headers=headers)
+def post_pixel(graph_id: str, date: str, quantity: str) -> Response:
+    """
+    Post a pixel to a graph, see PixelaClient.post_pixel
+    """
 
-    return response
+    return get_client().post_pixel(graph_id, date, quantity)
 
 
-def update_pixel(graph_id: str, date: str, quantity: str) -> Response:
+def post_pixels_batch(graph_id: str, pixels: Iterable[dict], chunk_size: int = PIXEL_BATCH_SIZE,
+                      workers: int = DEFAULT_POOL_SIZE) -> list[dict]:
+    """
+    Post many pixels to a graph at once, see PixelaClient.post_pixels_batch
     """
-    This function call the API endpoint
-    to update a pixel of a graph
 
-    Request type:   PUT
-    End point:      /v1/users/<username>/graphs/<graphID>/<yyyyMMdd>
+    return get_client().post_pixels_batch(graph_id, pixels, chunk_size, workers)
 
-    :return: status code of the request
+
+def get_pixel(graph_id: str, date: str) -> Response:
+    """
+    Get a pixel of a graph, see PixelaClient.get_pixel
     """
 
-    api_endpoint = API_PREFIX + f"/v1/users/{pixela_username}/graphs/{graph_id}/{date}"
+    return get_client().get_pixel(graph_id, date)
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
 
-    params = {
-        "quantity": quantity
-    }
+def update_pixel(graph_id: str, date: str, quantity: str) -> Response:
+    """
+    Update a pixel of a graph, see PixelaClient.update_pixel
+    """
 
-    print("PUT...")
-    print(json.dumps(params, indent=2, default=str))
+    return get_client().update_pixel(graph_id, date, quantity)
 
-    response = requests.get(url=api_endpoint, headers=headers, json=params)
 
-    return response
+def increment_pixel(graph_id: str) -> Response:
+    """
+    Increment today's pixel of a graph, see PixelaClient.increment_pixel
+    """
 
+    return get_client().increment_pixel(graph_id)
 
-def delete_pixel(graph_id: str, date: str) -> Response:
+
+def decrement_pixel(graph_id: str) -> Response:
+    """
+    Decrement today's pixel of a graph, see PixelaClient.decrement_pixel
     """
-    This function call the API endpoint
-    to delete a pixel of a graph
 
-    Request type:   DELETE
-    End point:      /v1/users/<username>/graphs/<graphID>/<yyyyMMdd>
+    return get_client().decrement_pixel(graph_id)
 
-    :return: status code of the request
+
+def add_pixel(graph_id: str, quantity: str) -> Response:
+    """
+    Add a quantity to today's pixel of a graph, see PixelaClient.add_pixel
     """
 
-    api_endpoint = API_PREFIX + f"/v1/users/{pixela_username}/graphs/{graph_id}/{date}"
+    return get_client().add_pixel(graph_id, quantity)
 
-    headers = {
-        "X-USER-TOKEN": pixela_token
-    }
 
-    print("DELETE...")
+def subtract_pixel(graph_id: str, quantity: str) -> Response:
+    """
+    Subtract a quantity from today's pixel of a graph, see PixelaClient.subtract_pixel
+    """
 
-    response = requests.delete(url=api_endpoint, headers=headers)
+    return get_client().subtract_pixel(graph_id, quantity)
 
-    return response
+
+def delete_pixel(graph_id: str, date: str) -> Response:
+    """
+    Delete a pixel of a graph, see PixelaClient.delete_pixel
+    """
+
+    return get_client().delete_pixel(graph_id, date)
@@ -0,0 +1,387 @@
+"""
+Define asyncio counterparts of the handler functions in pixela_api_handler.py
+
+Every coroutine runs the blocking call of a PixelaClient in a worker
+thread, so all requests share the client's pooled keep-alive connections
+and return the same requests.Response objects as the blocking functions.
+The streamed pixel lists are async iterators, decoded in a worker thread
+a batch of pixels at a time. The number of requests in flight is bounded
+by a configurable limit. Like the blocking functions, the module-level
+coroutines act as the client bound by pixela_api_handler.use_client(),
+and the worker threads see the quiet() and use_client() of the caller.
+
+    async for pixel in pixela_async.iter_graph_pixels("water"):
+        print(pixel["date"], pixel["quantity"])
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterable, Iterator, TypeVar
+
+import pixela_api_handler as pixela
+
+if TYPE_CHECKING:
+    from requests import Response
+
+DEFAULT_CONCURRENCY = pixela.DEFAULT_POOL_SIZE
+ITER_BATCH_SIZE = 1000  # pixels decoded per hop to a worker thread
+
+T = TypeVar("T")
+
+
+class AsyncPixelaClient:
+    """
+    asyncio wrapper around a PixelaClient
+    """
+
+    def __init__(self, client: pixela.PixelaClient | None = None,
+                 concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        """
+        :param client: client whose connection pool is shared, grown to the concurrency
+                       limit if smaller, a new one sized to the limit by default
+        :param concurrency: maximum number of requests in flight
+        """
+
+        if client is None:
+            client = pixela.PixelaClient(username=pixela.get_username(), token=pixela.get_token(),
+                                         pool_size=concurrency, verbose=False)
+        client.grow_pool(concurrency)
+        self._client = client
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="pixela")
+        # A semaphore only works in the event loop it was first used in, and a client can outlive
+        # asyncio.run(), so every running loop gets its own
+        self._semaphores: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self._semaphores_lock = threading.Lock()
+
+    async def __aenter__(self) -> "AsyncPixelaClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def client(self) -> pixela.PixelaClient:
+        """
+        :return: client sending the requests
+        """
+
+        return self._client
+
+    def close(self) -> None:
+        """
+        Stop the worker threads, the wrapped client stays open
+        """
+
+        self._executor.shutdown(wait=False)
+
+    def _slots(self) -> asyncio.Semaphore:
+        """
+        :return: semaphore bounding the requests in flight of the running event loop
+        """
+
+        loop = asyncio.get_running_loop()
+        with self._semaphores_lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                self._semaphores = {other: semaphore for other, semaphore in self._semaphores.items()
+                                    if not other.is_closed()}
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+        return semaphore
+
+    async def _call(self, func: Callable[..., T], *args) -> T:
+        """
+        Run a blocking client method in a worker thread
+
+        :param func: bound method of the wrapped client
+        :return: what the method returns, the response of the request most of the time
+        """
+
+        # run_in_executor does not carry the caller's context variables over to the worker thread
+        context = contextvars.copy_context()
+        async with self._slots():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, context.run, func, *args)
+
+    async def _iterate(self, pixels: Iterator[dict]) -> AsyncIterator[dict]:
+        """
+        Drain a blocking pixel generator of the wrapped client in worker threads
+
+        A streamed response keeps its connection until the generator
+        ends, so it takes one request slot for the whole iteration.
+
+        :param pixels: generator returned by an iter_* method of the wrapped client
+        :return: async generator of the same pixels
+        """
+
+        context = contextvars.copy_context()
+        async with self._slots():
+            loop = asyncio.get_running_loop()
+            try:
+                while True:
+                    batch = await loop.run_in_executor(self._executor, context.run,
+                                                       list, islice(pixels, ITER_BATCH_SIZE))
+                    if not batch:
+                        return
+                    for pixel in batch:
+                        yield pixel
+            finally:
+                # Releases the connection when the caller stops early
+                await loop.run_in_executor(self._executor, pixels.close)
+
+    # __________USER__________
+
+    async def create_user(self) -> Response:
+        return await self._call(self.client.create_user)
+
+    async def update_token(self, new_token: str) -> Response:
+        return await self._call(self.client.update_token, new_token)
+
+    async def delete_user(self) -> Response:
+        return await self._call(self.client.delete_user)
+
+    # __________USER PROFILE__________
+
+    async def view_user_profile(self, username: str) -> Response:
+        return await self._call(self.client.view_user_profile, username)
+
+    async def update_user_profile(self, mode: str, new_value: str) -> Response:
+        return await self._call(self.client.update_user_profile, mode, new_value)
+
+    # __________GRAPH__________
+
+    async def create_graph(self, graph_id: str, name: str, unit: str, data_type: str, color: str) -> Response:
+        return await self._call(self.client.create_graph, graph_id, name, unit, data_type, color)
+
+    async def get_all_graph(self) -> Response:
+        return await self._call(self.client.get_all_graph)
+
+    async def get_graph_def(self, graph_id: str) -> Response:
+        return await self._call(self.client.get_graph_def, graph_id)
+
+    async def delete_graph(self, graph_id: str) -> Response:
+        return await self._call(self.client.delete_graph, graph_id)
+
+    async def display_graph(self, graph_id: str, mode: str = "") -> Response:
+        return await self._call(self.client.display_graph, graph_id, mode)
+
+    async def get_graph_svg(self, graph_id: str, date: str = "", mode: str = "", appearance: str = "") -> Response:
+        return await self._call(self.client.get_graph_svg, graph_id, date, mode, appearance)
+
+    async def get_graph_pixels(self, graph_id: str, date_from: str = "", date_to: str = "",
+                               with_body: bool = False) -> Response:
+        return await self._call(self.client.get_graph_pixels, graph_id, date_from, date_to, with_body)
+
+    def iter_graph_pixels(self, graph_id: str, date_from: str = "", date_to: str = "",
+                          with_body: bool = True) -> AsyncIterator[dict]:
+        """
+        :raises requests.HTTPError: if the server answers with an error
+        """
+
+        return self._iterate(self.client.iter_graph_pixels(graph_id, date_from, date_to, with_body))
+
+    def iter_pixel_windows(self, graph_id: str, date_from: str, date_to: str = "",
+                           window_days: int = pixela.PIXEL_WINDOW_DAYS, with_body: bool = True) -> AsyncIterator[dict]:
+        """
+        :raises requests.HTTPError: if the server answers with an error
+        """
+
+        return self._iterate(self.client.iter_pixel_windows(graph_id, date_from, date_to, window_days, with_body))
+
+    async def sync_graph_pixels(self, graph_id: str, full: bool = False,
+                                max_age: float = pixela.SYNC_INTERVAL) -> tuple[list[dict], Response | None]:
+        return await self._call(self.client.sync_graph_pixels, graph_id, full, max_age)
+
+    async def get_graph_stats(self, graph_id: str) -> Response:
+        return await self._call(self.client.get_graph_stats, graph_id)
+
+    # __________PIXEL__________
+
+    async def post_pixel(self, graph_id: str, date: str, quantity: str) -> Response:
+        return await self._call(self.client.post_pixel, graph_id, date, quantity)
+
+    async def get_pixel(self, graph_id: str, date: str) -> Response:
+        return await self._call(self.client.get_pixel, graph_id, date)
+
+    async def update_pixel(self, graph_id: str, date: str, quantity: str) -> Response:
+        return await self._call(self.client.update_pixel, graph_id, date, quantity)
+
+    async def increment_pixel(self, graph_id: str) -> Response:
+        return await self._call(self.client.increment_pixel, graph_id)
+
+    async def decrement_pixel(self, graph_id: str) -> Response:
+        return await self._call(self.client.decrement_pixel, graph_id)
+
+    async def add_pixel(self, graph_id: str, quantity: str) -> Response:
+        return await self._call(self.client.add_pixel, graph_id, quantity)
+
+    async def subtract_pixel(self, graph_id: str, quantity: str) -> Response:
+        return await self._call(self.client.subtract_pixel, graph_id, quantity)
+
+    async def delete_pixel(self, graph_id: str, date: str) -> Response:
+        return await self._call(self.client.delete_pixel, graph_id, date)
+
+    async def post_pixels_batch(self, graph_id: str, pixels: Iterable[dict], chunk_size: int = pixela.PIXEL_BATCH_SIZE,
+                                workers: int = pixela.DEFAULT_POOL_SIZE) -> list[dict]:
+        """
+        The chunks are sent by the wrapped client's own worker threads,
+        up to workers at a time, besides the slot this call takes
+        """
+
+        return await self._call(self.client.post_pixels_batch, graph_id, pixels, chunk_size, workers)
+
+
+class _CurrentAsyncClient(AsyncPixelaClient):
+    """
+    AsyncPixelaClient of the module-level coroutines, wrapping whichever
+    client pixela_api_handler.get_client() returns when a call is made
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        super().__init__(pixela.get_client(), concurrency)
+
+    @property
+    def client(self) -> pixela.PixelaClient:
+        # Read in the calling task, so a use_client() block only applies to the calls made inside it
+        client = pixela.get_client()
+        client.grow_pool(self.concurrency)
+        return client
+
+
+# Shares the connection pool of the client bound by use_client(), or of the default client
+_async_client: AsyncPixelaClient | None = None
+
+
+def get_async_client() -> AsyncPixelaClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = _CurrentAsyncClient()
+    return _async_client
+
+
+def set_concurrency(concurrency: int) -> None:
+    """
+    Replace the shared async client with one allowing
+    the given number of requests in flight
+    """
+
+    global _async_client
+    if _async_client is not None:
+        _async_client.close()
+    _async_client = _CurrentAsyncClient(concurrency)
+
+
+# __________USER__________
+
+async def create_user() -> Response:
+    return await get_async_client().create_user()
+
+
+async def update_token(new_token: str) -> Response:
+    return await get_async_client().update_token(new_token)
+
+
+async def delete_user() -> Response:
+    return await get_async_client().delete_user()
+
+
+# __________USER PROFILE__________
+
+async def view_user_profile(username: str) -> Response:
+    return await get_async_client().view_user_profile(username)
+
+
+async def update_user_profile(mode: str, new_value: str) -> Response:
+    return await get_async_client().update_user_profile(mode, new_value)
+
+
+# __________GRAPH__________
+
+async def create_graph(graph_id: str, name: str, unit: str, data_type: str, color: str) -> Response:
+    return await get_async_client().create_graph(graph_id, name, unit, data_type, color)
+
+
+async def get_all_graph() -> Response:
+    return await get_async_client().get_all_graph()
+
+
+async def get_graph_def(graph_id: str) -> Response:
+    return await get_async_client().get_graph_def(graph_id)
+
+
+async def delete_graph(graph_id: str) -> Response:
+    return await get_async_client().delete_graph(graph_id)
+
+
+async def display_graph(graph_id: str, mode: str = "") -> Response:
+    return await get_async_client().display_graph(graph_id, mode)
+
+
+async def get_graph_svg(graph_id: str, date: str = "", mode: str = "", appearance: str = "") -> Response:
+    return await get_async_client().get_graph_svg(graph_id, date, mode, appearance)
+
+
+async def get_graph_pixels(graph_id: str, date_from: str = "", date_to: str = "", with_body: bool = False) -> Response:
+    return await get_async_client().get_graph_pixels(graph_id, date_from, date_to, with_body)
+
+
+def iter_graph_pixels(graph_id: str, date_from: str = "", date_to: str = "",
+                      with_body: bool = True) -> AsyncIterator[dict]:
+    return get_async_client().iter_graph_pixels(graph_id, date_from, date_to, with_body)
+
+
+def iter_pixel_windows(graph_id: str, date_from: str, date_to: str = "",
+                       window_days: int = pixela.PIXEL_WINDOW_DAYS, with_body: bool = True) -> AsyncIterator[dict]:
+    return get_async_client().iter_pixel_windows(graph_id, date_from, date_to, window_days, with_body)
+
+
+async def sync_graph_pixels(graph_id: str, full: bool = False) -> tuple[list[dict], Response | None]:
+    return await get_async_client().sync_graph_pixels(graph_id, full)
+
+
+async def get_graph_stats(graph_id: str) -> Response:
+    return await get_async_client().get_graph_stats(graph_id)
+
+
+# __________PIXEL__________
+
+async def post_pixel(graph_id: str, date: str, quantity: str) -> Response:
+    return await get_async_client().post_pixel(graph_id, date, quantity)
+
+
+async def get_pixel(graph_id: str, date: str) -> Response:
+    return await get_async_client().get_pixel(graph_id, date)
+
+
+async def update_pixel(graph_id: str, date: str, quantity: str) -> Response:
+    return await get_async_client().update_pixel(graph_id, date, quantity)
+
+
+async def increment_pixel(graph_id: str) -> Response:
+    return await get_async_client().increment_pixel(graph_id)
+
+
+async def decrement_pixel(graph_id: str) -> Response:
+    return await get_async_client().decrement_pixel(graph_id)
+
+
+async def add_pixel(graph_id: str, quantity: str) -> Response:
+    return await get_async_client().add_pixel(graph_id, quantity)
+
+
+async def subtract_pixel(graph_id: str, quantity: str) -> Response:
+    return await get_async_client().subtract_pixel(graph_id, quantity)
+
+
+async def delete_pixel(graph_id: str, date: str) -> Response:
+    return await get_async_client().delete_pixel(graph_id, date)
+
+
+async def post_pixels_batch(graph_id: str, pixels: Iterable[dict], chunk_size: int = pixela.PIXEL_BATCH_SIZE,
+                            workers: int = pixela.DEFAULT_POOL_SIZE) -> list[dict]:
+    return await get_async_client().post_pixels_batch(graph_id, pixels, chunk_size, workers)
@@ -0,0 +1,102 @@
+"""
+Token-bucket rate limiters put in front of Pixela requests
+
+RateLimiter is shared by the threads of one process.
+FileRateLimiter keeps the bucket in a lock file, so every
+process using the same file shares a single rate.
+"""
+
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+
+class RateLimiter:
+    """
+    Token bucket shared by the threads of a process
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """
+        :param rate: requests allowed per second on average
+        :param burst: requests allowed at once after an idle period
+        """
+
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens: float, updated: float, now: float) -> tuple[float, float]:
+        """
+        Refill the bucket and take a token if there is one
+
+        :return: tokens left and seconds to wait before a token is available (0 if taken)
+        """
+
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            return tokens - 1, 0.0
+        return tokens, (1 - tokens) / self.rate
+
+    def acquire(self) -> None:
+        """
+        Block until a request may be sent
+        """
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens, wait = self._take(self._tokens, self._updated, now)
+                self._updated = now
+            if wait == 0:
+                return
+            time.sleep(wait)
+
+
+class FileRateLimiter(RateLimiter):
+    """
+    Token bucket stored in a file locked with flock,
+    shared by every thread and process using the same path
+    """
+
+    def __init__(self, rate: float, burst: int = 1, path: str = "") -> None:
+        """
+        :param path: state file, <temp dir>/pixela_rate_limit by default
+        """
+
+        if fcntl is None:
+            raise OSError("sharing a rate limit between processes needs fcntl (POSIX only)")
+        super().__init__(rate, burst)
+        self.path = path or os.path.join(os.environ.get("TMPDIR", "/tmp"), "pixela_rate_limit")
+
+    def acquire(self) -> None:
+        while True:
+            # The thread lock keeps threads of this process from contending on flock
+            with self._lock, open(self.path, "a+") as file:
+                fcntl.flock(file, fcntl.LOCK_EX)
+                try:
+                    now = time.time()
+                    file.seek(0)
+                    try:
+                        tokens, updated = (float(value) for value in file.read().split())
+                    except ValueError:  # new or corrupt state file
+                        tokens, updated = float(self.burst), now
+                    tokens, wait = self._take(tokens, updated, now)
+                    file.seek(0)
+                    file.truncate()
+                    file.write(f"{tokens} {now}")
+                    file.flush()
+                finally:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+            if wait == 0:
+                return
+            time.sleep(wait)
@@ -0,0 +1,154 @@
+"""
+On-disk cache of graph renderings (display_graph HTML, graph SVG)
+
+Every rendering is stored with the validators the server sent with it
+(ETag, Last-Modified), so it can be revalidated with a conditional
+request that costs no body when it has not changed. Renderings without
+validators are reused for a fixed time instead. Renderings are grouped
+by user and graph so that a change to a graph drops all of its options
+at once.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from urllib.parse import quote
+
+from pixel_cache import default_cache_dir
+
+RENDER_CACHE_DIR_NAME = "renders"
+RENDER_CACHE_TTL = 300  # seconds a rendering without validators is reused
+
+
+class RenderCache:
+    """
+    Directory of <username>/<graph_id>/<key>.body files, each with a <key>.json
+    holding its validators, content type and the time it was fetched
+    """
+
+    def __init__(self, directory: str = "", ttl: float = RENDER_CACHE_TTL) -> None:
+        """
+        :param directory: cache directory, <cache dir>/renders by default
+        :param ttl: seconds a rendering without ETag or Last-Modified is reused
+        """
+
+        self.directory = directory or os.path.join(default_cache_dir(), RENDER_CACHE_DIR_NAME)
+        self.ttl = ttl
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _graph_directory(self, username: str, graph_id: str) -> str:
+        return os.path.join(self.directory, quote(username, safe=""), quote(graph_id, safe=""))
+
+    def _paths(self, username: str, graph_id: str, kind: str, options: dict) -> tuple[str, str]:
+        key = hashlib.sha1(json.dumps([kind, sorted(options.items())]).encode()).hexdigest()
+        base = os.path.join(self._graph_directory(username, graph_id), key)
+        return base + ".body", base + ".json"
+
+    def get(self, username: str, graph_id: str, kind: str, options: dict) -> tuple[bytes, dict] | None:
+        """
+        :param kind: rendering endpoint, e.g. "html" or "svg"
+        :param options: query parameters of the rendering
+        :return: (body, metadata) of the cached rendering, None if missing
+        """
+
+        body_path, meta_path = self._paths(username, graph_id, kind, options)
+        with self._lock:
+            try:
+                with open(meta_path, encoding="utf-8") as file:
+                    meta = json.load(file)
+                with open(body_path, "rb") as file:
+                    return file.read(), meta
+            except (OSError, ValueError):
+                return None
+
+    def is_fresh(self, meta: dict) -> bool:
+        """
+        :return: True if a rendering can be used without asking the server
+        """
+
+        has_validators = meta.get("etag") or meta.get("last_modified")
+        return not has_validators and time.time() - meta.get("fetched_at", 0) < self.ttl
+
+    def conditional_headers(self, meta: dict) -> dict:
+        """
+        :return: headers asking the server to answer 304 if the rendering did not change
+        """
+
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def store(self, username: str, graph_id: str, kind: str, options: dict, body: bytes, headers) -> dict:
+        """
+        Store a rendering and the validators of its response
+
+        :param headers: headers of the response
+        :return: metadata stored with the rendering
+        """
+
+        meta = {
+            "etag": headers.get("ETag", ""),
+            "last_modified": headers.get("Last-Modified", ""),
+            "content_type": headers.get("Content-Type", ""),
+            "fetched_at": time.time(),
+        }
+        body_path, meta_path = self._paths(username, graph_id, kind, options)
+        with self._lock:
+            os.makedirs(os.path.dirname(body_path), exist_ok=True)
+            # Body first, the metadata file makes the entry visible
+            write_atomically(body_path, body)
+            write_atomically(meta_path, json.dumps(meta).encode())
+        return meta
+
+    def touch(self, username: str, graph_id: str, kind: str, options: dict, meta: dict) -> None:
+        """
+        Record that a rendering was revalidated now
+        """
+
+        meta = {**meta, "fetched_at": time.time()}
+        _, meta_path = self._paths(username, graph_id, kind, options)
+        with self._lock:
+            try:
+                write_atomically(meta_path, json.dumps(meta).encode())
+            except OSError:  # invalidated in the meantime
+                pass
+
+    def invalidate_graph(self, username: str, graph_id: str) -> None:
+        """
+        Forget every rendering of a graph, e.g. after one of its pixels changed
+        """
+
+        with self._lock:
+            shutil.rmtree(self._graph_directory(username, graph_id), ignore_errors=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def record(self, outcome: str) -> None:
+        """
+        :param outcome: "hits" (used without request), "revalidated" (304) or "misses"
+        """
+
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses}
+
+
+def write_atomically(path: str, data: bytes) -> None:
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+    os.replace(temporary, path)
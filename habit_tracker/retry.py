@@ -0,0 +1,153 @@
+"""
+Retry requests that Pixela rejected or that lost their connection
+
+Pixela randomly rejects a share of the requests of non-supporter
+accounts with a 503 response whose body has "isRejected": true.
+Those requests, other 502/503/504 responses and connection errors
+are retried with jittered exponential backoff, within a budget
+shared by every call so that an outage does not multiply the load.
+Requests that are not idempotent are only retried when Pixela
+rejected them, since a rejected request was not applied.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from requests import Response
+
+RETRYABLE_STATUS_CODES = (502, 503, 504)
+
+
+class RetryBudget:
+    """
+    Limits retries to a fraction of the calls made
+
+    Every call deposits `ratio` retries and every retry withdraws one,
+    so under a sustained failure at most `ratio` extra requests are
+    sent per call. `reserve` retries are available from the start.
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: int = 10, max_balance: int = 100) -> None:
+        self.ratio = ratio
+        self.max_balance = max_balance
+        self._balance = float(reserve)
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        """
+        :return: True if a retry may be sent
+        """
+
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class RetryPolicy:
+    """
+    Decide whether and when a request is sent again
+    """
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 8.0,
+                 budget: RetryBudget | None = None, sleep: Callable[[float], None] = time.sleep) -> None:
+        """
+        :param max_retries: retries of a single call at most
+        :param base_delay: upper bound of the first backoff, in seconds
+        :param max_delay: upper bound of any backoff, in seconds
+        :param budget: retry budget, a new one by default
+        :param sleep: function waiting the given number of seconds
+        """
+
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget if budget is not None else RetryBudget()
+        self.sleep = sleep
+
+        self.calls = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_retryable(response: Response) -> bool:
+        return response.status_code in RETRYABLE_STATUS_CODES or RetryPolicy.is_rejected(response)
+
+    @staticmethod
+    def is_rejected(response: Response) -> bool:
+        """
+        :return: True if Pixela rejected the request without applying it
+        """
+
+        if response.status_code == 200:
+            return False
+        try:
+            body = response.json()
+        except ValueError:  # json.decoder.JSONDecodeError included
+            return False
+        return isinstance(body, dict) and body.get("isRejected") is True
+
+    def backoff(self, retry: int) -> float:
+        """
+        Full jitter: a random delay up to base_delay * 2^retry
+
+        :param retry: number of retries already sent
+        :return: seconds to wait before the next one
+        """
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    def call(self, send: Callable[[], Response], log: Callable[[str], None] | None = None,
+             rejected_only: bool = False) -> Response:
+        """
+        Send a request, retrying it while it is retryable
+
+        The number of retries is stored in the retry_count
+        attribute of the returned response.
+
+        :param send: function sending the request once
+        :param log: function receiving a line for every retry
+        :param rejected_only: only retry the responses Pixela rejected, for requests
+                              that must not be applied twice, e.g. increments
+        :return: last response received
+        """
+
+        from requests import ConnectionError
+
+        self.budget.deposit()
+        with self._lock:
+            self.calls += 1
+
+        retry = 0
+        while True:
+            try:
+                response = send()
+            except ConnectionError:
+                if rejected_only or retry >= self.max_retries or not self.budget.withdraw():
+                    raise
+                reason = "connection error"
+            else:
+                retryable = self.is_rejected(response) if rejected_only else self.is_retryable(response)
+                if not retryable or retry >= self.max_retries or not self.budget.withdraw():
+                    response.retry_count = retry
+                    return response
+                reason = f"status {response.status_code}"
+                response.close()  # give a streamed connection back to the pool
+
+            delay = self.backoff(retry)
+            retry += 1
+            with self._lock:
+                self.retries += 1
+            if log is not None:
+                log(f"Request failed ({reason}), retry {retry} in {delay:.1f}s")
+            self.sleep(delay)
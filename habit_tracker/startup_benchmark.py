@@ -0,0 +1,130 @@
+"""
+Benchmark how fast the entry points start
+
+For the CLI and for the menu, reports the import time of the entry
+module (like python -X importtime, heaviest imports first) and the
+time from process start until the first request reaches a local
+stand-in server. Results are printed and can be written to a JSON
+file, so that startup regressions show up between runs.
+
+    python startup_benchmark.py --runs 10 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_pixela_server import FakePixelaServer
+
+USERNAME = "startup"
+TOKEN = "startup-token"
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIRST_REQUEST_TIMEOUT = 30.0  # seconds
+
+
+def import_times(module: str) -> dict:
+    """
+    Import a module in a fresh interpreter with -X importtime
+
+    :return: total import time of the module and the heaviest imports, in milliseconds
+    """
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=HERE, capture_output=True, text=True, check=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name[1:]  # nested imports are indented by two spaces per level
+        imports.append({"module": name.strip(), "self_ms": int(self_us) / 1000,
+                        "cumulative_ms": int(cumulative_us) / 1000, "depth": (len(name) - len(name.lstrip())) // 2})
+
+    total = next(entry["cumulative_ms"] for entry in imports if entry["module"] == module)
+    top_level = sorted((entry for entry in imports if entry["depth"] <= 1),
+                       key=lambda entry: entry["cumulative_ms"], reverse=True)
+    return {"module": module, "total_ms": total,
+            "heaviest": [{key: entry[key] for key in ("module", "self_ms", "cumulative_ms")}
+                         for entry in top_level[:10]]}
+
+
+def time_to_first_request(server: FakePixelaServer, command: list[str], stdin: str = "") -> float:
+    """
+    Start a process and wait for its first request to reach the server
+
+    :param command: arguments after the python executable
+    :param stdin: text typed into the process
+    :return: seconds from process start to the first request
+    """
+
+    server.first_request_at = None
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, PIXELA_API_PREFIX=server.url, XDG_CACHE_HOME=directory,
+                   XDG_CONFIG_HOME=directory, TERM="dumb")
+        start = time.time()
+        process = subprocess.Popen([sys.executable, *command], cwd=HERE, env=env, stdin=subprocess.PIPE,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, text=True)
+        try:
+            process.stdin.write(stdin)
+            process.stdin.flush()
+            deadline = time.monotonic() + FIRST_REQUEST_TIMEOUT
+            while server.first_request_at is None:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"No request from {' '.join(command)}")
+                time.sleep(0.001)
+            return server.first_request_at - start
+        finally:
+            process.kill()
+            process.wait()
+
+
+def run(runs: int) -> dict:
+    entry_points = {
+        "cli": ("cli", ["cli.py", "--username", USERNAME, "--token", TOKEN, "graphs"], ""),
+        # Log in, then GRAPH menu > List all of your graphs > List all of your graphs
+        "menu": ("main", ["main.py"], f"{USERNAME}\n{TOKEN}\n3\n2\n1\n"),
+    }
+    report = {"python": sys.version.split()[0], "runs": runs, "results": []}
+
+    with FakePixelaServer() as server:
+        server.add_user(USERNAME, TOKEN)
+        for name, (module, command, stdin) in entry_points.items():
+            seconds = [time_to_first_request(server, command, stdin) for _ in range(runs)]
+            result = {
+                "entry_point": name,
+                "first_request_median_ms": statistics.median(seconds) * 1000,
+                "first_request_min_ms": min(seconds) * 1000,
+                "imports": import_times(module),
+            }
+            report["results"].append(result)
+            print_result(result)
+    return report
+
+
+def print_result(result: dict) -> None:
+    print(f"{result['entry_point']:<6} first request: median {result['first_request_median_ms']:>7.1f} ms  "
+          f"min {result['first_request_min_ms']:>7.1f} ms  import: {result['imports']['total_ms']:>7.1f} ms")
+    for entry in result["imports"]["heaviest"]:
+        print(f"    {entry['module']:<28} {entry['cumulative_ms']:>7.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of the CLI and the menu")
+    parser.add_argument("--runs", type=int, default=5, help="process starts per entry point")
+    parser.add_argument("--output", default="", help="JSON file receiving the results")
+    args = parser.parse_args()
+
+    report = run(args.runs)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,95 @@
 import pixela_api_handler as pixela
+import pixela_async
+import asyncio
+import io
 import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+import write_queue
+from pixel_series import PixelSeries
+from datetime import date, timedelta
+from fake_pixela_server import FakePixelaServer
+from pixel_cache import PixelCache
 
-pixela.set_username("namtest")
-pixela.set_token("namtest1")
+# Runs against a local stand-in instead of creating a real user on pixe.la
+with FakePixelaServer() as server:
+    pixela.set_api_prefix(server.url)
+    pixela.set_username("namtest")
+    pixela.set_token("namtest1")
 
-response = pixela.create_user()
+    response = pixela.create_user()
 
-print(response.status_code)
-print(json.dumps(response.json(), indent=4, default=str))
+    print(response.status_code)
+    print(json.dumps(response.json(), indent=4, default=str))
+
+    # A post followed by a delete of the same pixel is coalesced into the delete alone:
+    # the server never had the pixel, and the queue must still end up empty, not failed
+    server.add_graph("namtest", "water")
+    with tempfile.TemporaryDirectory() as directory:
+        queue = write_queue.WriteQueue(os.path.join(directory, "queue.sqlite3"))
+        client = pixela.PixelaClient("namtest", "namtest1", verbose=False, api_prefix=server.url)
+        flusher = write_queue.WriteQueueFlusher(queue, client, debounce=0)
+        queue.enqueue("namtest", "water", "post", "20240101", "3")
+        queue.enqueue("namtest", "water", "delete", "20240101")
+
+        summary = flusher.flush()
+        print(summary)
+        assert summary["sent"] == 1 and summary["failed"] == 0, summary
+        assert queue.entries("namtest") == [], queue.entries("namtest")
+        queue.close()
+        client.close()
+
+    # A use_client() block only applies to the async calls made inside it, even the first one,
+    # and quiet() reaches the worker thread sending the request
+    server.add_user("bob", "bobtoken1")
+    server.add_graph("bob", "tea")
+    bob = pixela.PixelaClient("bob", "bobtoken1", api_prefix=server.url)
+
+    async def switch_accounts() -> tuple[int, int, str]:
+        with pixela.use_client(bob):
+            inside = await pixela_async.get_graph_def("tea")
+        outside = await pixela_async.get_graph_def("tea")  # namtest has no such graph
+        output = io.StringIO()
+        with redirect_stdout(output), pixela.quiet():
+            await pixela_async.get_graph_def("water")
+        return inside.status_code, outside.status_code, output.getvalue()
+
+    statuses = asyncio.run(switch_accounts())
+    assert statuses == (200, 404, ""), statuses
+    bob.close()
+
+    # The shared async client outlives asyncio.run(): a second event loop must be able to wait for a slot too
+    async def queue_requests() -> list[int]:
+        responses = await asyncio.gather(*(pixela_async.get_all_graph() for _ in range(6)))
+        return [response.status_code for response in responses]
+
+    pixela_async.set_concurrency(2)
+    for _ in range(2):
+        assert asyncio.run(queue_requests()) == [200] * 6
+    pixela_async.set_concurrency(pixela_async.DEFAULT_CONCURRENCY)
+
+    # An incremental sync drops the cached pixels deleted on the server since the last one
+    today = date.today().strftime("%Y%m%d")
+    yesterday = (date.today() - timedelta(days=1)).strftime("%Y%m%d")
+    server.add_graph("namtest", "juice")
+    server.add_pixels("namtest", "juice", {yesterday: "1", today: "2"})
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PixelCache(os.path.join(directory, "pixels.sqlite3"))
+        client = pixela.PixelaClient("namtest", "namtest1", verbose=False, api_prefix=server.url, pixel_cache=cache)
+        other_device = pixela.PixelaClient("namtest", "namtest1", verbose=False, api_prefix=server.url)
+        client.sync_graph_pixels("juice")
+        other_device.delete_pixel("juice", yesterday)
+
+        pixels, _ = client.sync_graph_pixels("juice", max_age=0)
+        assert [pixel["date"] for pixel in pixels] == [today], pixels
+        cache.close()
+        client.close()
+        other_device.close()
+
+# Single precision quantities are written back as posted, not with the digits of their double widening
+pixels = [{"date": "20240101", "quantity": "0.1"}, {"date": "20240102", "quantity": "1.5"},
+          {"date": "20240104", "quantity": "2"}]
+for typecode in ("d", "f"):
+    series = PixelSeries.from_pixels(pixels, typecode=typecode)
+    assert series.to_pixels() == pixels, (typecode, series.to_pixels())
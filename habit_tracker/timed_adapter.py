@@ -0,0 +1,53 @@
+"""
+requests transport adapter recording how long new connections take to open
+
+Kept apart from instrumentation.py so that requests and urllib3
+are only imported when the first session is created.
+"""
+
+import time
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from instrumentation import add_connect_time
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self) -> None:
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            add_connect_time(time.perf_counter() - start)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self) -> None:
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            add_connect_time(time.perf_counter() - start)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose new connections record how long they took to open
+    """
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
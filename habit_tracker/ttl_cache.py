@@ -0,0 +1,56 @@
+"""
+Small thread-safe cache whose entries expire after a fixed time
+"""
+
+import threading
+import time
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """
+    Key-value cache with a time to live and hit/miss counters
+    """
+
+    def __init__(self, ttl: float) -> None:
+        """
+        :param ttl: seconds an entry stays valid
+        """
+
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        :return: cached value, None if missing or expired
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -0,0 +1,295 @@
+"""
+Durable queue of pixel mutations sent in the background
+
+Every post, update or delete of a pixel is written to a SQLite
+queue before anything goes over the network, so it survives a
+crash or a lost connection. A flusher thread drains the queue:
+mutations of the same pixel are coalesced into the last one (so a
+delete supersedes the updates queued before it), a pixel is only
+sent once it has not changed for a debounce delay, and the remaining
+requests are sent concurrently.
+
+    flusher = WriteQueueFlusher(WriteQueue(), client, debounce=5.0)
+    flusher.start()
+    for quantity in readings:  # only the last one is sent, 5 s after it was queued
+        flusher.queue.enqueue(client.username, "weight", "update", "20240101", quantity)
+    flusher.stop()
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING
+
+import pixela_api_handler as pixela
+from pixel_cache import default_cache_dir
+from retry import RetryPolicy
+
+if TYPE_CHECKING:
+    from requests import Response
+
+QUEUE_FILE_NAME = "write_queue.sqlite3"
+OPERATIONS = ("post", "update", "delete")
+FLUSH_INTERVAL = 2.0  # seconds between two flushes when nothing new is queued
+FLUSH_BATCH_SIZE = 500  # queued mutations read per flush
+FLUSH_DEBOUNCE = 1.0  # seconds a pixel must stay unchanged before its last mutation is sent
+
+
+class WriteQueue:
+    """
+    Append-only SQLite queue of pixel mutations
+
+    Entries stay "pending" until the server accepts them,
+    or become "failed" when the server refuses them for good.
+    """
+
+    def __init__(self, path: str = "") -> None:
+        """
+        :param path: database file, <cache dir>/write_queue.sqlite3 by default
+        """
+
+        self.path = path or os.path.join(default_cache_dir(), QUEUE_FILE_NAME)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS mutations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL,
+                graph_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                quantity TEXT NOT NULL DEFAULT '',
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT NOT NULL DEFAULT '',
+                created_at REAL NOT NULL
+            )
+        """)
+        self._connection.commit()
+
+        # Set whenever something is queued, so the flusher wakes up at once
+        self.changed = threading.Event()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def enqueue(self, username: str, graph_id: str, operation: str, date: str, quantity: str = "") -> int:
+        """
+        Record a mutation, durable once this returns
+
+        :param operation: "post", "update" or "delete"
+        :return: id of the queued mutation
+        """
+
+        if operation not in OPERATIONS:
+            raise ValueError(f"unknown operation {operation!r}")
+
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO mutations (username, graph_id, date, operation, quantity, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (username, graph_id, date, operation, str(quantity), time.time()))
+        self.changed.set()
+        return cursor.lastrowid
+
+    def pending(self, username: str, limit: int = FLUSH_BATCH_SIZE) -> list[dict]:
+        """
+        :return: oldest pending mutations of a user
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, graph_id, date, operation, quantity, created_at FROM mutations "
+                "WHERE username = ? AND status = 'pending' ORDER BY id LIMIT ?",
+                (username, limit)).fetchall()
+        keys = ("id", "graph_id", "date", "operation", "quantity", "created_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def entries(self, username: str) -> list[dict]:
+        """
+        :return: every pending or failed mutation of a user
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, graph_id, date, operation, quantity, status, attempts, last_error FROM mutations "
+                "WHERE username = ? ORDER BY id",
+                (username,)).fetchall()
+        keys = ("id", "graph_id", "date", "operation", "quantity", "status", "attempts", "last_error")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def complete(self, username: str, graph_id: str, date: str, last_id: int) -> None:
+        """
+        Drop the mutations of a pixel up to last_id once the last one was sent
+        """
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM mutations WHERE username = ? AND graph_id = ? AND date = ? "
+                "AND status = 'pending' AND id <= ?",
+                (username, graph_id, date, last_id))
+
+    def fail(self, username: str, graph_id: str, date: str, last_id: int, error: str, permanent: bool) -> None:
+        """
+        Record an error for the mutations of a pixel up to last_id
+
+        :param permanent: the server refused the mutation, do not send it again
+        """
+
+        status = "failed" if permanent else "pending"
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE mutations SET attempts = attempts + 1, last_error = ?, status = ? "
+                "WHERE username = ? AND graph_id = ? AND date = ? AND status = 'pending' AND id <= ?",
+                (error, status, username, graph_id, date, last_id))
+
+
+def coalesce(mutations: list[dict]) -> list[dict]:
+    """
+    Keep only the last mutation of every pixel
+
+    :param mutations: mutations ordered by id
+    :return: last mutation of each (graph_id, date), in order of first appearance
+    """
+
+    last: dict[tuple[str, str], dict] = {}
+    for mutation in mutations:
+        last[(mutation["graph_id"], mutation["date"])] = mutation
+    return list(last.values())
+
+
+class WriteQueueFlusher:
+    """
+    Background thread sending the queued mutations of one account
+    """
+
+    def __init__(self, queue: WriteQueue, client: pixela.PixelaClient,
+                 workers: int = 4, interval: float = FLUSH_INTERVAL, debounce: float = FLUSH_DEBOUNCE) -> None:
+        """
+        :param queue: queue to drain
+        :param client: client sending the requests, only its user's mutations are flushed
+        :param workers: requests sent at the same time
+        :param interval: seconds between two flushes when nothing new is queued
+        :param debounce: seconds a pixel must stay unchanged before it is sent, 0 sends it at once
+        """
+
+        self.queue = queue
+        self.client = client
+        self.workers = workers
+        self.interval = interval
+        self.debounce = debounce
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._flush_lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="pixela-write-queue", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Stop the thread, letting it finish the flush in progress
+        """
+
+        if self._thread is not None:
+            self._stop.set()
+            self.queue.changed.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def set_credentials(self, username: str, token: str) -> None:
+        """
+        Switch the account whose mutations are flushed, once the flush
+        in progress is over, so its requests all use the same credentials
+        """
+
+        with self._flush_lock:
+            self.client.set_username(username)
+            self.client.set_token(token)
+
+    def _run(self) -> None:
+        timeout = self.interval
+        while True:
+            self.queue.changed.wait(timeout)
+            self.queue.changed.clear()
+            stopping = self._stop.is_set()
+            timeout = self.interval
+            try:
+                # Whatever is still debounced when stopping is sent right away
+                summary = self.flush(force=stopping)
+            except sqlite3.Error:
+                summary = None  # the queue stays as it is, try again next time
+            if stopping:
+                return
+            if summary is not None and summary["debounced"]:
+                timeout = min(self.interval, summary["next_due"])
+
+    def flush(self, force: bool = False) -> dict:
+        """
+        Send the last pending mutation of every pixel of the client's user once
+
+        :param force: also send the pixels changed less than debounce seconds ago
+        :return: number of pixels sent, failed for good, left for a later flush
+                 and debounced, and seconds until the next debounced pixel is due
+        """
+
+        summary = {"sent": 0, "failed": 0, "retry_later": 0, "debounced": 0, "next_due": 0.0}
+        with self._flush_lock:
+            username = self.client.username
+            mutations = coalesce(self.queue.pending(username))
+            if not force and self.debounce > 0:
+                now = time.time()
+                due = [mutation for mutation in mutations if now - mutation["created_at"] >= self.debounce]
+                waiting = [self.debounce - (now - mutation["created_at"])
+                           for mutation in mutations if now - mutation["created_at"] < self.debounce]
+                if waiting:
+                    summary["debounced"] = len(waiting)
+                    summary["next_due"] = min(waiting)
+                mutations = due
+            if not mutations:
+                return summary
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for outcome in executor.map(partial(self._send, username), mutations):
+                    summary[outcome] += 1
+        return summary
+
+    def _send(self, username: str, mutation: dict) -> str:
+        graph_id = mutation["graph_id"]
+        date = mutation["date"]
+        try:
+            response = send_mutation(self.client, mutation)
+        except OSError as error:
+            self.queue.fail(username, graph_id, date, mutation["id"], str(error), permanent=False)
+            return "retry_later"
+
+        # A delete that superseded a post the server never received finds no pixel: nothing is left to do
+        if response.status_code == 200 or (mutation["operation"] == "delete" and response.status_code == 404):
+            self.queue.complete(username, graph_id, date, mutation["id"])
+            return "sent"
+
+        permanent = not RetryPolicy.is_retryable(response) and response.status_code < 500
+        self.queue.fail(username, graph_id, date, mutation["id"], response.text[:500], permanent)
+        return "failed" if permanent else "retry_later"
+
+
+def send_mutation(client: pixela.PixelaClient, mutation: dict) -> Response:
+    match mutation["operation"]:
+        case "post":
+            return client.post_pixel(mutation["graph_id"], mutation["date"], mutation["quantity"])
+        case "update":
+            return client.update_pixel(mutation["graph_id"], mutation["date"], mutation["quantity"])
+        case _:
+            return client.delete_pixel(mutation["graph_id"], mutation["date"])